@@ -1,5 +1,7 @@
-from collections import defaultdict
 from utils import is_empty
+from eligibility import EligibilityTraces
+from tables import BoundedTable, get_table, get_dense_table
+import numpy as np
 import random
 import logging
 
@@ -8,9 +10,11 @@ class Actor:
 
     def __init__(self, player, config):
         self.config = config
-        self.policy = defaultdict(lambda: 0)  # Policy mapping SAP to its desirability value
-        self.eligibility = defaultdict(lambda: 0)
+        self.policy = get_table(config)  # Policy mapping (state, action id) to its desirability value
+        # Live eligibility traces of SAPs, pruned when they decay below trace_threshold
+        self.eligibility = EligibilityTraces(config["df_actor"] * config["dr_actor"], config.get("trace_threshold", 0))
         self.player = player  # Player who performs all the actions
+        self.symmetry = player.board.symmetry  # When set, symmetric SAPs share one policy entry
         self.td_error = None  # Temporal Difference error
         self.epsilon = config["epsilon"]  # Epsilon for epsilon-greedy strategy
 
@@ -24,25 +28,44 @@ class Actor:
         Reset eligibility to default
         :return: None
         """
-        self.eligibility = defaultdict(lambda: 0)
+        self.eligibility.reset()
 
-    def get_desirability(self, state, action):
+    def canonicalize(self, state):
+        """
+        Return the state the policy stores for state, and the map from action ids in state to action ids in that
+        state. Without symmetry, state is stored as it is and the map is None.
+        :param state: int
+        :return: int, List[int]
+        """
+        if self.symmetry is None:
+            return state, None
+        return self.symmetry.canonicalize(state)
+
+    def get_desirability(self, state, action, peek=False):
         """
         Get the desirability for doing an action in a state
-        :param state: str
+        :param state: int
         :param action: Action
+        :param peek: boolean - read a BoundedTable policy without counting it as a visit
         :return: float
         """
-        return self.policy[(state, action.__str__())]
+        state, action_map = self.canonicalize(state)
+        action_id = action.action_id if action_map is None else action_map[action.action_id]
+        if peek and isinstance(self.policy, BoundedTable):
+            return self.policy.peek((state, action_id), 0)
+        return self.policy.get((state, action_id), 0)
 
-    def get_action(self, state):
+    def get_action(self, state, legal_actions=None, peek=False):
         """
         Given a state of the board, return the appropriate action
-        :param state: str
+        :param state: int
+        :param legal_actions: List[Action] - legal actions in state, asked from the player if not given
+        :param peek: boolean - read a BoundedTable policy without counting it as a visit
         :return: Action
         """
-        legal_actions = list(map(lambda action: (action, self.get_desirability(state, action)),
-                                 self.player.get_legal_actions()))
+        if legal_actions is None:
+            legal_actions = self.player.get_legal_actions()
+        legal_actions = list(map(lambda action: (action, self.get_desirability(state, action, peek)), legal_actions))
         if is_empty(legal_actions):
             return None
         self.total_actions += 1
@@ -53,6 +76,23 @@ class Actor:
             legal_actions.sort(key=lambda tup: tup[1], reverse=True)
             return legal_actions[0][0]
 
+    def get_actions(self, states, legal_mask):
+        """
+        Return the action id chosen for each of many boards, e.g. the boards of a VecSimWorld. These are evaluation
+        boards, so the policy is read without counting visits, and what a BoundedTable evicts is left unchanged.
+        :param states: np.ndarray[N] of int
+        :param legal_mask: np.ndarray[N, num_actions] of bool
+        :return: np.ndarray[N] of int - action ids, -1 for boards without legal actions
+        """
+        catalog = self.player.board.action_catalog
+        action_ids = np.full(len(states), -1, dtype=np.int64)
+        for i, state in enumerate(states):
+            legal_actions = [catalog[action_id] for action_id in np.flatnonzero(legal_mask[i])]
+            action = self.get_action(int(state), legal_actions, peek=True)
+            if action is not None:
+                action_ids[i] = action.action_id
+        return action_ids
+
     def set_td_error(self, error):
         """
         Set the td_error to error
@@ -70,33 +110,32 @@ class Actor:
         self.last_epsilon = self.epsilon
         self.epsilon = value
 
-    def update_policy(self, state, action):
+    def update_policy(self):
         """
-        Update the value that (state, action) maps to in the policy function.
+        Update the value of every SAP with a live eligibility trace in the policy function.
         Update rule is defined as:
             pi(state, action) = pi(state, action) + learning_rate * td_error * e(state, action)
-        :param state: str
-        :param action: Action
         :return: None
         """
-        action = action.__str__()
-        self.policy[(state, action)] += self.config["lr_actor"] * self.td_error * self.eligibility[(state, action)]
+        step = self.config["lr_actor"] * self.td_error * self.eligibility.scale
+        for sap, trace in self.eligibility.items():
+            self.policy[sap] = self.policy.get(sap, 0) + step * trace
 
-    def update_eligibility(self, state, action, is_current_state=False):
+    def update_eligibility(self, state=None, action=None, is_current_state=False):
         """
-        Update the value that (state, action) maps to in eligibility.
+        Update eligibility. The current SAP is set to 1, otherwise all live traces decay.
         The update rule is defined as:
             e_t(state, action) = discount_factor * trace_factor * e_{t-1}(state, action)
-        :param state: str
-        :param action: Action
+        :param state: int
+        :param action: int - action id
         :param is_current_state: boolean
         :return: None
         """
-        action = action.__str__()
         if is_current_state:
-            self.eligibility[(state, action)] = 1
+            state, action_map = self.canonicalize(state)
+            self.eligibility.set((state, action if action_map is None else action_map[action]))
         else:
-            self.eligibility[(state, action)] *= self.config["df_actor"] * self.config["dr_actor"]
+            self.eligibility.decay_all()
 
     def update_epsilon(self):
         """
@@ -107,15 +146,125 @@ class Actor:
         """
         self.epsilon *= self.config["dr_epsilon"]
 
+    def get_avg_policy(self):
+        """
+        Return the average desirability value stored in the policy
+        :return: float
+        """
+        return sum(self.policy.values()) / max(len(self.policy), 1)
+
     def report_actor_stats(self):
         """
         Log general stats of what the Actor has done during its existence
         """
-        avg_policy = sum(self.policy.values()) / len(self.policy.keys())
-        avg_eligibility = sum(self.eligibility.values()) / len(self.eligibility.keys())
+        avg_policy = self.get_avg_policy()
+        avg_eligibility = sum(self.eligibility.values()) / max(len(self.eligibility), 1)
         p = int(100 * self.random_actions / self.total_actions)
         logging.info("ACTOR: ")
         logging.info("\t {} of {} actions where random: {}%".format(self.random_actions, self.total_actions, p))
         logging.info("\t Epsilon ended at: {}".format(self.last_epsilon))
         logging.info("\t Avg policy values: {}".format(avg_policy if isinstance(avg_policy, float) else avg_policy.item()))
         logging.info("\t Avg eligibility values: {}".format(avg_eligibility))
+        if isinstance(self.policy, BoundedTable):
+            logging.info("\t Policy entries: {} of max {}, {} inserted, {} evicted".format(
+                len(self.policy), self.policy.describe_limit(), self.policy.insertions, self.policy.evictions))
+
+
+class DenseActor(Actor):
+    """
+    An Actor storing its policy in a DenseTable, with one row of desirability values per state and one column per
+    action id in the board's ActionCatalog
+    """
+
+    def __init__(self, player, config):
+        super(DenseActor, self).__init__(player, config)
+        board = player.board
+        self.policy = get_dense_table(config, len(board.get_cells()), (len(board.action_catalog),))
+
+    def get_desirability(self, state, action):
+        """
+        Get the desirability for doing an action in a state
+        :param state: int
+        :param action: Action
+        :return: float
+        """
+        state, action_map = self.canonicalize(state)
+        row = self.policy.get(state)
+        if row is None:
+            return 0
+        return float(row[action.action_id if action_map is None else action_map[action.action_id]])
+
+    def get_action(self, state, legal_actions=None):
+        """
+        Given a state of the board, return the appropriate action. The greedy action is a masked argmax over the
+        row of the state, where ties go to the first legal action like in Actor.get_action.
+        :param state: int
+        :param legal_actions: List[Action] - legal actions in state, asked from the player if not given
+        :return: Action
+        """
+        if legal_actions is None:
+            legal_actions = self.player.get_legal_actions()
+        if is_empty(legal_actions):
+            return None
+        self.total_actions += 1
+        if random.random() < self.epsilon:
+            self.random_actions += 1
+            return random.choice(legal_actions)
+        state, action_map = self.canonicalize(state)
+        row = self.policy.get(state)
+        if row is None:
+            return legal_actions[0]
+        if action_map is None:
+            action_ids = [action.action_id for action in legal_actions]
+        else:
+            action_ids = [action_map[action.action_id] for action in legal_actions]
+        return legal_actions[int(np.argmax(row[action_ids]))]
+
+    def get_actions(self, states, legal_mask):
+        """
+        Return the action id chosen for each of many boards, e.g. the boards of a VecSimWorld. The greedy actions are
+        one masked argmax over the policy rows of all boards, and the random ones a masked argmax over random scores.
+        :param states: np.ndarray[N] of int
+        :param legal_mask: np.ndarray[N, num_actions] of bool
+        :return: np.ndarray[N] of int - action ids, -1 for boards without legal actions
+        """
+        has_legal = legal_mask.any(axis=1)
+        canonical = [self.canonicalize(int(state)) for state in states]
+        rows = np.array([self.policy.get_row(state) for state, _ in canonical], dtype=np.int64)
+        values = self.policy.values[np.maximum(rows, 0)]
+        if self.symmetry is not None:
+            # Move every row back to the orientation of its board
+            values = np.take_along_axis(values, np.array([action_map for _, action_map in canonical]), axis=1)
+        values[rows < 0] = 0
+        is_random = np.random.random(len(states)) < self.epsilon
+        values[is_random] = np.random.random((int(is_random.sum()), values.shape[1]))
+        action_ids = np.argmax(np.where(legal_mask, values, -np.inf), axis=1)
+        action_ids[~has_legal] = -1
+
+        self.total_actions += int(has_legal.sum())
+        self.random_actions += int((is_random & has_legal).sum())
+        return action_ids
+
+    def update_policy(self):
+        """
+        Update every SAP with a live eligibility trace in one scatter-add.
+        Update rule is defined as:
+            pi(state, action) = pi(state, action) + learning_rate * td_error * e(state, action)
+        :return: None
+        """
+        saps = list(self.eligibility.items())
+        if is_empty(saps):
+            return
+        rows = [self.policy.add_row(state) for (state, _), _ in saps]
+        columns = [action for (_, action), _ in saps]
+        traces = np.array([trace for _, trace in saps], dtype=self.policy.values.dtype)
+        step = self.config["lr_actor"] * float(self.td_error) * self.eligibility.scale
+        self.policy.add(rows, step * traces, columns)
+
+    def get_avg_policy(self):
+        """
+        Return the average desirability value of the states stored in the policy
+        :return: float
+        """
+        stored = self.policy.stored()
+        return float(stored.mean()) if stored.size else 0.0
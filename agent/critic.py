@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
-from collections import defaultdict
 import random
 import logging
-from models import NNCritic
-import torch
+from eligibility import EligibilityTraces
+from tables import BoundedTable, get_table, get_dense_table
+from running_stats import RunningStats, format_window
+import numpy as np
 
 
 class Critic(ABC):
@@ -16,28 +17,36 @@ class Critic(ABC):
         self.td_error = None  # Temporal Difference error
 
         # Stats
-        self.td_errors = []
+        self.td_error_stats = RunningStats()
 
     @abstractmethod
     def get_value(self, state):
         pass
 
-    def get_td_error(self, current_state, future_state, reward):
+    def get_td_error(self, current_state, future_state, reward, done=False):
         """
         Temporal Difference (TD) error is the difference between the reward plus the discounted future state value,
         and the current state value.
         The error is therefore defined as:
             td_error = reward + discount_factor * V(s') - V(s)
         where s' is the future state.
-        :param current_state: str | List[int]
-        :param future_state: str | List[int]
+        :param current_state: int
+        :param future_state: int
         :param reward: int
+        :param done: boolean - whether future_state ended the episode, used by critics learning from replay
         :return: float
         """
         self.td_error = reward + self.config["df_critic"] * self.get_value(future_state) - self.get_value(current_state)
-        self.td_errors.append(self.td_error)
+        self.td_error_stats.add(self.td_error)
         return self.td_error
 
+    def report_interval_stats(self):
+        """
+        Log the stats of the TD errors since the last call
+        :return: None
+        """
+        logging.info("\t " + format_window("TD errors", self.td_error_stats.pop_window()))
+
     @abstractmethod
     def reset_eligibility(self):
         pass
@@ -52,135 +61,149 @@ class TableCritic(Critic):
     A Critic using a lookup table (dict) to map states to values
     """
 
-    def __init__(self, config):
+    def __init__(self, config, symmetry=None):
         super(TableCritic, self).__init__(config)
-        self.value_function = defaultdict(lambda: 0)  # Value function (V) - algorithm say random, but 0 works best
-        self.eligibility = defaultdict(lambda: 0)  # Eligibility function (e)
+        self.value_function = get_table(config)  # Value function (V) - algorithm say random, but 0 works best
+        # Eligibility function (e), only holding live traces
+        self.eligibility = EligibilityTraces(config["df_critic"] * config["dr_critic"], config.get("trace_threshold", 0))
+        self.symmetry = symmetry  # BoardSymmetry letting symmetric states share one value, or None
+
+    def get_key(self, state):
+        """
+        Return the state the value function stores for state, its canonical state when symmetry is used
+        :param state: int
+        :return: int
+        """
+        if self.symmetry is None:
+            return state
+        return self.symmetry.canonical_state(state)
 
     def get_value(self, state):
         """
         Given a state, return the estimated value of being in that state
-        :param state: str
+        :param state: int
         :return: float
         """
-        return self.value_function[state]
+        return self.value_function.get(self.get_key(state), 0)
 
-    def update_value(self, state):
+    def warm_start(self, states, values):
         """
-        Update the value that state maps to in the value function.
+        Fill the value function with known values, e.g. the values of perfect play from a PerfectPlayDatabase
+        :param states: np.ndarray of int64
+        :param values: np.ndarray of float
+        :return: None
+        """
+        for state, value in zip(states.tolist(), values.tolist()):
+            self.value_function[self.get_key(state)] = value
+
+    def update_values(self):
+        """
+        Update the value of every state with a live eligibility trace in the value function.
         The update rule is defined as:
             V(s) = V(s) + learning_rate * td_error * e(s)
-        :param state: str
         :return: None
         """
-        self.value_function[state] += self.config["lr_critic"] * self.td_error * self.eligibility[state]
+        step = self.config["lr_critic"] * self.td_error * self.eligibility.scale
+        for state, trace in self.eligibility.items():
+            self.value_function[state] = self.value_function.get(state, 0) + step * trace
 
-    def update_eligibility(self, state, is_current_state=False):
+    def update_eligibility(self, state=None, is_current_state=False):
         """
-        Update the value that state maps to in eligibility.
+        Update eligibility.
         The update rule is defined as:
         if state is current state:
             e_t(s) = 1
         else:
-            e_t(s) = discount_factor * trace_decay_factor * e_{t-1}(s)
-        :param state: str
+            e_t(s) = discount_factor * trace_decay_factor * e_{t-1}(s)  for every live trace
+        :param state: int
         :param is_current_state: boolean
         :return: None
         """
         if is_current_state:
-            self.eligibility[state] = 1
+            self.eligibility.set(self.get_key(state))
         else:
-            self.eligibility[state] *= self.config["df_critic"] * self.config["dr_critic"]
+            self.eligibility.decay_all()
+
+    def get_value_stats(self):
+        """
+        Return the number of states in the value function and their average value
+        :return: int, float
+        """
+        return len(self.value_function), sum(self.value_function.values()) / max(len(self.value_function), 1)
 
     def reset_eligibility(self):
         """
         Reset eligibility table back to default
         """
-        self.eligibility = defaultdict(lambda: 0)
+        self.eligibility.reset()
 
     def report_critic_stats(self):
         """
         Log general stats about what the critic has calculated during its existence
         """
-        avg_value = sum(self.value_function.values()) / len(self.value_function.keys())
-        avg_eligibility = sum(self.eligibility.values()) / len(self.eligibility.keys())
-        avg_td_error = sum(self.td_errors) / len(self.td_errors)
+        total_values, avg_value = self.get_value_stats()
+        avg_eligibility = sum(self.eligibility.values()) / max(len(self.eligibility), 1)
+        td_errors = self.td_error_stats.summary()
         logging.info("Critic: ")
-        logging.info("\t Total value mapping: {}".format(len(self.value_function.keys())))
+        logging.info("\t Total value mapping: {}".format(total_values))
         logging.info("\t Avg value function values: {}".format(avg_value))
-        logging.info("\t Total eligibility values: {}".format(len(self.eligibility.keys())))
+        logging.info("\t Total eligibility values: {}".format(len(self.eligibility)))
         logging.info("\t Avg eligibility values: {}".format(avg_eligibility))
-        logging.info("\t Avg TD errors: {}".format(avg_td_error))
+        logging.info("\t Avg TD errors: {} (std {}, min {}, max {})".format(
+            td_errors["mean"], td_errors["std"], td_errors["min"], td_errors["max"]))
+        if isinstance(self.value_function, BoundedTable):
+            logging.info("\t Value entries: {} of max {}, {} inserted, {} evicted".format(
+                len(self.value_function), self.value_function.describe_limit(), self.value_function.insertions,
+                self.value_function.evictions))
 
 
-class NeuralCritic(Critic):
+class DenseTableCritic(TableCritic):
     """
-    A Critic using a neural network to map states to values
+    A Critic using a DenseTable of float32 values indexed by the board bitmask to map states to values
     """
 
-    def __init__(self, config):
-        super(NeuralCritic, self).__init__(config)
-        self.value_function = NNCritic(config["critic_layer_specs"])  # A neural network used as the value function (V)
-        self.eligibility = [torch.zeros(param.shape) for param in self.value_function.parameters()]
-
-        # Stats
-        self.values = []
+    def __init__(self, config, num_cells, symmetry=None):
+        super(DenseTableCritic, self).__init__(config, symmetry)
+        self.value_function = get_dense_table(config, num_cells)
 
     def get_value(self, state):
         """
         Given a state, return the estimated value of being in that state
-        :param state: str
+        :param state: int
         :return: float
         """
-        state = list(map(int, list(state)))
-        state = torch.FloatTensor(state)
-        value = self.value_function(state)
-        self.values.append(value.item())
-        return value
+        value = self.value_function.get(self.get_key(state))
+        return 0 if value is None else float(value)
 
-    def update_weights(self, state):
+    def warm_start(self, states, values):
         """
-        Given a state, forward it through the network then backprop to calculate grad.
-        Iterate over all weights and follow this update rule:
-            e_i = e_i + \frac{dV(s_t)}{dw_i}
-            w_i = w_i + learning_rate * td_error * e_i
+        Fill the value function with known values, e.g. the values of perfect play from a PerfectPlayDatabase
+        :param states: np.ndarray of int64
+        :param values: np.ndarray of float
+        :return: None
         """
-        self.value_function.zero_grad()
-        outputs = self.get_value(state)
-        outputs.backward()
-        for i, weight in enumerate(self.value_function.parameters()):
-            self.eligibility[i] += weight.grad
-            with torch.no_grad():
-                self.value_function.model[i].weight.add_(self.config["lr_critic"] * self.td_error * self.eligibility[i])
+        rows = [self.value_function.add_row(self.get_key(state)) for state in states.tolist()]
+        self.value_function.set(rows, values)
 
-    def update_eligibility(self, is_current_state=False):
+    def update_values(self):
         """
+        Update every state with a live eligibility trace in one scatter-add.
         The update rule is defined as:
-        if state is current state:
-            e_i = 1
-        else:
-            e_i = discount_factor * trace_decay_factor * e_i
+            V(s) = V(s) + learning_rate * td_error * e(s)
+        :return: None
         """
-        if is_current_state:
+        states = list(self.eligibility.items())
+        if not states:
             return
-        for i, _ in enumerate(self.eligibility):
-            self.eligibility[i] *= self.config["df_critic"] * self.config["dr_critic"]
+        rows = [self.value_function.add_row(state) for state, _ in states]
+        traces = np.array([trace for _, trace in states], dtype=self.value_function.values.dtype)
+        step = self.config["lr_critic"] * self.td_error * self.eligibility.scale
+        self.value_function.add(rows, step * traces)
 
-    def reset_eligibility(self):
-        """
-        Reset eligibility back to default
-        """
-        for i, _ in enumerate(self.eligibility):
-            self.eligibility[i].apply_(lambda x: 0)
-
-    def report_critic_stats(self):
+    def get_value_stats(self):
         """
-        Log general stats about what the critic has calculated during its existence
+        Return the number of states in the value function and their average value
+        :return: int, float
         """
-        avg_value = sum(self.values) / len(self.values)
-        avg_td_error = sum(self.td_errors) / len(self.td_errors)
-        logging.info("Critic: ")
-        logging.info("\t Total values calculated: {}".format(len(self.values)))
-        logging.info("\t Avg value function values: {}".format(avg_value))
-        logging.info(
-            "\t Avg TD errors: {}".format(avg_td_error if isinstance(avg_td_error, float) else avg_td_error.item()))
+        stored = self.value_function.stored()
+        return len(stored), float(stored.mean()) if len(stored) else 0.0
@@ -0,0 +1,78 @@
+class EligibilityTraces:
+    """
+    Sparse eligibility traces for the table based actor and critic.
+    Only live traces are stored. Decaying every trace is done lazily by multiplying one global scale factor, so the
+    stored value of a trace is its real value divided by the scale.
+    """
+
+    # When the scale gets this small, it is folded back into the stored values to avoid float underflow
+    MIN_SCALE = 1e-100
+
+    def __init__(self, decay, threshold=0.0):
+        self.decay = decay  # Factor all traces are multiplied with each step: discount_factor * trace_decay_factor
+        self.threshold = threshold  # Traces below this value are pruned
+        self.traces = {}  # Key mapping to its trace divided by scale, ordered from oldest to newest
+        self.scale = 1.0
+
+    def reset(self):
+        """
+        Remove all traces
+        :return: None
+        """
+        self.traces = {}
+        self.scale = 1.0
+
+    def set(self, key, value=1):
+        """
+        Set the trace of key to value, and move it to the newest end
+        :param key: hashable
+        :param value: float
+        :return: None
+        """
+        self.traces.pop(key, None)
+        self.traces[key] = value / self.scale
+
+    def get(self, key):
+        """
+        Return the trace of key, 0 if it is not live
+        :param key: hashable
+        :return: float
+        """
+        return self.traces.get(key, 0) * self.scale
+
+    def decay_all(self):
+        """
+        Decay every trace:
+            e_t(key) = discount_factor * trace_decay_factor * e_{t-1}(key)
+        All traces decay at the same rate, so the oldest traces are the smallest and pruning stops at the first
+        trace that is still above the threshold.
+        :return: None
+        """
+        self.scale *= self.decay
+        if self.scale < self.MIN_SCALE:
+            self.traces = {key: trace * self.scale for key, trace in self.traces.items()}
+            self.scale = 1.0
+        if self.threshold > 0:
+            limit = self.threshold / self.scale
+            while self.traces:
+                key = next(iter(self.traces))
+                if self.traces[key] >= limit:
+                    break
+                del self.traces[key]
+
+    def items(self):
+        """
+        Return (key, stored trace) for all live traces. Multiply the stored trace with scale to get the real value.
+        :return: ItemsView
+        """
+        return self.traces.items()
+
+    def values(self):
+        """
+        Return the real value of all live traces
+        :return: List[float]
+        """
+        return [trace * self.scale for trace in self.traces.values()]
+
+    def __len__(self):
+        return len(self.traces)
@@ -1,3 +1,4 @@
+import torch
 from torch import nn
 
 
@@ -29,6 +30,117 @@ class NNCritic(nn.Module):
         :return:
         """
         x = encoded_board
-        for i in range(len(self.model)):
-            x = self.relu(self.model[i](x))
+        for layer in self.model:
+            x = self.relu(layer(x))
         return x
+
+    def value_and_gradient(self, encoded_board):
+        """
+        Forward propagate one encoded board, and backpropagate by hand to get the gradient of the value with respect
+        to every weight matrix. The network is bias-free linear layers with ReLU and one output, so this is a few
+        matrix-vector products, which is much cheaper than going through autograd.
+        :param encoded_board: FloatTensor of one board
+        :return: Tensor, List[Tensor] - V(board) and dV/dw for each layer
+        """
+        with torch.no_grad():
+            inputs, pre_activations = [], []
+            x = encoded_board
+            for layer in self.model:
+                inputs.append(x)
+                z = layer.weight.mv(x)
+                pre_activations.append(z)
+                x = z.clamp(min=0)
+
+            gradients = [None] * len(inputs)
+            grad = (pre_activations[-1] > 0).to(x.dtype)
+            for i in reversed(range(len(inputs))):
+                gradients[i] = torch.outer(grad, inputs[i])
+                if i > 0:
+                    grad = self.model[i].weight.t().mv(grad) * (pre_activations[i - 1] > 0)
+        return x, gradients
+
+    def td_step(self, encoded_boards, targets, sample_weights, lr):
+        """
+        One gradient descent step on a mini-batch, with the gradients found by hand as in value_and_gradient:
+            loss = mean(sample_weight * (target - V(board))^2) / 2
+        For a single board with weight 1 this is the same update as the TD step w = w + lr * td_error * dV/dw.
+        :param encoded_boards: FloatTensor[B, num_cells]
+        :param targets: FloatTensor[B]
+        :param sample_weights: FloatTensor[B]
+        :param lr: float
+        :return: Tensor[B] - td errors (target - V(board)) before the step
+        """
+        with torch.no_grad():
+            inputs, pre_activations = [], []
+            x = encoded_boards
+            for layer in self.model:
+                inputs.append(x)
+                z = x.mm(layer.weight.t())
+                pre_activations.append(z)
+                x = z.clamp(min=0)
+
+            td_errors = targets - x.view(-1)
+            grad = (pre_activations[-1] > 0).to(x.dtype) * (lr / len(targets) * sample_weights * td_errors)[:, None]
+            for i in reversed(range(len(inputs))):
+                weight = self.model[i].weight
+                next_grad = grad.mm(weight) * (pre_activations[i - 1] > 0) if i > 0 else None
+                weight.add_(grad.t().mm(inputs[i]))
+                grad = next_grad
+        return td_errors
+
+
+class NNActor(nn.Module):
+    """
+    The Neural Network model used by the NeuralActor to map states to one logit per action id. The hidden layers are
+    bias-free linear layers with ReLU like NNCritic, and the output layer is linear and starts at zero, so every
+    action starts out equally desirable like in the table actor.
+    """
+
+    def __init__(self, layer_specs):
+        super(NNActor, self).__init__()
+        self.model = nn.Sequential()
+        self.relu = nn.ReLU(inplace=True)
+
+        for x in range(1, len(layer_specs)):
+            layer = nn.Linear(in_features=layer_specs[x - 1], out_features=layer_specs[x], bias=False)
+            self.model.add_module("Layer {}".format(x), layer)
+
+        self.model.apply(init_weights)
+        nn.init.zeros_(self.model[-1].weight)
+
+    def forward(self, encoded_board):
+        """
+        Forward propagate the binary encoded boards
+        :param encoded_board: FloatTensor[num_cells] or FloatTensor[N, num_cells]
+        :return: FloatTensor - logit of every action id
+        """
+        x = encoded_board
+        for layer in self.model[:-1]:
+            x = self.relu(layer(x))
+        return self.model[-1](x)
+
+    def logits_and_gradient(self, encoded_board, output_gradient):
+        """
+        Forward propagate one encoded board, and backpropagate by hand the gradient of sum(output_gradient * logits)
+        with respect to every weight matrix
+        :param encoded_board: FloatTensor of one board
+        :param output_gradient: function - given the logits, returns the gradient with respect to them
+        :return: Tensor, List[Tensor] - logits and the gradient of each layer
+        """
+        with torch.no_grad():
+            inputs, pre_activations = [], []
+            x = encoded_board
+            for layer in self.model:
+                inputs.append(x)
+                z = layer.weight.mv(x)
+                pre_activations.append(z)
+                x = z.clamp(min=0)
+            logits = pre_activations[-1]
+
+            gradients = [None] * len(inputs)
+            grad = output_gradient(logits)
+            for i in reversed(range(len(inputs))):
+                gradients[i] = torch.outer(grad, inputs[i])
+                if i > 0:
+                    grad = self.model[i].weight.t().mv(grad) * (pre_activations[i - 1] > 0)
+        return logits, gradients
@@ -0,0 +1,190 @@
+from actor import Actor
+from models import NNActor
+from bitboard import encode_state, encode_states
+from utils import is_empty
+import numpy as np
+import logging
+import random
+import torch
+
+
+class NeuralActor(Actor):
+    """
+    An Actor using a policy network that maps the encoded board to one logit per action id in the board's
+    ActionCatalog. Illegal actions are masked out, and actions are picked epsilon-greedy on the logits or sampled from
+    their softmax. The network is trained with the TD error of the critic on eligibility traces of the gradient of
+    log pi(action | state), so its memory is fixed by the network size instead of the number of SAPs visited.
+    """
+
+    def __init__(self, player, config):
+        super(NeuralActor, self).__init__(player, config)
+        board = player.board
+        num_cells, num_actions = len(board.get_cells()), len(board.action_catalog)
+        self.policy = NNActor([num_cells] + list(config.get("actor_layer_specs", [64])) + [num_actions])
+        self.weights = list(self.policy.parameters())
+        self.eligibility = [torch.zeros(weight.shape) for weight in self.weights]  # One trace per weight
+        self.symmetry = None  # The network generalizes over symmetric boards by itself
+        self.softmax = config.get("sampling", "epsilon") == "softmax"  # Sample from the softmax of the logits
+        self.temperature = config.get("temperature", 1.0)
+        self.need_mask, self.to_mask, _ = board.action_catalog.get_masks()
+
+        # Input buffers the board encodings are written into, shared with the tensors fed to the network
+        self.input_buffer = np.zeros(num_cells, dtype=np.float32)
+        self.input = torch.from_numpy(self.input_buffer)
+        self.batch_buffer = np.zeros((0, num_cells), dtype=np.float32)
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled actor, e.g. a Trainer moved between the processes of sweep.py. Pickling copies the input
+        buffer and its tensor separately, so the tensor is made a view of the buffer again.
+        """
+        self.__dict__.update(state)
+        self.input = torch.from_numpy(self.input_buffer)
+
+    def encode(self, state):
+        """
+        Write the board bitmask into the input buffer. The returned tensor is overwritten by the next call.
+        :param state: int
+        :return: FloatTensor
+        """
+        encode_state(state, self.input_buffer)
+        return self.input
+
+    def encode_batch(self, states):
+        """
+        Write many board bitmasks into the rows of the batch buffer, growing it if it is too small.
+        The returned tensor is overwritten by the next call.
+        :param states: List[int] | np.ndarray[N]
+        :return: FloatTensor[N, num_cells]
+        """
+        if len(states) > len(self.batch_buffer):
+            self.batch_buffer = np.zeros((max(len(states), 2 * len(self.batch_buffer)), self.input_buffer.size),
+                                         dtype=np.float32)
+        return torch.from_numpy(encode_states(states, self.batch_buffer))
+
+    def get_logits(self, state):
+        """
+        Return the logit of every action id in state
+        :param state: int
+        :return: np.ndarray[num_actions]
+        """
+        with torch.no_grad():
+            return self.policy(self.encode(state)).numpy()
+
+    def get_legal_ids(self, state):
+        """
+        Return the ids of the legal actions in state, found from the jump masks of the board
+        :param state: int
+        :return: np.ndarray of int
+        """
+        return np.flatnonzero((self.need_mask & state == self.need_mask) & (self.to_mask & state == 0))
+
+    def get_desirability(self, state, action):
+        """
+        Get the desirability (logit) for doing an action in a state
+        :param state: int
+        :param action: Action
+        :return: float
+        """
+        return float(self.get_logits(state)[action.action_id])
+
+    def get_action(self, state, legal_actions=None):
+        """
+        Given a state of the board, return the appropriate action: a softmax sample over the legal logits, or
+        epsilon-greedy on them where ties go to the first legal action like in Actor.get_action. With epsilon 0,
+        e.g. in the last episode, the greedy action is always taken.
+        :param state: int
+        :param legal_actions: List[Action] - legal actions in state, asked from the player if not given
+        :return: Action
+        """
+        if legal_actions is None:
+            legal_actions = self.player.get_legal_actions()
+        if is_empty(legal_actions):
+            return None
+        self.total_actions += 1
+        if not self.softmax and random.random() < self.epsilon:
+            self.random_actions += 1
+            return random.choice(legal_actions)
+        logits = self.get_logits(state)[[action.action_id for action in legal_actions]]
+        if not self.softmax or self.epsilon == 0:
+            return legal_actions[int(np.argmax(logits))]
+        probabilities = np.exp((logits - logits.max()) / self.temperature)
+        cumulative = np.cumsum(probabilities)
+        index = int(np.searchsorted(cumulative, random.random() * cumulative[-1], side="right"))
+        return legal_actions[min(index, len(legal_actions) - 1)]
+
+    def get_actions(self, states, legal_mask):
+        """
+        Return the action id chosen for each of many boards with one forward pass. Softmax samples are drawn with the
+        Gumbel-max trick, and the random actions of epsilon-greedy are a masked argmax over random scores.
+        :param states: np.ndarray[N] of int
+        :param legal_mask: np.ndarray[N, num_actions] of bool
+        :return: np.ndarray[N] of int - action ids, -1 for boards without legal actions
+        """
+        has_legal = legal_mask.any(axis=1)
+        with torch.no_grad():
+            scores = self.policy(self.encode_batch(states)).numpy().copy()
+        if self.softmax and self.epsilon != 0:
+            scores = scores / self.temperature - np.log(-np.log(np.random.random(scores.shape)))
+        elif not self.softmax:
+            is_random = np.random.random(len(states)) < self.epsilon
+            scores[is_random] = np.random.random((int(is_random.sum()), scores.shape[1]))
+            self.random_actions += int((is_random & has_legal).sum())
+        action_ids = np.argmax(np.where(legal_mask, scores, -np.inf), axis=1)
+        action_ids[~has_legal] = -1
+        self.total_actions += int(has_legal.sum())
+        return action_ids
+
+    def update_policy(self):
+        """
+        Update every weight by its eligibility trace.
+        Update rule is defined as:
+            w_i = w_i + learning_rate * td_error * e_i
+        :return: None
+        """
+        with torch.no_grad():
+            torch._foreach_add_(self.weights, self.eligibility, alpha=self.config["lr_actor"] * float(self.td_error))
+
+    def update_eligibility(self, state=None, action=None, is_current_state=False):
+        """
+        Update eligibility. For the current SAP the gradient of the log probability of the action under the softmax
+        of the legal logits is added, otherwise all traces decay.
+        The update rules are defined as:
+            e_i = e_i + \frac{d log pi(action | state)}{dw_i}
+            e_i = discount_factor * trace_factor * e_i
+        :param state: int
+        :param action: int - action id
+        :param is_current_state: boolean
+        :return: None
+        """
+        if not is_current_state:
+            torch._foreach_mul_(self.eligibility, self.config["df_actor"] * self.config["dr_actor"])
+            return
+        legal_ids = torch.from_numpy(self.get_legal_ids(state))
+
+        def log_probability_gradient(logits):
+            # d log softmax(logits / T)[action] / d logits = (onehot(action) - softmax(logits / T)) / T, legal only
+            gradient = torch.zeros_like(logits)
+            gradient[legal_ids] = -torch.softmax(logits[legal_ids] / self.temperature, dim=0)
+            gradient[action] += 1
+            return gradient / self.temperature
+
+        _, gradients = self.policy.logits_and_gradient(self.encode(state), log_probability_gradient)
+        torch._foreach_add_(self.eligibility, gradients)
+
+    def reset_eligibility(self):
+        """
+        Reset eligibility to default
+        :return: None
+        """
+        torch._foreach_zero_(self.eligibility)
+
+    def report_actor_stats(self):
+        """
+        Log general stats of what the Actor has done during its existence
+        """
+        p = int(100 * self.random_actions / max(self.total_actions, 1))
+        logging.info("ACTOR: ")
+        logging.info("\t {} of {} actions where random: {}%".format(self.random_actions, self.total_actions, p))
+        logging.info("\t Epsilon ended at: {}".format(self.last_epsilon))
+        logging.info("\t Policy network weights: {}".format(sum(weight.numel() for weight in self.weights)))
@@ -0,0 +1,196 @@
+from critic import Critic
+from models import NNCritic
+from bitboard import encode_state, encode_states
+from running_stats import RunningStats, format_window
+from replay import ReplayBuffer
+import numpy as np
+import logging
+import torch
+
+
+class NeuralCritic(Critic):
+    """
+    A Critic using a neural network to map states to values
+    """
+
+    def __init__(self, config):
+        super(NeuralCritic, self).__init__(config)
+        self.value_function = NNCritic(config["critic_layer_specs"])  # A neural network used as the value function (V)
+        self.num_inputs = config["critic_layer_specs"][0]  # One input per cell on the board
+        self.weights = list(self.value_function.parameters())
+        self.eligibility = [torch.zeros(weight.shape) for weight in self.weights]  # One trace per weight
+        self.current = None  # (state, dV(state)/dw) from the last TD error, reused by update_weights
+
+        # Input buffers the board encodings are written into, shared with the tensors fed to the network
+        self.input_buffer = np.zeros(self.num_inputs, dtype=np.float32)
+        self.input = torch.from_numpy(self.input_buffer)
+        self.batch_buffer = np.zeros((0, self.num_inputs), dtype=np.float32)
+
+        # Update mode: "trace" does one TD(lambda) step per transition, "replay" stores transitions and trains on
+        # mini-batches sampled from them
+        self.replay = None
+        if config.get("update", "trace") == "replay":
+            self.replay = ReplayBuffer(config.get("replay_capacity", 100000), config.get("replay_prioritized", False),
+                                       config.get("replay_alpha", 0.6), config.get("replay_beta", 0.4))
+            self.batch_size = config.get("replay_batch_size", 64)
+            self.replay_every = config.get("replay_every", 1)  # Transitions between mini-batch updates
+            self.steps = 0
+
+        # Stats
+        self.value_stats = RunningStats()
+
+    def __setstate__(self, state):
+        """
+        Restore a pickled critic, e.g. a Trainer moved between the processes of sweep.py. Pickling copies the input
+        buffer and its tensor separately, so the tensor is made a view of the buffer again.
+        """
+        self.__dict__.update(state)
+        self.input = torch.from_numpy(self.input_buffer)
+
+    def encode(self, state):
+        """
+        Write the board bitmask into the input buffer, with a 1 for every cell holding a peg.
+        The returned tensor is overwritten by the next call.
+        :param state: int
+        :return: FloatTensor
+        """
+        encode_state(state, self.input_buffer)
+        return self.input
+
+    def encode_batch(self, states):
+        """
+        Write many board bitmasks into the rows of the batch buffer, growing it if it is too small.
+        The returned tensor is overwritten by the next call.
+        :param states: List[int] | np.ndarray[N]
+        :return: FloatTensor[N, num_inputs]
+        """
+        if len(states) > len(self.batch_buffer):
+            self.batch_buffer = np.zeros((max(len(states), 2 * len(self.batch_buffer)), self.num_inputs),
+                                         dtype=np.float32)
+        return torch.from_numpy(encode_states(states, self.batch_buffer))
+
+    def get_value(self, state):
+        """
+        Given a state, return the estimated value of being in that state. No graph is built, as the TD error only
+        needs the value itself.
+        :param state: int
+        :return: float
+        """
+        with torch.no_grad():
+            value = self.value_function(self.encode(state)).item()
+        self.value_stats.add(value)
+        return value
+
+    def get_values(self, states):
+        """
+        Return the estimated values of many states with one forward pass
+        :param states: List[int] | np.ndarray[N]
+        :return: np.ndarray[N]
+        """
+        with torch.no_grad():
+            return self.value_function(self.encode_batch(states)).view(-1).numpy()
+
+    def get_td_error(self, current_state, future_state, reward, done=False):
+        """
+        Same TD error as Critic.get_td_error:
+            td_error = reward + discount_factor * V(s') - V(s)
+        The gradient of V(s) is found in the same pass and kept, so update_weights does not need to recompute it.
+        In replay mode both values come from one batched forward pass, and the transition is stored in the buffer.
+        :param current_state: int
+        :param future_state: int
+        :param reward: int
+        :param done: boolean
+        :return: float
+        """
+        if self.replay is not None:
+            current_value, future_value = self.get_values([current_state, future_state]).tolist()
+            self.replay.add(current_state, reward, future_state, done)
+            self.value_stats.add(current_value)
+            self.value_stats.add(future_value)
+            self.td_error = reward + self.config["df_critic"] * future_value - current_value
+            self.td_error_stats.add(self.td_error)
+            return self.td_error
+        current_value, gradients = self.value_function.value_and_gradient(self.encode(current_state))
+        self.current = (current_state, gradients)
+        current_value, future_value = current_value.item(), self.get_value(future_state)
+        self.value_stats.add(current_value)
+        self.td_error = reward + self.config["df_critic"] * future_value - current_value
+        self.td_error_stats.add(self.td_error)
+        return self.td_error
+
+    def update_weights(self, state):
+        """
+        One TD(lambda) step for the state the TD error was computed in. The gradient of V(state) is taken once per
+        step, and all traces and weights are updated with fused foreach ops:
+            e_i = discount_factor * trace_decay_factor * e_i + \frac{dV(s_t)}{dw_i}
+            w_i = w_i + learning_rate * td_error * e_i
+        In replay mode, a mini-batch update is done every replay_every transitions instead.
+        :param state: int
+        :return: None
+        """
+        if self.replay is not None:
+            self.steps += 1
+            if self.steps % self.replay_every == 0 and len(self.replay) >= self.batch_size:
+                self.train_batch()
+            return
+        if self.current is not None and self.current[0] == state:
+            gradients = self.current[1]
+        else:
+            _, gradients = self.value_function.value_and_gradient(self.encode(state))
+        self.current = None
+        self.update_eligibility()
+        torch._foreach_add_(self.eligibility, gradients)
+        with torch.no_grad():
+            torch._foreach_add_(self.weights, self.eligibility, alpha=self.config["lr_critic"] * self.td_error)
+
+    def train_batch(self):
+        """
+        One gradient step on a mini-batch sampled from the replay buffer, towards the TD(0) targets of the network
+        before the step, with no bootstrapping from the states that ended an episode:
+            target = reward + discount_factor * V(s') * (1 - done)
+        The new TD errors of the sampled transitions become their priorities.
+        :return: None
+        """
+        indices, states, rewards, next_states, dones, weights = self.replay.sample(self.batch_size)
+        targets = rewards + self.config["df_critic"] * self.get_values(next_states) * ~dones
+        td_errors = self.value_function.td_step(self.encode_batch(states), torch.from_numpy(targets),
+                                                torch.from_numpy(weights), self.config["lr_critic"])
+        self.replay.update_priorities(indices, td_errors.numpy())
+
+    def update_eligibility(self, is_current_state=False):
+        """
+        Decay all traces. The gradient of the current state is added by update_weights.
+        The update rule is defined as:
+            e_i = discount_factor * trace_decay_factor * e_i
+        :param is_current_state: boolean
+        :return: None
+        """
+        if is_current_state:
+            return
+        torch._foreach_mul_(self.eligibility, self.config["df_critic"] * self.config["dr_critic"])
+
+    def reset_eligibility(self):
+        """
+        Reset eligibility back to default
+        """
+        torch._foreach_zero_(self.eligibility)
+
+    def report_interval_stats(self):
+        """
+        Log the stats of the TD errors and estimated values since the last call
+        :return: None
+        """
+        super(NeuralCritic, self).report_interval_stats()
+        logging.info("\t " + format_window("Values", self.value_stats.pop_window()))
+
+    def report_critic_stats(self):
+        """
+        Log general stats about what the critic has calculated during its existence
+        """
+        values, td_errors = self.value_stats.summary(), self.td_error_stats.summary()
+        logging.info("Critic: ")
+        logging.info("\t Total values calculated: {}".format(values["count"]))
+        logging.info("\t Avg value function values: {} (std {}, min {}, max {})".format(
+            values["mean"], values["std"], values["min"], values["max"]))
+        logging.info("\t Avg TD errors: {} (std {}, min {}, max {})".format(
+            td_errors["mean"], td_errors["std"], td_errors["min"], td_errors["max"]))
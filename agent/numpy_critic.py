@@ -0,0 +1,273 @@
+from critic import Critic
+from bitboard import encode_state, encode_states
+from running_stats import RunningStats, format_window
+from replay import ReplayBuffer
+import numpy as np
+import logging
+
+
+class NumpyMLP:
+    """
+    The same network as NNCritic (bias-free linear layers, each followed by ReLU) with hand-written NumPy forward and
+    backward passes. All weight matrices are views into one contiguous float32 buffer, so whole-network updates are
+    single array operations. The state_dict uses the keys and shapes of NNCritic, so weights move between the two.
+    """
+
+    def __init__(self, layer_specs):
+        shapes = [(layer_specs[x], layer_specs[x - 1]) for x in range(1, len(layer_specs))]
+        self.buffer = np.zeros(sum(rows * columns for rows, columns in shapes), dtype=np.float32)
+        self.weights = self.get_views(self.buffer, shapes)
+        for weight in self.weights:
+            # Xavier uniform, as init_weights does for NNCritic
+            bound = np.sqrt(6 / sum(weight.shape))
+            weight[:] = np.random.uniform(-bound, bound, weight.shape)
+        self.gradient_buffer = np.zeros_like(self.buffer)  # dV/dw of the last value_and_gradient
+        self.gradients = self.get_views(self.gradient_buffer, shapes)
+
+    @staticmethod
+    def get_views(buffer, shapes):
+        """
+        Split a flat buffer into consecutive matrices of the given shapes
+        :param buffer: np.ndarray
+        :param shapes: List[(int, int)]
+        :return: List[np.ndarray]
+        """
+        views, start = [], 0
+        for rows, columns in shapes:
+            views.append(buffer[start:start + rows * columns].reshape(rows, columns))
+            start += rows * columns
+        return views
+
+    def __call__(self, encoded_boards):
+        """
+        Forward propagate one encoded board or a batch of them
+        :param encoded_boards: np.ndarray[num_cells] or np.ndarray[N, num_cells] of float32
+        :return: np.ndarray[1] or np.ndarray[N, 1]
+        """
+        x = encoded_boards
+        for weight in self.weights:
+            x = np.maximum(x @ weight.T, 0)
+        return x
+
+    def value_and_gradient(self, encoded_board):
+        """
+        Forward propagate one encoded board, and backpropagate by hand to get the gradient of the value with respect
+        to every weight matrix, written into the gradient buffer
+        :param encoded_board: np.ndarray[num_cells] of float32
+        :return: float, np.ndarray - V(board) and the flat gradient buffer
+        """
+        inputs, pre_activations = [], []
+        x = encoded_board
+        for weight in self.weights:
+            inputs.append(x)
+            z = weight @ x
+            pre_activations.append(z)
+            x = np.maximum(z, 0)
+
+        grad = (pre_activations[-1] > 0).astype(np.float32)
+        for i in reversed(range(len(inputs))):
+            np.multiply.outer(grad, inputs[i], out=self.gradients[i])
+            if i > 0:
+                grad = (self.weights[i].T @ grad) * (pre_activations[i - 1] > 0)
+        return float(x[0]), self.gradient_buffer
+
+    def td_step(self, encoded_boards, targets, sample_weights, lr):
+        """
+        One gradient descent step on a mini-batch, the same update as NNCritic.td_step:
+            loss = mean(sample_weight * (target - V(board))^2) / 2
+        :param encoded_boards: np.ndarray[B, num_cells]
+        :param targets: np.ndarray[B]
+        :param sample_weights: np.ndarray[B]
+        :param lr: float
+        :return: np.ndarray[B] - td errors (target - V(board)) before the step
+        """
+        inputs, pre_activations = [], []
+        x = encoded_boards
+        for weight in self.weights:
+            inputs.append(x)
+            z = x @ weight.T
+            pre_activations.append(z)
+            x = np.maximum(z, 0)
+
+        td_errors = targets - x[:, 0]
+        grad = (pre_activations[-1] > 0) * (np.float32(lr / len(targets)) * sample_weights * td_errors)[:, None]
+        for i in reversed(range(len(inputs))):
+            next_grad = (grad @ self.weights[i]) * (pre_activations[i - 1] > 0) if i > 0 else None
+            self.weights[i] += grad.T @ inputs[i]
+            grad = next_grad
+        return td_errors
+
+    def state_dict(self):
+        """
+        Return the weights under the keys NNCritic uses
+        :return: dict
+        """
+        return {"model.Layer {}.weight".format(i + 1): weight.copy() for i, weight in enumerate(self.weights)}
+
+    def load_state_dict(self, state_dict):
+        """
+        Load weights given by state_dict, or by NNCritic.state_dict
+        :param state_dict: dict
+        :return: None
+        """
+        for i, weight in enumerate(self.weights):
+            weight[:] = np.asarray(state_dict["model.Layer {}.weight".format(i + 1)], dtype=np.float32)
+
+
+class NumpyCritic(Critic):
+    """
+    A Critic with the same network, updates and config as NeuralCritic, computed with NumPy instead of torch. For
+    networks this small the torch dispatch overhead is larger than the math, so each step is much faster.
+    """
+
+    def __init__(self, config):
+        super(NumpyCritic, self).__init__(config)
+        self.value_function = NumpyMLP(config["critic_layer_specs"])  # A neural network used as the value function
+        self.num_inputs = config["critic_layer_specs"][0]  # One input per cell on the board
+        self.eligibility = np.zeros_like(self.value_function.buffer)  # One trace per weight, laid out like them
+        self.current = None  # State of the gradient kept in the gradient buffer of the value function
+
+        # Input buffers the board encodings are written into
+        self.input_buffer = np.zeros(self.num_inputs, dtype=np.float32)
+        self.batch_buffer = np.zeros((0, self.num_inputs), dtype=np.float32)
+
+        # Update mode, as in NeuralCritic
+        self.replay = None
+        if config.get("update", "trace") == "replay":
+            self.replay = ReplayBuffer(config.get("replay_capacity", 100000), config.get("replay_prioritized", False),
+                                       config.get("replay_alpha", 0.6), config.get("replay_beta", 0.4))
+            self.batch_size = config.get("replay_batch_size", 64)
+            self.replay_every = config.get("replay_every", 1)  # Transitions between mini-batch updates
+            self.steps = 0
+
+        # Stats
+        self.value_stats = RunningStats()
+
+    def encode(self, state):
+        """
+        Write the board bitmask into the input buffer. The returned array is overwritten by the next call.
+        :param state: int
+        :return: np.ndarray[num_inputs]
+        """
+        return encode_state(state, self.input_buffer)
+
+    def encode_batch(self, states):
+        """
+        Write many board bitmasks into the rows of the batch buffer, growing it if it is too small.
+        The returned array is overwritten by the next call.
+        :param states: List[int] | np.ndarray[N]
+        :return: np.ndarray[N, num_inputs]
+        """
+        if len(states) > len(self.batch_buffer):
+            self.batch_buffer = np.zeros((max(len(states), 2 * len(self.batch_buffer)), self.num_inputs),
+                                         dtype=np.float32)
+        return encode_states(states, self.batch_buffer)
+
+    def get_value(self, state):
+        """
+        Given a state, return the estimated value of being in that state
+        :param state: int
+        :return: float
+        """
+        value = float(self.value_function(self.encode(state))[0])
+        self.value_stats.add(value)
+        return value
+
+    def get_values(self, states):
+        """
+        Return the estimated values of many states with one forward pass
+        :param states: List[int] | np.ndarray[N]
+        :return: np.ndarray[N]
+        """
+        return self.value_function(self.encode_batch(states))[:, 0]
+
+    def get_td_error(self, current_state, future_state, reward, done=False):
+        """
+        Same TD error as NeuralCritic.get_td_error, keeping the gradient of V(s) for update_weights
+        :param current_state: int
+        :param future_state: int
+        :param reward: int
+        :param done: boolean
+        :return: float
+        """
+        if self.replay is not None:
+            current_value, future_value = self.get_values([current_state, future_state]).tolist()
+            self.replay.add(current_state, reward, future_state, done)
+            self.value_stats.add(current_value)
+            self.value_stats.add(future_value)
+        else:
+            current_value, _ = self.value_function.value_and_gradient(self.encode(current_state))
+            self.current = current_state
+            future_value = self.get_value(future_state)
+            self.value_stats.add(current_value)
+        self.td_error = reward + self.config["df_critic"] * future_value - current_value
+        self.td_error_stats.add(self.td_error)
+        return self.td_error
+
+    def update_weights(self, state):
+        """
+        One TD(lambda) step for the state the TD error was computed in, on the flat weight and trace buffers:
+            e_i = discount_factor * trace_decay_factor * e_i + \frac{dV(s_t)}{dw_i}
+            w_i = w_i + learning_rate * td_error * e_i
+        In replay mode, a mini-batch update is done every replay_every transitions instead.
+        :param state: int
+        :return: None
+        """
+        if self.replay is not None:
+            self.steps += 1
+            if self.steps % self.replay_every == 0 and len(self.replay) >= self.batch_size:
+                self.train_batch()
+            return
+        if self.current != state:
+            self.value_function.value_and_gradient(self.encode(state))
+        self.current = None
+        self.update_eligibility()
+        self.eligibility += self.value_function.gradient_buffer
+        self.value_function.buffer += np.float32(self.config["lr_critic"] * self.td_error) * self.eligibility
+
+    def train_batch(self):
+        """
+        One gradient step on a mini-batch sampled from the replay buffer, as in NeuralCritic.train_batch
+        :return: None
+        """
+        indices, states, rewards, next_states, dones, weights = self.replay.sample(self.batch_size)
+        targets = rewards + self.config["df_critic"] * self.get_values(next_states) * ~dones
+        td_errors = self.value_function.td_step(self.encode_batch(states), targets.astype(np.float32), weights,
+                                                self.config["lr_critic"])
+        self.replay.update_priorities(indices, td_errors)
+
+    def update_eligibility(self, is_current_state=False):
+        """
+        Decay all traces. The gradient of the current state is added by update_weights.
+        :param is_current_state: boolean
+        :return: None
+        """
+        if is_current_state:
+            return
+        self.eligibility *= np.float32(self.config["df_critic"] * self.config["dr_critic"])
+
+    def reset_eligibility(self):
+        """
+        Reset eligibility back to default
+        """
+        self.eligibility[:] = 0
+
+    def report_interval_stats(self):
+        """
+        Log the stats of the TD errors and estimated values since the last call
+        :return: None
+        """
+        super(NumpyCritic, self).report_interval_stats()
+        logging.info("\t " + format_window("Values", self.value_stats.pop_window()))
+
+    def report_critic_stats(self):
+        """
+        Log general stats about what the critic has calculated during its existence
+        """
+        values, td_errors = self.value_stats.summary(), self.td_error_stats.summary()
+        logging.info("Critic: ")
+        logging.info("\t Total values calculated: {}".format(values["count"]))
+        logging.info("\t Avg value function values: {} (std {}, min {}, max {})".format(
+            values["mean"], values["std"], values["min"], values["max"]))
+        logging.info("\t Avg TD errors: {} (std {}, min {}, max {})".format(
+            td_errors["mean"], td_errors["std"], td_errors["min"], td_errors["max"]))
@@ -1,7 +1,5 @@
-from actor import Actor
-from utils import get_critic
+from utils import get_actor, get_critic
 import logging
-from critic import NeuralCritic, TableCritic
 
 
 class ReinforcementLearner:
@@ -9,8 +7,9 @@ class ReinforcementLearner:
     def __init__(self, player, config):
         logging.info("Setting up the ReinforcementLearner")
         self.config = config
-        self.actor = Actor(player, config["Actor"])
-        self.critic = get_critic(config["Critic"])
+        self.actor = get_actor(player, config["Actor"])
+        self.critic = get_critic(config["Critic"], len(player.board.get_cells()), player.board.symmetry)
+        self.timer = None  # PhaseTimer of the update phases, set by the Trainer when timing is on
 
     def get_actor(self):
         """
@@ -26,29 +25,38 @@ class ReinforcementLearner:
         """
         return self.critic
 
-    def update(self, state, action):
+    def update(self, state):
         """
-        Step 6 of the actor-critic algorithm require update in actor and critic for all SAP in current episode
-        :param state: str
-        :param action: Action
+        Step 6 of the actor-critic algorithm require update in actor and critic for all SAP in current episode.
+        The table critic and the actor only hold traces for the states and SAPs that are still eligible, so they
+        update and decay those directly instead of walking the whole episode. The neural critic does one TD(lambda)
+        step with the gradient of V(state).
+        :param state: int - the state the TD error was computed for
         :return: None
         """
+        timer = self.timer
+        t = timer and timer.now()
         # Update Critic
         if self.config["Critic"]["table_lookup"]:
-            self.critic.update_value(state)
-            self.critic.update_eligibility(state)
+            self.critic.update_values()
+            self.critic.update_eligibility()
         else:
             self.critic.update_weights(state)
-            self.critic.update_eligibility()
+        if timer:
+            t = timer.lap("critic_update", t)
         # Update Actor
-        self.actor.update_policy(state, action)
-        self.actor.update_eligibility(state, action)
+        self.actor.update_policy()
+        if timer:
+            t = timer.lap("actor_update", t)
+        self.actor.update_eligibility()
+        if timer:
+            timer.lap("actor_trace_decay", t)
 
     def set_eligibility(self, state, action, is_current_state):
         """
         Set the eligibility for both critic and actor to 1 using their update functions
-        :param state: str
-        :param action: Action
+        :param state: int
+        :param action: int - action id
         :param is_current_state: boolean
         :return: None
         """
@@ -0,0 +1,106 @@
+import numpy as np
+
+
+class ReplayBuffer:
+    """
+    Ring buffer of transitions (state, reward, next state, done) in preallocated NumPy arrays, with states stored as
+    board bitmasks. When full, the oldest transition is overwritten.
+
+    Sampling is uniform, or prioritized (Schaul et al., proportional variant): transition i is drawn with probability
+    p_i^alpha / sum_k p_k^alpha, where p_i is its last absolute TD error, and the bias this adds is corrected with the
+    importance sampling weights (N * P(i))^-beta, normalized by their max. New transitions get the highest priority
+    seen so far, so each is sampled at least about once.
+    """
+
+    def __init__(self, capacity, prioritized=False, alpha=0.6, beta=0.4, min_priority=1e-3):
+        self.capacity = capacity
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.size = 0  # Number of transitions stored
+        self.next = 0  # Slot the next transition is written to
+
+        self.prioritized = prioritized
+        self.priorities = np.zeros(capacity, dtype=np.float64) if prioritized else None  # p_i^alpha of every slot
+        self.alpha = alpha
+        self.beta = beta
+        self.min_priority = min_priority  # Keeps transitions with a TD error of 0 possible to sample
+        self.max_priority = 1.0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, reward, next_state, done):
+        """
+        Store a transition, overwriting the oldest one if the buffer is full
+        :param state: int
+        :param reward: float
+        :param next_state: int
+        :param done: boolean
+        :return: None
+        """
+        i = self.next
+        self.states[i], self.rewards[i], self.next_states[i], self.dones[i] = state, reward, next_state, done
+        if self.prioritized:
+            self.priorities[i] = self.max_priority
+        self.next = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def sample(self, batch_size):
+        """
+        Draw batch_size transitions, with replacement
+        :param batch_size: int
+        :return: np.ndarray - slots, states, rewards, next states, dones and importance sampling weights (all ones
+        when sampling uniformly) of the transitions
+        """
+        if not self.prioritized:
+            indices = np.random.randint(0, self.size, size=batch_size)
+            weights = np.ones(batch_size, dtype=np.float32)
+        else:
+            cumulative = np.cumsum(self.priorities[:self.size])
+            indices = np.searchsorted(cumulative, np.random.random(batch_size) * cumulative[-1], side="right")
+            indices = np.minimum(indices, self.size - 1)
+            probabilities = self.priorities[indices] / cumulative[-1]
+            weights = (self.size * probabilities) ** -self.beta
+            weights = (weights / weights.max()).astype(np.float32)
+        return (indices, self.states[indices], self.rewards[indices], self.next_states[indices], self.dones[indices],
+                weights)
+
+    def update_priorities(self, indices, td_errors):
+        """
+        Set the priorities of sampled transitions from their new TD errors
+        :param indices: np.ndarray of int - slots given by sample
+        :param td_errors: np.ndarray of float
+        :return: None
+        """
+        if not self.prioritized:
+            return
+        priorities = np.maximum(np.abs(td_errors), self.min_priority) ** self.alpha
+        self.priorities[indices] = priorities
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+
+    def to_arrays(self):
+        """
+        Return the stored transitions as arrays, e.g. for a checkpoint
+        :return: dict
+        """
+        arrays = {"states": self.states[:self.size].copy(), "rewards": self.rewards[:self.size].copy(),
+                  "next_states": self.next_states[:self.size].copy(), "dones": self.dones[:self.size].copy(),
+                  "next": self.next, "max_priority": self.max_priority}
+        if self.prioritized:
+            arrays["priorities"] = self.priorities[:self.size].copy()
+        return arrays
+
+    def load_arrays(self, arrays):
+        """
+        Restore the transitions given by to_arrays
+        :param arrays: dict
+        :return: None
+        """
+        self.size = len(arrays["states"])
+        self.states[:self.size], self.rewards[:self.size] = arrays["states"], arrays["rewards"]
+        self.next_states[:self.size], self.dones[:self.size] = arrays["next_states"], arrays["dones"]
+        self.next, self.max_priority = arrays["next"], arrays["max_priority"]
+        if self.prioritized:
+            self.priorities[:self.size] = arrays["priorities"]
@@ -0,0 +1,176 @@
+import numpy as np
+
+# Inner edges of the histogram bins: signed decades from 1e-3 to 1e4, values in (-1e-3, 1e-3) share the middle bin
+DECADES = 10.0 ** np.arange(-3, 5)
+HISTOGRAM_EDGES = np.concatenate([-DECADES[::-1], DECADES])
+
+
+class Moments:
+    """
+    Count, mean, sum of squared deviations, min and max of a stream of values, merged a batch at a time
+    (Chan et al.'s parallel form of Welford's algorithm)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def merge(self, count, mean, m2, min_, max_):
+        """
+        Merge the moments of a batch of values into these
+        :return: None
+        """
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+        self.min = min(self.min, min_)
+        self.max = max(self.max, max_)
+
+    def get_variance(self):
+        """
+        Return the population variance of the values
+        :return: float
+        """
+        return self.m2 / self.count if self.count else 0.0
+
+    def summary(self):
+        """
+        Return the count, mean, standard deviation, min and max of the values
+        :return: dict
+        """
+        if not self.count:
+            return {"count": 0, "mean": 0.0, "std": 0.0, "min": 0.0, "max": 0.0}
+        return {"count": self.count, "mean": self.mean, "std": float(np.sqrt(self.get_variance())),
+                "min": self.min, "max": self.max}
+
+    def to_list(self):
+        """
+        Return the moments as a list of floats
+        :return: List[float]
+        """
+        return [self.count, self.mean, self.m2, self.min, self.max]
+
+    def load_list(self, moments):
+        """
+        Set the moments from a list given by to_list
+        :param moments: List[float]
+        :return: None
+        """
+        count, self.mean, self.m2, self.min, self.max = moments
+        self.count = int(count)
+
+
+class RunningStats:
+    """
+    Statistics of a stream of floats in constant memory: mean, variance, min and max over the whole run, and the same
+    plus a histogram over the current window, e.g. the episodes since the last log line. Values are collected in a
+    short buffer of Python floats and merged into the moments with NumPy when it is full or the stats are read, which
+    keeps add cheap enough to call every step.
+    """
+
+    def __init__(self, buffer_size=4096, edges=HISTOGRAM_EDGES):
+        self.buffer = []
+        self.buffer_size = buffer_size
+        self.edges = edges
+        self.total = Moments()  # Moments of every value added
+        self.window = Moments()  # Moments of the values added since the last pop_window
+        self.histogram = np.zeros(len(edges) + 1, dtype=np.int64)  # Bin counts of the window
+
+    def __len__(self):
+        return self.total.count + len(self.buffer)
+
+    def add(self, value):
+        """
+        Add a value to the stats. Tensors must be converted with .item() first, only floats are kept.
+        :param value: float
+        :return: None
+        """
+        self.buffer.append(float(value))
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Merge the buffered values into the total and window moments and the histogram
+        :return: None
+        """
+        if not self.buffer:
+            return
+        values = np.array(self.buffer)
+        self.buffer = []
+        mean = values.mean()
+        batch = (len(values), float(mean), float(np.square(values - mean).sum()), float(values.min()),
+                 float(values.max()))
+        self.total.merge(*batch)
+        self.window.merge(*batch)
+        self.histogram += np.bincount(np.searchsorted(self.edges, values, side="right"),
+                                      minlength=len(self.histogram))
+
+    def get_mean(self):
+        """
+        Return the mean of every value added
+        :return: float
+        """
+        self.flush()
+        return self.total.mean
+
+    def summary(self):
+        """
+        Return the count, mean, standard deviation, min and max of every value added
+        :return: dict
+        """
+        self.flush()
+        return self.total.summary()
+
+    def pop_window(self):
+        """
+        Return the stats of the window, with the histogram as (lower edge, upper edge, count) of every non-empty
+        bin, and start a new window
+        :return: dict
+        """
+        self.flush()
+        window = self.window.summary()
+        lower = np.concatenate([[-np.inf], self.edges])
+        upper = np.concatenate([self.edges, [np.inf]])
+        window["histogram"] = [(float(lower[i]), float(upper[i]), int(self.histogram[i]))
+                               for i in np.flatnonzero(self.histogram)]
+        self.window = Moments()
+        self.histogram[:] = 0
+        return window
+
+    def to_arrays(self):
+        """
+        Return the stats as arrays, e.g. for a checkpoint. The buffered values are kept as they are instead of being
+        merged, as merging them early rounds the moments differently than a run that was never saved.
+        :return: dict
+        """
+        return {"total": np.array(self.total.to_list()), "window": np.array(self.window.to_list()),
+                "histogram": self.histogram.copy(), "buffer": np.array(self.buffer, dtype=np.float64)}
+
+    def load_arrays(self, arrays):
+        """
+        Restore the stats from arrays given by to_arrays
+        :param arrays: dict
+        :return: None
+        """
+        self.buffer = arrays["buffer"].tolist()
+        self.total.load_list(arrays["total"].tolist())
+        self.window.load_list(arrays["window"].tolist())
+        self.histogram[:] = arrays["histogram"]
+
+
+def format_window(name, window):
+    """
+    Return a log line of the stats given by RunningStats.pop_window
+    :param name: str
+    :param window: dict
+    :return: str
+    """
+    histogram = ", ".join("[{:g}, {:g}): {}".format(lower, upper, count) for lower, upper, count in window["histogram"])
+    return "{}: {} values, mean {:.4g}, std {:.4g}, min {:.4g}, max {:.4g} - {}".format(
+        name, window["count"], window["mean"], window["std"], window["min"], window["max"], histogram)
@@ -0,0 +1,442 @@
+from collections import OrderedDict
+from multiprocessing.shared_memory import SharedMemory
+import heapq
+import sys
+import numpy as np
+
+
+def get_table_bytes(num_cells, row_shape, dtype):
+    """
+    Return the size of a table with a row for every state of a board
+    :param num_cells: int
+    :param row_shape: tuple
+    :param dtype: np.dtype
+    :return: int
+    """
+    return (1 << num_cells) * int(np.prod(row_shape)) * np.dtype(dtype).itemsize
+
+
+class DenseTable:
+    """
+    A float32 (or dtype) table with one row per board state, indexed by the board bitmask.
+    When every state of the board fits within max_direct_states, and a row for each of them within max_direct_bytes,
+    the bitmask is used directly as the row index. This allocates all 2^num_cells rows up front, however few states
+    are reachable. Larger boards give each visited state the next free row, and the array grows as more states are
+    visited.
+    """
+
+    def __init__(self, num_cells, row_shape=(), max_direct_states=1 << 20, dtype=np.float32,
+                 max_direct_bytes=1 << 27):
+        self.row_shape = row_shape  # () for a value per state, (num_actions,) for a row of SAP values
+        self.direct = (1 << num_cells) <= max_direct_states and \
+            get_table_bytes(num_cells, row_shape, dtype) <= max_direct_bytes
+        if self.direct:
+            self.values = np.zeros((1 << num_cells,) + row_shape, dtype=dtype)
+            self.written = np.zeros(1 << num_cells, dtype=bool)  # Rows that have been added to
+            self.rows = None
+        else:
+            self.values = np.zeros((1024,) + row_shape, dtype=dtype)
+            self.written = None  # Every row given by add_row is written to
+            self.rows = {}  # Board bitmask mapping to its row in values
+
+    def get_row(self, state):
+        """
+        Return the row index of state, -1 if the state has never been stored
+        :param state: int
+        :return: int
+        """
+        if self.direct:
+            return state
+        return self.rows.get(state, -1)
+
+    def add_row(self, state):
+        """
+        Return the row index of state, giving it a new row if it has none
+        :param state: int
+        :return: int
+        """
+        if self.direct:
+            return state
+        row = self.rows.get(state)
+        if row is None:
+            row = len(self.rows)
+            if row == len(self.values):
+                self.values = np.concatenate([self.values, np.zeros_like(self.values)])
+            self.rows[state] = row
+        return row
+
+    def get(self, state):
+        """
+        Return the stored row of state, or None if it has never been stored. Reading never adds a row.
+        :param state: int
+        :return: float | np.ndarray
+        """
+        row = self.get_row(state)
+        if row < 0:
+            return None
+        return self.values[row]
+
+    def add(self, rows, deltas, columns=None):
+        """
+        Scatter-add deltas into the table
+        :param rows: List[int] - row indices given by add_row
+        :param deltas: np.ndarray
+        :param columns: List[int] - column of each delta, for tables with a row of values per state
+        :return: None
+        """
+        index = rows if columns is None else (rows, columns)
+        np.add.at(self.values, index, deltas)
+        if self.written is not None:
+            self.written[rows] = True
+
+    def set(self, rows, values):
+        """
+        Overwrite rows of the table
+        :param rows: List[int] - row indices given by add_row
+        :param values: np.ndarray
+        :return: None
+        """
+        self.values[rows] = values
+        if self.written is not None:
+            self.written[rows] = True
+
+    def stored(self):
+        """
+        Return the rows that have been written to
+        :return: np.ndarray
+        """
+        if self.written is not None:
+            return self.values[self.written]
+        if self.direct:
+            # Shared tables: the rows written by other processes are not known, take the ones that are not zero
+            touched = self.values != 0
+            if self.row_shape:
+                touched = touched.any(axis=1)
+            return self.values[touched]
+        return self.values[:len(self.rows)]
+
+    def to_arrays(self):
+        """
+        Return the contents of the table as arrays, for checkpoints
+        :return: dict
+        """
+        if self.direct:
+            arrays = {"values": self.values}
+            if self.written is not None:
+                arrays["written"] = self.written
+            return arrays
+        return {"values": self.values[:len(self.rows)],
+                "rows": np.fromiter(self.rows.keys(), dtype=np.uint64, count=len(self.rows))}
+
+    def load_arrays(self, arrays):
+        """
+        Replace the contents of the table with arrays from to_arrays
+        :param arrays: dict
+        :return: None
+        """
+        values = arrays["values"]
+        if self.direct:
+            self.values[:] = values
+            if self.written is not None:
+                self.written[:] = arrays["written"]
+            return
+        self.values = np.zeros((max(len(values), 1024),) + self.row_shape, dtype=self.values.dtype)
+        self.values[:len(values)] = values
+        self.rows = {state: row for row, state in enumerate(arrays["rows"].tolist())}
+
+
+class SharedDenseTable(DenseTable):
+    """
+    A DenseTable whose values live in shared memory, so several worker processes can update the same table without
+    locks (Hogwild). Concurrent scatter-adds may overwrite each other now and then, which the TD updates tolerate.
+    Only direct indexing by bitmask is supported, as there is no shared mapping from states to rows.
+    Which rows were written is not shared either, so stored gives the rows that are not zero.
+    """
+
+    def __init__(self, num_cells, row_shape=(), name=None, max_direct_states=1 << 20, dtype=np.float32,
+                 max_direct_bytes=1 << 27):
+        if (1 << num_cells) > max_direct_states:
+            raise ValueError("A shared table needs one row per state, but 2^{} states is more than max_direct_states "
+                             "({})".format(num_cells, max_direct_states))
+        size = get_table_bytes(num_cells, row_shape, dtype)
+        if size > max_direct_bytes:
+            raise ValueError("A shared table of 2^{} rows of shape {} needs {} bytes, more than max_direct_bytes "
+                             "({})".format(num_cells, row_shape, size, max_direct_bytes))
+        shape = (1 << num_cells,) + row_shape
+        self.row_shape = row_shape
+        self.direct = True
+        self.rows = None
+        self.written = None
+        if name is None:
+            self.shared_memory = SharedMemory(create=True, size=int(np.prod(shape)) * np.dtype(dtype).itemsize)
+        else:
+            self.shared_memory = SharedMemory(name=name)
+        self.values = np.ndarray(shape, dtype=dtype, buffer=self.shared_memory.buf)
+        if name is None:
+            self.values.fill(0)
+
+    @property
+    def name(self):
+        """
+        Name other processes attach to the shared memory with
+        :return: str
+        """
+        return self.shared_memory.name
+
+    def close(self):
+        """
+        Detach this process from the shared memory
+        :return: None
+        """
+        self.values = None
+        self.shared_memory.close()
+
+    def unlink(self):
+        """
+        Free the shared memory. Called once by the process that created it, after all workers are done.
+        :return: None
+        """
+        self.shared_memory.unlink()
+
+
+def get_dense_table(config, num_cells, row_shape=()):
+    """
+    Return the DenseTable selected by the "table" key of an Actor or Critic config. A "shared" table attaches to the
+    shared memory named by "shared_memory" in the config.
+    :param config: dict
+    :param num_cells: int
+    :param row_shape: tuple
+    :return: DenseTable
+    """
+    max_direct_states = config.get("max_direct_states", 1 << 20)
+    max_direct_bytes = config.get("max_direct_bytes", 1 << 27)
+    dtype = np.dtype(config.get("table_dtype", "float32"))
+    if config.get("table") == "shared":
+        return SharedDenseTable(num_cells, row_shape, config["shared_memory"], max_direct_states, dtype,
+                                max_direct_bytes)
+    return DenseTable(num_cells, row_shape, max_direct_states, dtype, max_direct_bytes)
+
+
+class BoundedTable:
+    """
+    A dict-like table holding a bounded number of keys, for policies and value functions that would otherwise grow
+    without limit. When the table is full, the least recently visited keys ("lru") or the keys with the lowest visit
+    count ("lfu") are evicted. Reading a missing key never inserts it.
+
+    "lfu" ages the counts (LFU with dynamic aging): a new key starts at the count of the last evicted key plus one
+    instead of at 1, so it is not always the first to go, and keys that were visited often long ago are evicted in
+    time. max_bytes is checked against the estimated size (entry_bytes) of every entry held, not of the first one.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, eviction="lru", evict_fraction=0.05):
+        if eviction not in ("lru", "lfu"):
+            raise ValueError("Unknown eviction policy '{}'. Use 'lru' or 'lfu'.".format(eviction))
+        if max_entries is None and max_bytes is None:
+            raise ValueError("BoundedTable needs max_entries or max_bytes")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0  # Estimated size of the entries held, kept when max_bytes is set
+        self.eviction = eviction
+        self.evict_fraction = evict_fraction  # Share of the table evicted at once when using "lfu"
+        self.table = OrderedDict()  # Key mapping to value, ordered from least to most recently visited
+        self.visits = {}  # Key mapping to its visit count, only used by "lfu"
+        self.age = 0  # Count of the last key evicted by "lfu", the count new keys start above
+
+        # Stats
+        self.evictions = 0
+        self.insertions = 0
+
+    @staticmethod
+    def entry_bytes(key, value):
+        """
+        Estimate the memory used by one entry: the key, the value and the slots of the dicts holding them
+        :param key: hashable
+        :param value: float
+        :return: int
+        """
+        size = sys.getsizeof(key) + sys.getsizeof(value) + 100
+        if isinstance(key, tuple):
+            size += sum(sys.getsizeof(part) for part in key)
+        return size
+
+    def visit(self, key):
+        """
+        Mark an existing key as visited
+        :param key: hashable
+        :return: None
+        """
+        if self.eviction == "lru":
+            self.table.move_to_end(key)
+        else:
+            self.visits[key] += 1
+
+    def get(self, key, default=None):
+        """
+        Return the value of key, or default if the key is not in the table. Never inserts the key.
+        :param key: hashable
+        :param default: float
+        :return: float
+        """
+        if key not in self.table:
+            return default
+        self.visit(key)
+        return self.table[key]
+
+    def peek(self, key, default=None):
+        """
+        Return the value of key like get, without counting it as a visit, e.g. when evaluating a policy
+        :param key: hashable
+        :param default: float
+        :return: float
+        """
+        return self.table.get(key, default)
+
+    def __getitem__(self, key):
+        value = self.table[key]
+        self.visit(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self.table:
+            self.table[key] = value
+            self.visit(key)
+            return
+        size = 0
+        if self.max_bytes is not None:
+            size = self.entry_bytes(key, value)
+        while self.table and self.is_full(size):
+            self.evict()
+        self.table[key] = value
+        self.bytes += size
+        if self.eviction == "lfu":
+            self.visits[key] = self.age + 1
+        self.insertions += 1
+
+    def is_full(self, size):
+        """
+        Return True if a new entry of the given estimated size does not fit
+        :param size: int
+        :return: boolean
+        """
+        if self.max_entries is not None and len(self.table) >= self.max_entries:
+            return True
+        return self.max_bytes is not None and self.bytes + size > self.max_bytes
+
+    def describe_limit(self):
+        """
+        Return the size limit of the table, for stats
+        :return: str
+        """
+        limits = []
+        if self.max_entries is not None:
+            limits.append("{} entries".format(self.max_entries))
+        if self.max_bytes is not None:
+            limits.append("{} of {} bytes".format(self.bytes, self.max_bytes))
+        return " and ".join(limits)
+
+    def evict(self):
+        """
+        Make room for a new key. "lru" drops the least recently visited key, "lfu" drops the evict_fraction of keys
+        with the lowest visit count in one go, so the cost of finding them is shared by many insertions.
+        :return: None
+        """
+        if self.eviction == "lru":
+            key, value = self.table.popitem(last=False)
+            self.remove_bytes(key, value)
+            self.evictions += 1
+            return
+        n = max(1, int(len(self.table) * self.evict_fraction))
+        for key, visits in heapq.nsmallest(n, self.visits.items(), key=lambda item: item[1]):
+            self.remove_bytes(key, self.table.pop(key))
+            del self.visits[key]
+            self.age = max(self.age, visits)
+        self.evictions += n
+
+    def remove_bytes(self, key, value):
+        """
+        Subtract the estimated size of an evicted entry
+        :param key: hashable
+        :param value: float
+        :return: None
+        """
+        if self.max_bytes is not None:
+            self.bytes -= self.entry_bytes(key, value)
+
+    def __contains__(self, key):
+        return key in self.table
+
+    def __len__(self):
+        return len(self.table)
+
+    def keys(self):
+        return self.table.keys()
+
+    def values(self):
+        return self.table.values()
+
+    def items(self):
+        return self.table.items()
+
+    def to_arrays(self):
+        """
+        Return the contents of the table as arrays, for checkpoints. Keys are kept in visit order, which the lru
+        eviction depends on.
+        :return: dict
+        """
+        arrays = dict_to_arrays(self.table)
+        arrays["visits"] = np.array([self.visits[key] for key in self.table], dtype=np.int64) if self.visits else None
+        arrays["counters"] = (self.max_entries, self.evictions, self.insertions, self.age)
+        return arrays
+
+    def load_arrays(self, arrays):
+        """
+        Replace the contents of the table with arrays from to_arrays
+        :param arrays: dict
+        :return: None
+        """
+        self.table = OrderedDict()
+        arrays_to_dict(arrays, self.table)
+        self.visits = {} if arrays["visits"] is None else dict(zip(self.table.keys(), arrays["visits"].tolist()))
+        self.max_entries, self.evictions, self.insertions, self.age = arrays["counters"]
+        if self.max_bytes is not None:
+            self.bytes = sum(self.entry_bytes(key, value) for key, value in self.table.items())
+
+
+def dict_to_arrays(table):
+    """
+    Return the keys and values of a dict table as arrays. Keys are states, or (state, action id) SAPs, and states are
+    stored as uint64 so every board up to 64 cells fits.
+    :param table: dict
+    :return: dict
+    """
+    keys = list(table.keys())
+    arrays = {"values": np.fromiter(table.values(), dtype=np.float64, count=len(keys))}
+    if keys and isinstance(keys[0], tuple):
+        arrays["states"] = np.array([state for state, _ in keys], dtype=np.uint64)
+        arrays["actions"] = np.array([action for _, action in keys], dtype=np.int32)
+    else:
+        arrays["states"] = np.array(keys, dtype=np.uint64)
+    return arrays
+
+
+def arrays_to_dict(arrays, table):
+    """
+    Add the keys and values from dict_to_arrays to a dict table
+    :param arrays: dict
+    :param table: dict
+    :return: None
+    """
+    states = arrays["states"].tolist()
+    keys = zip(states, arrays["actions"].tolist()) if "actions" in arrays else states
+    table.update(zip(keys, arrays["values"].tolist()))
+
+
+def get_table(config):
+    """
+    Return the dict-like table selected by the "table" key of an Actor or Critic config
+    :param config: dict
+    :return: dict | BoundedTable
+    """
+    if config.get("table", "dict") == "bounded":
+        return BoundedTable(config.get("max_entries"), config.get("max_bytes"), config.get("eviction", "lru"))
+    return {}
@@ -0,0 +1,67 @@
+"""
+Time full training episodes with the neural critic on the task_3 and task_4 configs.
+
+Example:
+    python benchmarks/neural_critic.py --episodes 100 --out neural_critic.json --baseline old_neural_critic.json
+    python benchmarks/neural_critic.py --backend numpy --out numpy_critic.json --baseline neural_critic.json
+"""
+from utils import load_config, set_seed
+from trainer import Trainer
+import argparse
+import logging
+import json
+import time
+
+CONFIGS = ["configs/task_3_nn.yaml", "configs/task_4_nn.yaml"]
+
+
+def time_episodes(config_path, episodes, warmup, seed, repeat, backend=None):
+    """
+    Return the mean wall time of an episode after warmup episodes, taking the fastest of repeat seeded runs
+    :param config_path: str
+    :param episodes: int
+    :param warmup: int
+    :param seed: int
+    :param repeat: int
+    :param backend: str - critic backend, the config's own if None
+    :return: dict
+    """
+    config = load_config(config_path)
+    config["Training"]["display"] = False
+    if backend:
+        config["Critic"]["backend"] = backend
+    config["Training"]["episodes"] = warmup + episodes + 1  # Keep epsilon decaying during the timed episodes
+    timings = []
+    for _ in range(repeat):
+        set_seed(seed)
+        trainer = Trainer(config)
+        trainer.train(warmup)
+        start = time.perf_counter()
+        trainer.train(warmup + episodes)
+        timings.append(time.perf_counter() - start)
+    return {"ms_per_episode": 1000 * min(timings) / episodes, "episodes": episodes, "repeat": repeat}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Neural critic episode time")
+    parser.add_argument("--episodes", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per config, the fastest one is reported")
+    parser.add_argument("--backend", choices=["torch", "numpy"], help="Critic backend, the config's own by default")
+    parser.add_argument("--out", default="neural_critic.json")
+    parser.add_argument("--baseline", help="Earlier output of this benchmark to compare against")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = {path: time_episodes(path, args.episodes, args.warmup, args.seed, args.repeat, args.backend)
+               for path in CONFIGS}
+    baseline = json.load(open(args.baseline)) if args.baseline else {}
+    for path, result in results.items():
+        line = "{}: {:.2f} ms/episode".format(path, result["ms_per_episode"])
+        if path in baseline:
+            result["speedup"] = baseline[path]["ms_per_episode"] / result["ms_per_episode"]
+            line += " ({:.1f}x baseline)".format(result["speedup"])
+        print(line)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
@@ -0,0 +1,246 @@
+"""
+Benchmark suite for the engine, the agent and full training episodes, on triangles of size 4-8 and diamonds of size
+4-6. Every board is set up from the task configs of its type, with the size, start hole and network input changed.
+Results are written as JSON, and compared against an earlier run when --baseline is given.
+
+Example:
+    python benchmarks/suite.py --out bench.json
+    python benchmarks/suite.py --out bench_new.json --baseline bench.json
+"""
+from utils import load_config, set_seed
+from trainer import Trainer
+import numpy as np
+import argparse
+import platform
+import logging
+import random
+import copy
+import json
+import time
+
+# Base configs of each board type, and the boards to benchmark
+BASE_CONFIGS = {"t": ("configs/task_2_table.yaml", "configs/task_2_nn.yaml"),
+                "d": ("configs/task_4_table.yaml", "configs/task_4_nn.yaml")}
+BOARDS = [("t", size) for size in range(4, 9)] + [("d", size) for size in range(4, 7)]
+
+# Metrics where a lower value is better, all others are better when higher
+LOWER_IS_BETTER = ("_us", "_ms")
+
+
+def make_config(path, board_type, size, engine):
+    """
+    Return the config at path, changed to a board of the given type and size
+    :param path: str
+    :param board_type: str
+    :param size: int
+    :param engine: str - engine of the board, the config's own if None
+    :return: dict
+    """
+    config = load_config(path)
+    board = config["Board"]
+    board["type"], board["size"] = board_type, size
+    board["holes_loc"] = [[0, 0]] if board_type == "t" else [[size // 2 - 1, size // 2]]
+    if engine:
+        board["engine"] = engine
+    if not config["Critic"]["table_lookup"]:
+        num_cells = size * (size + 1) // 2 if board_type == "t" else size * size
+        config["Critic"]["critic_layer_specs"] = [num_cells] + list(config["Critic"]["critic_layer_specs"][1:])
+    config["Training"]["display"] = False
+    return config
+
+
+def set_board_state(trainer, state):
+    """
+    Put the board of trainer in state, and let the player pick it up
+    :param trainer: Trainer
+    :param state: int
+    :return: None
+    """
+    trainer.board.set_state(state)
+    trainer.player.reset()
+
+
+def collect_transitions(trainer, num_transitions):
+    """
+    Play random episodes and return every transition in them
+    :param trainer: Trainer
+    :param num_transitions: int
+    :return: List[(int, List[Action], Action, int, int, boolean)] - state, legal actions, action, new state, reward
+    and done of each transition
+    """
+    sim_world, player = trainer.sim_world, trainer.player
+    if not player.get_legal_actions():
+        raise ValueError("The start state of the board has no legal actions")
+    transitions = []
+    while len(transitions) < num_transitions:
+        sim_world.reset()
+        state, legal_actions, done = trainer.board.get_state(), player.get_legal_actions(), False
+        while not done and legal_actions:
+            action = random.choice(legal_actions)
+            new_state, reward, done, new_legal_actions = sim_world.step(action)
+            transitions.append((state, legal_actions, action, new_state, reward, done))
+            state, legal_actions = new_state, new_legal_actions
+    sim_world.reset()
+    return transitions[:num_transitions]
+
+
+def time_calls(function, items, calls):
+    """
+    Return the mean time in microseconds of function(item), calling it calls times in a row for every item
+    :param function: function
+    :param items: list
+    :param calls: int
+    :return: float
+    """
+    start = time.perf_counter()
+    for item in items:
+        for _ in range(calls):
+            function(item)
+    return 1e6 * (time.perf_counter() - start) / (len(items) * calls)
+
+
+def bench_engine(trainer, transitions, calls):
+    """
+    Time the board and player: the encodings of the board in many states, and performing an action followed by
+    Player.get_legal_actions
+    :return: dict
+    """
+    board, player = trainer.board, trainer.player
+    results = {"to_binary_string_encoding_us": 0.0, "num_pegs_on_board_us": 0.0}
+    for state, _, _, _, _, _ in transitions:
+        set_board_state(trainer, state)
+        results["to_binary_string_encoding_us"] += time_calls(lambda _: board.to_binary_string_encoding(), [0], calls)
+        results["num_pegs_on_board_us"] += time_calls(lambda _: board.num_pegs_on_board(), [0], calls)
+
+    elapsed = 0.0
+    for state, _, action, _, _, _ in transitions:
+        set_board_state(trainer, state)
+        start = time.perf_counter()
+        player.perform_action(action)
+        player.get_legal_actions()
+        elapsed += time.perf_counter() - start
+    results = {key: value / len(transitions) for key, value in results.items()}
+    results["perform_and_get_legal_actions_us"] = 1e6 * elapsed / len(transitions)
+    return results
+
+
+def bench_actor(trainer, transitions, calls):
+    """
+    Time greedy Actor.get_action in the states of the transitions
+    :return: dict
+    """
+    actor = trainer.actor
+    actor.set_epsilon(0)
+    items = [(state, legal_actions) for state, legal_actions, _, _, _, _ in transitions]
+    return {"actor_get_action_us": time_calls(lambda item: actor.get_action(*item), items, calls)}
+
+
+def bench_td_update(trainer, transitions, name):
+    """
+    Time one learning step of the actor-critic algorithm for every transition: the TD error of the critic and the
+    updates and eligibility of both actor and critic. Traces are reset at the end of every episode, as in training.
+    :return: dict
+    """
+    rl, actor, critic = trainer.rl, trainer.actor, trainer.critic
+    rl.reset_eligibility()
+    start = time.perf_counter()
+    for state, _, action, new_state, reward, done in transitions:
+        actor.set_td_error(critic.get_td_error(state, new_state, reward, done))
+        rl.update(state)
+        rl.set_eligibility(state, action.action_id, is_current_state=True)
+        if done:
+            rl.reset_eligibility()
+    return {"{}_td_update_us".format(name): 1e6 * (time.perf_counter() - start) / len(transitions)}
+
+
+def bench_episodes(config, episodes, seed, name):
+    """
+    Time full training episodes, after a few warmup episodes
+    :return: dict
+    """
+    config = copy.deepcopy(config)
+    config["Training"]["episodes"] = episodes + 6  # Keep epsilon decaying during the timed episodes
+    set_seed(seed)
+    trainer = Trainer(config)
+    trainer.train(5)
+    start = time.perf_counter()
+    trainer.train(5 + episodes)
+    elapsed = time.perf_counter() - start
+    return {"{}_episode_ms".format(name): 1000 * elapsed / episodes, "{}_episodes_per_s".format(name): episodes / elapsed}
+
+
+def bench_board(board_type, size, args):
+    """
+    Run every benchmark on one board, keeping the best value of each metric over args.repeat runs
+    :return: dict
+    """
+    table_config, nn_config = (make_config(path, board_type, size, args.engine) for path in BASE_CONFIGS[board_type])
+    best = {}
+    for _ in range(args.repeat):
+        set_seed(args.seed)
+        trainer = Trainer(table_config)
+        transitions = collect_transitions(trainer, args.transitions)
+        results = bench_engine(trainer, transitions, args.calls)
+        results.update(bench_actor(trainer, transitions, args.calls))
+        results.update(bench_td_update(trainer, transitions, "table"))
+        set_seed(args.seed)
+        results.update(bench_td_update(Trainer(nn_config), transitions, "neural"))
+        results.update(bench_episodes(table_config, args.episodes, args.seed, "table"))
+        results.update(bench_episodes(nn_config, max(1, args.episodes // 10), args.seed, "neural"))
+        for key, value in results.items():
+            keep = min if key.endswith(LOWER_IS_BETTER) else max
+            best[key] = keep(best.get(key, value), value)
+    best["num_cells"] = len(trainer.board.get_cells())
+    best["num_actions"] = len(trainer.board.action_catalog)
+    return best
+
+
+def compare(results, baseline):
+    """
+    Print the speedup of every metric against the baseline, > 1 meaning faster than the baseline
+    :param results: dict
+    :param baseline: dict
+    :return: None
+    """
+    for board, metrics in results["boards"].items():
+        if board not in baseline["boards"]:
+            continue
+        old = baseline["boards"][board]
+        speedups = []
+        for key, value in metrics.items():
+            if key in old and key.endswith(LOWER_IS_BETTER + ("_per_s",)) and value and old[key]:
+                speedups.append("{} {:.2f}x".format(key, old[key] / value if key.endswith(LOWER_IS_BETTER)
+                                                    else value / old[key]))
+        print("{}: {}".format(board, ", ".join(speedups)))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark suite for the engine, agent and training episodes")
+    parser.add_argument("--boards", nargs="*", help="Boards to run, e.g. t5 d4. All boards by default")
+    parser.add_argument("--engine", choices=["cells", "bitboard"], help="Board engine, the config's own by default")
+    parser.add_argument("--transitions", type=int, default=500, help="Random transitions timed per board")
+    parser.add_argument("--calls", type=int, default=20, help="Calls per state of the cheap functions")
+    parser.add_argument("--episodes", type=int, default=100, help="Timed table episodes, a tenth for the neural critic")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per board, the best value of each metric is kept")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="benchmark.json")
+    parser.add_argument("--baseline", help="Earlier output of this suite to compare against")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    boards = [(name[0], int(name[1:])) for name in args.boards] if args.boards else BOARDS
+    results = {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(),
+                 "time": time.strftime("%Y-%m-%d %H:%M:%S"), "args": vars(args)},
+        "boards": {},
+    }
+    for board_type, size in boards:
+        name = "{}{}".format(board_type, size)
+        results["boards"][name] = bench_board(board_type, size, args)
+        print("{}: {}".format(name, ", ".join("{} {:.3g}".format(key, value)
+                                              for key, value in results["boards"][name].items())))
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
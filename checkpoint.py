@@ -0,0 +1,150 @@
+"""
+Checkpoints of a Trainer between episodes. Tables are stored as NumPy arrays, network weights as a state_dict, and
+everything is pickled into one file that is written atomically, so a crash while saving never leaves a broken
+checkpoint behind.
+"""
+from agent.tables import dict_to_arrays, arrays_to_dict
+from utils import get_rng_state, set_rng_state
+import numpy as np
+import pickle
+import os
+
+CHECKPOINT_VERSION = 3
+
+
+def table_to_arrays(table):
+    """
+    Return the contents of an actor or critic table as arrays
+    :param table: dict | BoundedTable | DenseTable
+    :return: dict
+    """
+    if isinstance(table, dict):
+        return dict_to_arrays(table)
+    return table.to_arrays()
+
+
+def arrays_to_table(arrays, table):
+    """
+    Fill an empty table with the contents given by table_to_arrays
+    :param arrays: dict
+    :param table: dict | BoundedTable | DenseTable
+    :return: None
+    """
+    if isinstance(table, dict):
+        arrays_to_dict(arrays, table)
+    else:
+        table.load_arrays(arrays)
+
+
+def get_trainer_state(trainer):
+    """
+    Return everything needed to continue the training of trainer after the episode it last finished
+    :param trainer: Trainer
+    :return: dict
+    """
+    actor, critic = trainer.actor, trainer.critic
+    state = {
+        "version": CHECKPOINT_VERSION,
+        "config": trainer.config,
+        "episode": trainer.episode,
+        "remaining_pegs_pr_episode": np.array(trainer.remaining_pegs_pr_episode, dtype=np.int16),
+        "rewards": np.array(trainer.rewards, dtype=np.int64),
+        "current_episode": trainer.current_episode,
+        "rng": get_rng_state(),
+        "actor": {
+            "epsilon": actor.epsilon,
+            "last_epsilon": actor.last_epsilon,
+            "random_actions": actor.random_actions,
+            "total_actions": actor.total_actions,
+        },
+        "critic": {"td_error_stats": critic.td_error_stats.to_arrays()},
+    }
+    if actor.config.get("table_lookup", True):
+        state["actor"]["policy"] = table_to_arrays(actor.policy)
+    else:
+        state["actor"]["state_dict"] = actor.policy.state_dict()
+    if critic.config["table_lookup"]:
+        state["critic"]["value_function"] = table_to_arrays(critic.value_function)
+    else:
+        state["critic"]["state_dict"] = critic.value_function.state_dict()
+        state["critic"]["value_stats"] = critic.value_stats.to_arrays()
+        if critic.replay is not None:
+            state["critic"]["replay"] = critic.replay.to_arrays()
+            state["critic"]["steps"] = critic.steps
+
+    pruner = trainer.sim_world.pruner
+    if pruner is not None:
+        state["pruner"] = {
+            "states": np.fromiter(pruner.cache.keys(), dtype=np.uint64, count=len(pruner.cache)),
+            "dead": np.fromiter(pruner.cache.values(), dtype=bool, count=len(pruner.cache)),
+            "pruned": pruner.pruned,
+        }
+    return state
+
+
+def set_trainer_state(trainer, state):
+    """
+    Restore a newly created Trainer to the state given by get_trainer_state
+    :param trainer: Trainer - created from state["config"]
+    :param state: dict
+    :return: None
+    """
+    if state["version"] != CHECKPOINT_VERSION:
+        raise ValueError("Checkpoint version {} is not supported, expected {}".format(
+            state["version"], CHECKPOINT_VERSION))
+    trainer.episode = state["episode"]
+    trainer.remaining_pegs_pr_episode = state["remaining_pegs_pr_episode"].tolist()
+    trainer.rewards = state["rewards"].tolist()
+    trainer.current_episode = state["current_episode"]
+
+    actor, actor_state = trainer.actor, state["actor"]
+    if "policy" in actor_state:
+        arrays_to_table(actor_state["policy"], actor.policy)
+    else:
+        actor.policy.load_state_dict(actor_state["state_dict"])
+    actor.epsilon, actor.last_epsilon = actor_state["epsilon"], actor_state["last_epsilon"]
+    actor.random_actions, actor.total_actions = actor_state["random_actions"], actor_state["total_actions"]
+
+    critic, critic_state = trainer.critic, state["critic"]
+    critic.td_error_stats.load_arrays(critic_state["td_error_stats"])
+    if "value_function" in critic_state:
+        arrays_to_table(critic_state["value_function"], critic.value_function)
+    else:
+        critic.value_function.load_state_dict(critic_state["state_dict"])
+        critic.value_stats.load_arrays(critic_state["value_stats"])
+        if "replay" in critic_state:
+            critic.replay.load_arrays(critic_state["replay"])
+            critic.steps = critic_state["steps"]
+
+    if "pruner" in state:
+        pruner = trainer.sim_world.pruner
+        pruner.cache = dict(zip(state["pruner"]["states"].tolist(), state["pruner"]["dead"].tolist()))
+        pruner.pruned = state["pruner"]["pruned"]
+    set_rng_state(state["rng"])
+
+
+def write_checkpoint(path, state):
+    """
+    Pickle state to path atomically: the checkpoint is written to a temporary file next to path, flushed to disk and
+    then renamed over path
+    :param path: str
+    :param state: dict
+    :return: None
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = "{}.tmp".format(path)
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_checkpoint(path):
+    """
+    Load a checkpoint written by write_checkpoint
+    :param path: str
+    :return: dict
+    """
+    with open(path, "rb") as f:
+        return pickle.load(f)
@@ -1,18 +1,88 @@
+import numpy as np
+
+
 class Action:
 
-    def __init__(self, from_, over, to_):
+    def __init__(self, from_, over, to_, action_id=None):
         """
         Simple class to represent an action in the game
         :param from_: Cell
         :param over: Cell
         :param to_: Cell
+        :param action_id: int - Index of the action in the ActionCatalog of the board
         """
         self.from_ = from_  # Cell to move a peg from
         self.over = over  # Cell that is being moved over
         self.to_ = to_  # Cell that is being moved to
+        self.action_id = action_id
 
     def __str__(self):
         return "{}{}{}".format(self.from_.__str__(), self.over.__str__(), self.to_.__str__())
 
     def __repr__(self):
         return "{}-{}".format(self.from_, self.to_)
+
+
+class ActionCatalog:
+    """
+    Every possible jump on a board geometry, built once when the board is constructed. Each jump gets a dense
+    integer id and a single shared Action instance, and the bitmasks of its cells (bit i is cell i of
+    PegBoard.get_cells(), as in PegBoard.get_state()). These masks are the one place the engines, solver, pruning,
+    vectorized environments and agents get their jump masks from.
+    """
+
+    def __init__(self, board):
+        self.actions = []  # Action with action_id i is stored at index i
+        self.cell_index = {}  # (row, column) mapping to the index of the cell in get_cells, its bit in the state
+        self.cell_ids = []  # (from_, over, to_) cell indices of every action id
+        self.need_masks = []  # Mask of the cells that must hold a peg for every action id
+        self.to_masks = []  # Mask of the cell that must be empty for every action id
+        self.flip_masks = []  # Mask that performs the jump with XOR for every action id
+        self.masks = None  # NumPy arrays of the masks, built on first use by get_masks
+        self.build(board)
+
+    def build(self, board):
+        """
+        Enumerate all jumps on the board. For each cell a peg could land in, its neighbours are visited in pattern
+        order, which is the order legal actions have always been listed in.
+        :param board: PegBoard
+        :return: None
+        """
+        for to_ in board.get_cells():
+            for neighbour in to_.get_neighbours():
+                over, pattern = neighbour["cell"], neighbour["pattern"]
+                coord = (over.row + pattern[0], over.column + pattern[1])
+                if board.is_legal_neighbour(coord):
+                    self.actions.append(Action(board.get_cell(coord), over, to_, len(self.actions)))
+
+        self.cell_index = {(cell.row, cell.column): i for i, cell in enumerate(board.get_cells())}
+        for action in self.actions:
+            cells = (action.from_, action.over, action.to_)
+            from_, over, to_ = (self.cell_index[(cell.row, cell.column)] for cell in cells)
+            self.cell_ids.append((from_, over, to_))
+            self.need_masks.append((1 << from_) | (1 << over))
+            self.to_masks.append(1 << to_)
+            self.flip_masks.append((1 << from_) | (1 << over) | (1 << to_))
+
+    def get_masks(self):
+        """
+        Return the jump masks as int64 arrays indexed by action id, for boards of at most 63 cells
+        :return: np.ndarray, np.ndarray, np.ndarray - cells that must hold a peg, cell that must be empty, and the mask
+        that performs the jump with XOR
+        """
+        if self.masks is None:
+            if len(self.cell_index) > 63:
+                raise ValueError("Jump mask arrays support boards with at most 63 cells, got {}".format(
+                    len(self.cell_index)))
+            self.masks = tuple(np.array(masks, dtype=np.int64)
+                               for masks in (self.need_masks, self.to_masks, self.flip_masks))
+        return self.masks
+
+    def __getitem__(self, action_id):
+        return self.actions[action_id]
+
+    def __iter__(self):
+        return iter(self.actions)
+
+    def __len__(self):
+        return len(self.actions)
@@ -0,0 +1,117 @@
+import numpy as np
+
+
+class BitBoard:
+    """
+    Integer bitmask engine for a PegBoard. Every cell on the board owns one bit of pegs, given in the same order as
+    PegBoard.get_cells(), so bit i is set when cell i holds a peg.
+    """
+
+    def __init__(self):
+        self.pegs = 0  # Bitmask of all cells currently holding a peg
+        self.initial = 0  # Bitmask of the start state, used when resetting
+        self.num_cells = 0  # Number of cells (bits) on the board
+        self.jumps = []  # List of (from_ | over mask, to_ mask, Action) in legal move order
+        self.need_masks = []  # from_ | over mask of every action id
+        self.to_masks = []  # to_ mask of every action id
+        self.key_format = None  # Format spec used to turn pegs into a binary string
+
+    def add_cell(self):
+        """
+        Reserve the next bit for a new cell on the board
+        :return: int - the mask of the new cell
+        """
+        mask = 1 << self.num_cells
+        self.num_cells += 1
+        return mask
+
+    def build_jumps(self, catalog):
+        """
+        Precompute the masks of every jump in the ActionCatalog, keeping the catalog order so both engines list
+        legal actions in the same order.
+        :param catalog: ActionCatalog
+        :return: None
+        """
+        self.jumps = list(zip(catalog.need_masks, catalog.to_masks, catalog))
+        self.need_masks, self.to_masks = catalog.need_masks, catalog.to_masks
+        self.initial = self.pegs
+        self.key_format = "0{}b".format(self.num_cells)
+
+    def reset(self):
+        """
+        Put the pegs back to the start state
+        :return: None
+        """
+        self.pegs = self.initial
+
+    def apply(self, action):
+        """
+        Move a peg by the given action
+        :param action: Action
+        :return: None
+        """
+        self.pegs = (self.pegs & ~self.need_masks[action.action_id]) | self.to_masks[action.action_id]
+
+    def is_legal(self, action):
+        """
+        Check if the action can be performed with the current pegs
+        :param action: Action
+        :return: boolean
+        """
+        pegs, need = self.pegs, self.need_masks[action.action_id]
+        return pegs & need == need and not pegs & self.to_masks[action.action_id]
+
+    def get_legal_actions(self):
+        """
+        Return a list of all legal actions, found by masking the pegs against every precomputed jump
+        :return: List[Action]
+        """
+        pegs = self.pegs
+        return [action for need, to_, action in self.jumps if pegs & need == need and not pegs & to_]
+
+    def count(self):
+        """
+        Return number of pegs left on the board
+        :return: int
+        """
+        return bin(self.pegs).count("1")
+
+    def to_key(self):
+        """
+        Return the same binary string as PegBoard.to_binary_string_encoding, where the first character is cell 0
+        :return: str
+        """
+        return format(self.pegs, self.key_format)[::-1]
+
+
+def encode_state(state, out):
+    """
+    Write the encoding of a board bitmask into a preallocated buffer, 1 for every cell holding a peg and 0 for every
+    hole. The bits are unpacked straight from the bytes of the integer, so no strings or lists are built, and a torch
+    tensor made with torch.from_numpy(out) sees the new encoding without any copy.
+    :param state: int - bitmask from PegBoard.get_state()
+    :param out: np.ndarray[num_cells]
+    :return: np.ndarray - out
+    """
+    num_cells = len(out)
+    out[:] = np.unpackbits(np.frombuffer(state.to_bytes((num_cells + 7) // 8, "little"), dtype=np.uint8),
+                           count=num_cells, bitorder="little")
+    return out
+
+
+def encode_states(states, out):
+    """
+    Batch version of encode_state, writing the encoding of state i into row i of out
+    :param states: List[int] | np.ndarray[N] of int64 bitmasks
+    :param out: np.ndarray[>= N, num_cells]
+    :return: np.ndarray - the first N rows of out
+    """
+    num_states, num_cells = len(states), out.shape[1]
+    if isinstance(states, np.ndarray):
+        data = np.ascontiguousarray(states, dtype="<i8").view(np.uint8).reshape(num_states, 8)
+    else:
+        num_bytes = (num_cells + 7) // 8
+        data = np.frombuffer(b"".join(state.to_bytes(num_bytes, "little") for state in states),
+                             dtype=np.uint8).reshape(num_states, num_bytes)
+    out[:num_states] = np.unpackbits(data, axis=1, count=num_cells, bitorder="little")
+    return out[:num_states]
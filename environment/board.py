@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
-from cell import Cell
+from cell import Cell, BitCell
+from bitboard import BitBoard, encode_state
+from action import ActionCatalog
+from symmetry import BoardSymmetry
 
 
 class PegBoard(ABC):
@@ -10,11 +13,43 @@ class PegBoard(ABC):
         self.holes_loc = config["holes_loc"]  # List of locations of all cells that should be init as empty
         self.board = [[None for _ in range(self.size)] for _ in range(self.size)]  # The actual board used while playing
         self.neighbour_pattern = None
+        self.action_catalog = None  # Every possible jump on this board, with stable integer ids
+        # Optional integer bitmask engine. "cells" keeps the pegs in the Cell objects only
+        self.engine = BitBoard() if config.get("engine", "cells") == "bitboard" else None
+        self.use_symmetry = config.get("symmetry", False)  # Let the actor and critic tables share symmetric states
+        self.symmetry = None  # BoardSymmetry of the geometry, built with the actions if use_symmetry is set
 
     @abstractmethod
     def init_board(self):
         pass
 
+    @abstractmethod
+    def get_symmetries(self):
+        pass
+
+    def make_cell(self, row, column):
+        """
+        Return a new Cell with a peg, backed by the bitmask engine if one is selected
+        :param row: int
+        :param column: int
+        :return: Cell
+        """
+        if self.engine:
+            return BitCell(row, column, True, self.engine)
+        return Cell(row, column, True)
+
+    def init_actions(self):
+        """
+        Build the action catalog, and the jump masks of the bitmask engine, once the cells and their neighbours are
+        in place
+        :return: None
+        """
+        self.action_catalog = ActionCatalog(self)
+        if self.engine:
+            self.engine.build_jumps(self.action_catalog)
+        if self.use_symmetry:
+            self.symmetry = BoardSymmetry(self, self.get_symmetries())
+
     def init_holes(self):
         """
         Set peg attribute of Cell to False if it should be removed from the board.
@@ -54,8 +89,44 @@ class PegBoard(ABC):
         Return a binary encoding of the board as a string where 1 is_peg and 0 is empty
         :return: str
         """
+        if self.engine:
+            return self.engine.to_key()
         return "".join(map(lambda cell: str(int(cell.is_peg)), self.get_cells()))
 
+    def get_state(self):
+        """
+        Return the board as an integer bitmask where bit i is set if cell i (in get_cells order) is a peg.
+        This is the state representation used by the actor and critic.
+        :return: int
+        """
+        if self.engine:
+            return self.engine.pegs
+        state = 0
+        for i, cell in enumerate(self.get_cells()):
+            if cell.is_peg:
+                state |= 1 << i
+        return state
+
+    def set_state(self, state):
+        """
+        Put the pegs as given by a bitmask from get_state. A Player of the board must be reset afterwards.
+        :param state: int
+        :return: None
+        """
+        if self.engine:
+            self.engine.pegs = state
+        else:
+            for i, cell in enumerate(self.get_cells()):
+                cell.is_peg = bool(state >> i & 1)
+
+    def encode(self, out):
+        """
+        Write the current pegs into a preallocated buffer, 1 for every cell holding a peg
+        :param out: np.ndarray[num_cells]
+        :return: np.ndarray - out
+        """
+        return encode_state(self.get_state(), out)
+
     def set_cell(self, cell):
         """
         Update board at cell position
@@ -98,6 +169,8 @@ class PegBoard(ABC):
         Return number of pegs left on the board
         :return: int
         """
+        if self.engine:
+            return self.engine.count()
         return len(list(filter(lambda cell: cell.is_peg, self.get_cells())))
 
     def __str__(self):
@@ -123,17 +196,35 @@ class DiamondPegBoard(PegBoard):
         """
         for row in range(self.size):
             for column in range(self.size):
-                self.set_cell(Cell(row, column, True))
+                self.set_cell(self.make_cell(row, column))
 
         # Remove pegs where there should be holes
         self.init_holes()
 
         self.set_neighbours()
+        self.init_actions()
+
+    def get_symmetries(self):
+        """
+        Return the coordinate maps of every symmetry of the diamond. The neighbour pattern makes the board a rhombus
+        of hexagonal cells, which keeps its neighbours under a flip about either diagonal and a half turn.
+        :return: List[function] - (row, column) -> (row, column), identity first
+        """
+        n = self.size - 1
+        return [
+            lambda r, c: (r, c),
+            lambda r, c: (c, r),
+            lambda r, c: (n - r, n - c),
+            lambda r, c: (n - c, n - r),
+        ]
 
     def reset(self):
         """
         Reset current board
         """
+        if self.engine:
+            self.engine.reset()
+            return
         for row in range(self.size):
             for column in range(self.size):
                 self.get_cell((row, column)).is_peg = True
@@ -157,17 +248,37 @@ class TrianglePegBoard(PegBoard):
         """
         for row in range(self.size):
             for column in range(row + 1):
-                self.set_cell(Cell(row, column, True))
+                self.set_cell(self.make_cell(row, column))
 
         # Remove pegs where there should be holes
         self.init_holes()
 
         self.set_neighbours()
+        self.init_actions()
+
+    def get_symmetries(self):
+        """
+        Return the coordinate maps of the 6 symmetries of the triangle (3 rotations and 3 reflections). Each cell has
+        the barycentric coordinates (column, row - column, size - 1 - row), and every symmetry permutes them.
+        :return: List[function] - (row, column) -> (row, column), identity first
+        """
+        n = self.size - 1
+        transforms = []
+        for order in ((0, 1, 2), (1, 2, 0), (2, 0, 1), (1, 0, 2), (0, 2, 1), (2, 1, 0)):
+            def transform(r, c, order=order):
+                coords = (c, r - c, n - r)
+                a, _, d = (coords[i] for i in order)
+                return n - d, a
+            transforms.append(transform)
+        return transforms
 
     def reset(self):
         """
         Initialize a new board
         """
+        if self.engine:
+            self.engine.reset()
+            return
         for row in range(self.size):
             for column in range(row + 1):
                 self.get_cell((row, column)).is_peg = True
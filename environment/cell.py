@@ -27,3 +27,25 @@ class Cell:
 
     def __repr__(self):
         return "({},{},{})".format(self.row, self.column, self.is_peg)
+
+
+class BitCell(Cell):
+    """
+    A Cell that keeps its peg as a single bit in a BitBoard, so the board and the bitmask never disagree
+    """
+
+    def __init__(self, row, column, is_peg, engine):
+        self.engine = engine  # BitBoard holding the peg bits
+        self.mask = engine.add_cell()  # The bit owned by this cell
+        super(BitCell, self).__init__(row, column, is_peg)
+
+    @property
+    def is_peg(self):
+        return self.engine.pegs & self.mask != 0
+
+    @is_peg.setter
+    def is_peg(self, value):
+        if value:
+            self.engine.pegs |= self.mask
+        else:
+            self.engine.pegs &= ~self.mask
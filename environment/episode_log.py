@@ -0,0 +1,240 @@
+from utils import get_board
+from peg_solitaire_player import Player
+import numpy as np
+import struct
+import json
+import os
+
+MAGIC = b"PEGLOG1\n"
+RECORD_HEADER = struct.Struct("<QQI")  # Episode number, start state and number of actions of a record
+INDEX_DTYPE = np.dtype([("episode", "<u8"), ("offset", "<u8")])
+
+
+def read_index(path):
+    """
+    Read an index file, without a partly written last entry
+    :param path: str
+    :return: np.ndarray of INDEX_DTYPE
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    return np.frombuffer(data[:len(data) - len(data) % INDEX_DTYPE.itemsize], dtype=INDEX_DTYPE)
+
+
+def get_record_ends(index, file):
+    """
+    Return the end offset of the record of every index entry, up to the last entry whose record is complete in the
+    log. The log and the index are flushed separately, so after a crash the index can point past the end of the log.
+    Every record ends where the next one starts, only the header of the last one is read.
+    :param index: np.ndarray of INDEX_DTYPE
+    :param file: binary file of the log
+    :return: np.ndarray of int64
+    """
+    size = file.seek(0, os.SEEK_END)
+    ends = np.append(index["offset"][1:].astype(np.int64), size + 1)
+    if len(index) and int(index["offset"][-1]) + RECORD_HEADER.size <= size:
+        file.seek(int(index["offset"][-1]))
+        _, _, length = RECORD_HEADER.unpack(file.read(RECORD_HEADER.size))
+        ends[-1] = int(index["offset"][-1]) + RECORD_HEADER.size + 6 * length
+    complete = ends <= size
+    return ends[:len(ends) if complete.all() else int(np.argmin(complete))]
+
+
+class EpisodeRecorder:
+    """
+    Appends episodes to a compact binary log through buffered I/O. The log file starts with a header holding the
+    Board config, followed by one record per episode:
+        episode (uint64), start state (uint64), n (uint32), n action ids (uint16), n rewards (int32)
+    A sidecar index file (path + ".idx") holds the (episode, offset) of every record, so any episode can be found
+    without reading the ones before it. An existing log is appended to, after dropping what a crash left half written.
+    """
+
+    def __init__(self, path, board_config, buffer_size=1 << 20):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.board_config = board_config
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(self.get_header())
+            open(self.index_path, "wb").close()
+        else:
+            self.repair()
+        self.log = open(path, "ab", buffering=buffer_size)
+        self.index = open(self.index_path, "ab", buffering=buffer_size)
+
+    def get_header(self):
+        """
+        Return the header of the log: the magic bytes and the length prefixed Board config
+        :return: bytes
+        """
+        config = json.dumps(self.board_config).encode()
+        return MAGIC + struct.pack("<I", len(config)) + config
+
+    def record(self, episode, start_state, action_ids, rewards):
+        """
+        Append an episode to the log
+        :param episode: int - episode number
+        :param start_state: int - bitmask of the board before the first action
+        :param action_ids: List[int]
+        :param rewards: List[int] - reward of every action
+        :return: None
+        """
+        offset = self.log.tell()
+        self.log.write(RECORD_HEADER.pack(episode, start_state, len(action_ids)))
+        self.log.write(np.asarray(action_ids, dtype="<u2").tobytes())
+        self.log.write(np.asarray(rewards, dtype="<i4").tobytes())
+        self.index.write(np.array([(episode, offset)], dtype=INDEX_DTYPE).tobytes())
+
+    def repair(self):
+        """
+        Cut the log after its last complete record, and the index after the entry of that record
+        :return: None
+        """
+        with open(self.path, "r+b") as f:
+            f.seek(len(MAGIC))
+            config_length, = struct.unpack("<I", f.read(4))
+            index = read_index(self.index_path)
+            ends = get_record_ends(index, f)
+            f.truncate(int(ends[-1]) if len(ends) else len(MAGIC) + 4 + config_length)
+        with open(self.index_path, "r+b") as f:
+            f.truncate(len(ends) * INDEX_DTYPE.itemsize)
+
+    def truncate(self, last_episode):
+        """
+        Remove every record after last_episode, e.g. the episodes a crashed run played after its last checkpoint.
+        When no record is kept, e.g. for a run started over on the path of an earlier one, the header is written
+        again, so the log holds the Board config of the run writing it.
+        :param last_episode: int
+        :return: None
+        """
+        self.flush()
+        index = np.fromfile(self.index_path, dtype=INDEX_DTYPE)
+        keep = int(np.searchsorted(index["episode"], last_episode, side="right"))
+        if keep == 0:
+            self.log.truncate(0)
+            self.log.write(self.get_header())
+        elif keep == len(index):
+            return
+        else:
+            self.log.truncate(int(index["offset"][keep]))
+        self.index.truncate(keep * INDEX_DTYPE.itemsize)
+        self.log.seek(0, os.SEEK_END)  # Truncating does not move the position that tell gives offsets from
+        self.index.seek(0, os.SEEK_END)
+
+    def flush(self):
+        """
+        Write the buffered records to disk
+        :return: None
+        """
+        self.log.flush()
+        self.index.flush()
+
+    def close(self):
+        """
+        Flush and close the log
+        :return: None
+        """
+        self.log.close()
+        self.index.close()
+
+
+class EpisodeLog:
+    """
+    Reads a log written by EpisodeRecorder. Episodes are looked up by number in the index and read with one seek, so
+    the log can be far larger than memory. The log ends at its last complete record, e.g. if the run writing it
+    crashed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not an episode log".format(path))
+        config_length, = struct.unpack("<I", self.file.read(4))
+        self.board_config = json.loads(self.file.read(config_length))
+        index = read_index(path + ".idx")
+        self.ends = get_record_ends(index, self.file)
+        self.index = index[:len(self.ends)]
+
+    def __len__(self):
+        return len(self.index)
+
+    def get_lengths(self):
+        """
+        Return the number of actions of every logged episode, from the record sizes without reading the records
+        :return: np.ndarray of int64
+        """
+        return (self.ends - self.index["offset"].astype(np.int64) - RECORD_HEADER.size) // 6
+
+    def get_episodes(self):
+        """
+        Return the numbers of the logged episodes, in the order they were played
+        :return: np.ndarray of uint64
+        """
+        return self.index["episode"]
+
+    def read_at(self, offset):
+        """
+        Read the record at an offset of the log
+        :param offset: int
+        :return: int, int, np.ndarray, np.ndarray - episode, start state, action ids and rewards
+        """
+        self.file.seek(offset)
+        episode, start_state, length = RECORD_HEADER.unpack(self.file.read(RECORD_HEADER.size))
+        action_ids = np.frombuffer(self.file.read(2 * length), dtype="<u2")
+        rewards = np.frombuffer(self.file.read(4 * length), dtype="<i4")
+        return episode, start_state, action_ids, rewards
+
+    def read(self, episode):
+        """
+        Read a logged episode
+        :param episode: int - episode number
+        :return: int, np.ndarray, np.ndarray - start state, action ids and rewards
+        """
+        i = int(np.searchsorted(self.index["episode"], episode))
+        if i == len(self.index) or self.index["episode"][i] != episode:
+            raise KeyError("Episode {} is not in {}".format(episode, self.path))
+        _, start_state, action_ids, rewards = self.read_at(int(self.index["offset"][i]))
+        return start_state, action_ids, rewards
+
+    def __iter__(self):
+        """
+        Yield (episode, start state, action ids, rewards) of every logged episode
+        """
+        for offset in self.index["offset"].tolist():
+            yield self.read_at(offset)
+
+    def make_board(self):
+        """
+        Return a fresh board of the geometry the log was recorded on
+        :return: PegBoard
+        """
+        return get_board(self.board_config)
+
+    def replay(self, episode, board=None):
+        """
+        Play a logged episode on a fresh board (or the given one), checking that every action is legal
+        :param episode: int - episode number
+        :param board: PegBoard
+        :return: List[int] - the state before the first action and after every action
+        """
+        start_state, action_ids, _ = self.read(episode)
+        board = board or self.make_board()
+        board.set_state(start_state)
+        player = Player(board, {})
+        states = [start_state]
+        for action_id in action_ids.tolist():
+            action = board.action_catalog[action_id]
+            if action_id not in player.legal_ids:
+                raise ValueError("Action {} of episode {} is not legal in state {}".format(
+                    action_id, episode, states[-1]))
+            states.append(player.perform_action(action))
+        return states
+
+    def close(self):
+        """
+        Close the log
+        :return: None
+        """
+        self.file.close()
@@ -0,0 +1,150 @@
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.animation import FuncAnimation, PillowWriter, FFMpegWriter
+from matplotlib.colors import to_rgba
+import networkx as nx
+import numpy as np
+import logging
+import os
+
+PEG, EMPTY, EDGE, FROM_EDGE, TO_EDGE = (to_rgba(color) for color in ("black", "white", "black", "red", "green"))
+
+
+class EpisodeRenderer:
+    """
+    Draws the episodes of one board geometry into an animation. The graph, node layout and edges are drawn once,
+    and every frame only changes the colors of the nodes that differ from the previous frame.
+    """
+
+    def __init__(self, geometry, fig=None):
+        self.geometry = geometry
+        if fig is None:
+            fig = Figure()
+            FigureCanvasAgg(fig)
+        self.fig = fig
+        self.ax = self.fig.add_subplot()
+        self.ax.set_title('Peg Solitaire AI')
+        self.ax.axis("off")
+        G = nx.Graph()
+        G.add_nodes_from(range(geometry.num_cells))
+        G.add_edges_from(geometry.edges)
+        nx.draw_networkx_edges(G, pos=geometry.positions, ax=self.ax)
+        self.nodes = nx.draw_networkx_nodes(G, pos=geometry.positions, ax=self.ax, node_color=[EMPTY],
+                                            edgecolors=[EDGE], linewidths=2)
+        self.face_colors = np.array([EMPTY] * geometry.num_cells)
+        self.edge_colors = np.array([EDGE] * geometry.num_cells)
+
+    def get_frames(self, start_state, action_ids):
+        """
+        Return the frames of an episode: the board before every action with its from and to cell marked, and the
+        board after it
+        :param start_state: int
+        :param action_ids: List[int]
+        :return: List[(int, int, int)] - state, and marked from and to cell (-1 if none) of every frame
+        """
+        frames, state = [], start_state
+        for action_id in action_ids:
+            from_, to_, flip = self.geometry.actions[action_id]
+            frames.append((state, from_, to_))
+            state ^= flip
+            frames.append((state, -1, -1))
+        return frames
+
+    def set_frame(self, frame, previous):
+        """
+        Update the colors of the nodes that changed since the previous frame
+        :param frame: (int, int, int)
+        :param previous: (int, int, int)
+        :return: None
+        """
+        state, from_, to_ = frame
+        changed = state ^ previous[0]
+        for i in range(self.geometry.num_cells):
+            if changed >> i & 1:
+                self.face_colors[i] = PEG if state >> i & 1 else EMPTY
+        for i in (previous[1], previous[2]):
+            if i >= 0:
+                self.edge_colors[i] = EDGE
+        if from_ >= 0:
+            self.edge_colors[from_], self.edge_colors[to_] = FROM_EDGE, TO_EDGE
+        self.nodes.set_facecolor(self.face_colors)
+        self.nodes.set_edgecolor(self.edge_colors)
+
+    def animate(self, start_state, action_ids, frame_delay):
+        """
+        Return the animation of an episode on the figure of the renderer
+        :param start_state: int
+        :param action_ids: List[int]
+        :param frame_delay: int - ms between frames
+        :return: FuncAnimation
+        """
+        frames = self.get_frames(start_state, action_ids) or [(start_state, -1, -1)]
+        previous = [(~start_state & ((1 << self.geometry.num_cells) - 1), -1, -1)]  # Every node changes in frame 0
+
+        def update(i):
+            self.set_frame(frames[i], previous[0])
+            previous[0] = frames[i]
+            return self.nodes,
+
+        return FuncAnimation(self.fig, update, frames=len(frames), interval=frame_delay, repeat=False, blit=True)
+
+    def render(self, start_state, action_ids, path, frame_delay):
+        """
+        Animate an episode and save it to path, as a GIF or (if ffmpeg is installed) an MP4 depending on the extension
+        :param start_state: int
+        :param action_ids: List[int]
+        :param path: str
+        :param frame_delay: int - ms between frames
+        :return: None
+        """
+        animation = self.animate(start_state, action_ids, frame_delay)
+        fps = 1000 / frame_delay
+        writer = FFMpegWriter(fps=fps) if path.endswith(".mp4") else PillowWriter(fps=fps)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        animation.save(path, writer=writer)
+
+
+def show_episode(geometry, start_state, action_ids, frame_delay):
+    """
+    Play an episode in a matplotlib window and wait until it is closed. Does nothing with a non-interactive backend,
+    e.g. Agg on a machine without a display.
+    :param geometry: BoardGeometry
+    :param start_state: int
+    :param action_ids: List[int]
+    :param frame_delay: int - ms between frames
+    :return: FuncAnimation | None
+    """
+    import matplotlib.pyplot as plt
+    fig = plt.figure()
+    if fig.canvas.required_interactive_framework is None:
+        plt.close(fig)
+        return
+    # The animation stops if it is garbage collected, so it is held until the window is closed
+    animation = EpisodeRenderer(geometry, fig).animate(start_state, action_ids, frame_delay)
+    plt.show()
+    return animation
+
+
+def render_worker(geometry, jobs):
+    """
+    Render the episodes put on jobs until None is put. The worker runs at the lowest CPU priority, so it only takes
+    time the training loop leaves idle.
+    :param geometry: BoardGeometry
+    :param jobs: Queue of (int, List[int], str, int, boolean) - start state, action ids, path, frame delay and
+    whether to also show the episode in a window once it is saved
+    :return: None
+    """
+    if hasattr(os, "nice"):
+        os.nice(19)
+    renderer = EpisodeRenderer(geometry)
+    while True:
+        job = jobs.get()
+        if job is None:
+            return
+        start_state, action_ids, path, frame_delay, show = job
+        try:
+            renderer.render(start_state, action_ids, path, frame_delay)
+            if show:
+                show_episode(geometry, start_state, action_ids, frame_delay)
+        except Exception:
+            logging.exception("Failed to render the episode to {}".format(path))
@@ -1,40 +1,109 @@
-from action import Action
-
-
 class Player:
 
     def __init__(self, board, config):
         self.config = config
         self.board = board  # The board the game is played on
 
+        # For each action id, the ids of all actions sharing a cell with it. These are the only actions that can
+        # change legality when that action is performed.
+        self.affected_actions = self.find_affected_actions()
+        self.legal_ids = set()  # Ids of the actions that are legal in the current state
+        self.legal_actions = None  # Cached list of legal actions, rebuilt from legal_ids when needed
+        self.num_pegs = 0  # Number of pegs on the board, kept up to date as pegs move
+        self.reset()
+
+    def find_affected_actions(self):
+        """
+        Map every action id to the ids of all actions that use one of its three cells
+        :return: List[tuple]
+        """
+        by_cell = {}
+        for action in self.board.action_catalog:
+            for cell in (action.from_, action.over, action.to_):
+                by_cell.setdefault((cell.row, cell.column), []).append(action.action_id)
+        affected = []
+        for action in self.board.action_catalog:
+            ids = set()
+            for cell in (action.from_, action.over, action.to_):
+                ids.update(by_cell[(cell.row, cell.column)])
+            affected.append(tuple(sorted(ids)))
+        return affected
+
+    def reset(self):
+        """
+        Recompute the cached peg count and legal actions from the board. Must be called after the board is changed
+        by anything else than perform_action, e.g. after PegBoard.reset().
+        :return: None
+        """
+        if self.board.engine:
+            legal_actions = self.board.engine.get_legal_actions()
+        else:
+            legal_actions = [action for action in self.board.action_catalog if self.is_legal(action)]
+        self.legal_ids = set(action.action_id for action in legal_actions)
+        self.legal_actions = None
+        self.num_pegs = self.board.num_pegs_on_board()
+
+    def is_legal(self, action):
+        """
+        Check if the action can be performed on the board right now
+        :param action: Action
+        :return: boolean
+        """
+        if self.board.engine:
+            return self.board.engine.is_legal(action)
+        return not action.to_.is_peg and action.over.is_peg and action.from_.is_peg
+
     def perform_action(self, action):
         """
-        Perform the action on the board and return the new state.
+        Perform the action on the board and return the new state. The peg count and the legal actions are updated
+        by only looking at the actions that share a cell with this one.
         :param action: Action
-        :return:
+        :return: int
         """
+        if self.board.engine:
+            return self.perform_jump(action.action_id)
         action.from_.is_peg = False
         action.over.is_peg = False
         action.to_.is_peg = True
+        self.num_pegs -= 1
 
-        return self.board.to_binary_string_encoding()
+        catalog = self.board.action_catalog
+        for action_id in self.affected_actions[action.action_id]:
+            if self.is_legal(catalog[action_id]):
+                self.legal_ids.add(action_id)
+            else:
+                self.legal_ids.discard(action_id)
+        self.legal_actions = None
+
+        return self.board.get_state()
+
+    def perform_jump(self, action_id):
+        """
+        perform_action for the bitmask engine, working on action ids and jump masks only: the pegs of the jump are
+        moved in the bitmask, and the affected actions are checked against their masks inline
+        :param action_id: int
+        :return: int - the new state
+        """
+        engine = self.board.engine
+        need_masks, to_masks, legal_ids = engine.need_masks, engine.to_masks, self.legal_ids
+        pegs = (engine.pegs & ~need_masks[action_id]) | to_masks[action_id]
+        engine.pegs = pegs
+        self.num_pegs -= 1
+        for i in self.affected_actions[action_id]:
+            need = need_masks[i]
+            if pegs & need == need and not pegs & to_masks[i]:
+                legal_ids.add(i)
+            else:
+                legal_ids.discard(i)
+        self.legal_actions = None
+        return pegs
 
     def get_legal_actions(self):
         """
-        Return a list of all legal actions that can be done on the board.
+        Return a list of all legal actions that can be done on the board, in ActionCatalog order.
         :return: List[Action]
         """
-        legal_actions = []
-        for empty_cell in self.board.get_empty_cells():
-            # Check neighbours of all empty cells
-            neighbours = empty_cell.get_neighbours()
-            for neighbour in neighbours:
-                neighbour_cell = neighbour["cell"]
-                # If the neighbour is a peg, you should calculate the neighbour that could do a legal move over it
-                if neighbour_cell.is_peg:
-                    pattern = neighbour["pattern"]
-                    coord = (neighbour_cell.row + pattern[0], neighbour_cell.column + pattern[1])
-                    if self.board.is_legal_neighbour(coord):
-                        if self.board.get_cell(coord).is_peg:
-                            legal_actions.append(Action(self.board.get_cell(coord), neighbour_cell, empty_cell))
-        return legal_actions
+        if self.legal_actions is None:
+            catalog = self.board.action_catalog
+            self.legal_actions = [catalog[action_id] for action_id in sorted(self.legal_ids)]
+        return self.legal_actions
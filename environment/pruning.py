@@ -0,0 +1,181 @@
+from collections import deque
+import math
+
+
+class DeadStatePruner:
+    """
+    Marks states from which a single peg can no longer be reached, using invariants precomputed from the board
+    geometry, so an episode can end as soon as it is lost instead of being played out move by move.
+
+    Position classes: the cells are coloured with 3 colours so the 3 cells of every jump have different colours.
+    A jump takes one peg from two colours and adds one to the third, so the parity of every colour count flips
+    together, and a state can only end with a single peg in a colour whose count parity differs from the other two.
+
+    Pagoda functions: cell weights where the from and over cells of every jump weigh at least as much as the to cell,
+    so the weighted peg sum never increases. Ending with a single peg in cell t needs a sum of at least the weight of t.
+    Each target cell gets a golden pagoda, weight phi^-distance(t), and 0/1 pagodas: sets closed under jumps into them.
+
+    Known-dead cache: lost states are added with mark_dead, and a state whose moves all lead to known-dead states is
+    dead as well, so losses found in earlier episodes move backwards to the states leading to them.
+    """
+
+    GOLDEN = (math.sqrt(5) - 1) / 2  # x^2 + x = 1, the smallest decay where a jump towards t keeps the pagoda
+
+    def __init__(self, board, max_cache=1 << 20):
+        cells = board.get_cells()
+        self.num_cells = len(cells)
+        catalog = board.action_catalog
+        index, jumps = catalog.cell_index, catalog.cell_ids
+        # (cells that must hold a peg, cell that must be empty) of every jump, and the mask performing it with XOR
+        self.jump_masks = list(zip(catalog.need_masks, catalog.to_masks))
+        self.flip_masks = catalog.flip_masks
+
+        # Position classes
+        a, b = next((a, b) for a in range(3) for b in range(3)
+                    if all((a * dr + b * dc) % 3 for dr, dc in board.neighbour_pattern))
+        self.class_masks = [0, 0, 0]
+        for i, cell in enumerate(cells):
+            self.class_masks[(a * cell.row + b * cell.column) % 3] |= 1 << i
+
+        # Pagodas of every target cell: a byte lookup table of the golden weights and a list of 0/1 masks
+        distances = self.get_distances(cells, index)
+        self.targets = [[] for _ in range(3)]  # Per position class: (target mask, golden byte tables, 0/1 masks)
+        for t in range(self.num_cells):
+            weights = [self.GOLDEN ** distances[t][i] for i in range(self.num_cells)]
+            closed_sets = {self.get_closed_set(t, jumps, choice) for choice in (1, 0)}
+            closed_sets.discard((1 << self.num_cells) - 1)  # Holds a peg in every state, so it proves nothing
+            target_class = next(k for k in range(3) if self.class_masks[k] >> t & 1)
+            self.targets[target_class].append((1 << t, self.get_byte_tables(weights), sorted(closed_sets)))
+
+        self.cache = {}  # State mapping to True if it is known to be dead, False if the invariants did not prove it
+        self.max_cache = max_cache
+
+        # Stats: transitions ended as dead, counted by the caller once per step
+        self.pruned = 0
+
+    @staticmethod
+    def get_distances(cells, index):
+        """
+        Return the number of steps between every pair of cells, moving between neighbours
+        :param cells: List[Cell]
+        :param index: dict - (row, column) mapping to cell index
+        :return: List[List[int]]
+        """
+        neighbours = [[index[(n["cell"].row, n["cell"].column)] for n in cell.get_neighbours()] for cell in cells]
+        distances = []
+        for start in range(len(cells)):
+            distance = [None] * len(cells)
+            distance[start] = 0
+            queue = deque([start])
+            while queue:
+                i = queue.popleft()
+                for j in neighbours[i]:
+                    if distance[j] is None:
+                        distance[j] = distance[i] + 1
+                        queue.append(j)
+            distances.append(distance)
+        return distances
+
+    @staticmethod
+    def get_closed_set(target, jumps, choice):
+        """
+        Grow a set of cells from target until every jump into the set starts or passes over a cell in it, by adding
+        the cell at position choice (0 for from, 1 for over) of every jump breaking that. Pegs in such a set can
+        only be removed, never added.
+        :param target: int - cell index
+        :param jumps: List[(int, int, int)] - from, over and to cell of every action
+        :param choice: int
+        :return: int - mask of the set
+        """
+        closed = 1 << target
+        changed = True
+        while changed:
+            changed = False
+            for jump in jumps:
+                from_, over, to_ = (1 << i for i in jump)
+                if closed & to_ and not closed & (from_ | over):
+                    closed |= 1 << jump[choice]
+                    changed = True
+        return closed
+
+    def get_byte_tables(self, weights):
+        """
+        Return tables giving the weight sum of the pegs in each byte of a state
+        :param weights: List[float] - weight of each cell
+        :return: List[List[float]]
+        """
+        tables = []
+        for k in range((self.num_cells + 7) // 8):
+            cells = range(8 * k, min(8 * k + 8, self.num_cells))
+            tables.append([sum(weights[i] for i in cells if b >> (i - 8 * k) & 1) for b in range(256)])
+        return tables
+
+    def can_end_in(self, state, byte_tables, closed_sets):
+        """
+        Check the pagodas of a target cell: every 0/1 pagoda must still hold a peg, and the golden pagoda must hold
+        at least the weight of the target (1)
+        :return: boolean
+        """
+        for closed in closed_sets:
+            if not state & closed:
+                return False
+        total, rest = 0.0, state
+        for table in byte_tables:
+            total += table[rest & 255]
+            rest >>= 8
+        return total >= 1 - 1e-9
+
+    def is_dead(self, state, legal_actions=None):
+        """
+        Check if a single peg provably can no longer be reached from state
+        :param state: int
+        :param legal_actions: List[Action] - legal actions in state, found from the jump masks if not given
+        :return: boolean
+        """
+        dead = self.cache.get(state)
+        if dead is None:
+            dead = self.check_invariants(state)
+            self.add_to_cache(state, dead)
+        if not dead:
+            if legal_actions is None:
+                action_ids = [i for i, (need, to_) in enumerate(self.jump_masks)
+                              if state & need == need and not state & to_]
+            else:
+                action_ids = [action.action_id for action in legal_actions]
+            cache, flip_masks = self.cache, self.flip_masks
+            if action_ids and all(cache.get(state ^ flip_masks[action_id]) for action_id in action_ids):
+                cache[state] = dead = True
+        return dead
+
+    def check_invariants(self, state):
+        """
+        Check the position classes and pagodas of state
+        :param state: int
+        :return: boolean - True if they prove the state is dead
+        """
+        counts = [bin(state & mask).count("1") & 1 for mask in self.class_masks]
+        for k in range(3):
+            # The single peg can only end in class k if the parity of class k differs from the two others
+            if counts[k] != counts[k - 1] and counts[k] != counts[k - 2]:
+                return not any(self.can_end_in(state, tables, closed_sets)
+                               for _, tables, closed_sets in self.targets[k])
+        return True
+
+    def mark_dead(self, state):
+        """
+        Add a state known to be lost to the cache, e.g. a state without legal moves
+        :param state: int
+        :return: None
+        """
+        self.add_to_cache(state, True)
+
+    def add_to_cache(self, state, dead):
+        """
+        Cache if state is dead, clearing the cache first if it holds max_cache states
+        :param state: int
+        :param dead: boolean
+        :return: None
+        """
+        if len(self.cache) >= self.max_cache:
+            self.cache.clear()
+        self.cache[state] = dead
@@ -1,6 +1,6 @@
-from utils import get_board
+from utils import get_board, get_backend
 from peg_solitaire_player import Player
-from visualizer import BoardVisualizer
+from pruning import DeadStatePruner
 
 import logging
 
@@ -11,28 +11,38 @@ class SimWorld:
         logging.info("Setting up the Simulated World")
         self.board = get_board(config["Board"])  # Game board
         self.player = Player(self.board, config["Player"])  # Peq Solitaire Player
-        self.visualizer = BoardVisualizer(self.board, config["Training"])  # Class for visualizing board using networkx
+        self.visualizer = None  # BoardVisualizer rendering episodes in the background, created on first use
+        self.num_cells = len(self.board.get_cells())  # Used as the penalty for loosing
+        # Ends episodes as soon as a single peg can no longer be reached, if enabled
+        self.pruner = DeadStatePruner(self.board) if config["Board"].get("prune_dead", False) else None
 
     def is_winning_state(self):
         """
         If there is only one peg left on the board, the player has won
         :return: boolean
         """
-        return self.board.num_pegs_on_board() == 1
+        return self.player.num_pegs == 1
+
+    def is_dead_state(self):
+        """
+        If pruning is enabled, check if a single peg can no longer be reached from the board
+        :return: boolean
+        """
+        return self.pruner is not None and self.pruner.is_dead(self.board.get_state())
 
     def is_loosing_state(self):
         """
-        If there is more than one peg on the board, but no legal moves, you loose
+        If there is more than one peg on the board, but no legal moves (or no way left to win), you loose
         :return: boolean
         """
-        return self.board.num_pegs_on_board() > 1 and len(self.player.get_legal_actions()) == 0
+        return self.player.num_pegs > 1 and (len(self.player.get_legal_actions()) == 0 or self.is_dead_state())
 
     def is_neutral_state(self):
         """
         If the board has more than one peg on the board, and at least one legal move, the game can still be played
         :return: boolean
         """
-        return self.board.num_pegs_on_board() > 1 and len(self.player.get_legal_actions()) > 0
+        return self.player.num_pegs > 1 and len(self.player.get_legal_actions()) > 0 and not self.is_dead_state()
 
     def get_reward(self):
         """
@@ -43,7 +53,7 @@ class SimWorld:
         if self.is_winning_state():
             reward += 9999
         elif self.is_loosing_state():
-            reward -= len(self.board.get_cells())
+            reward -= self.num_cells
         return reward
 
     def get_player(self):
@@ -60,30 +70,74 @@ class SimWorld:
         """
         return self.board
 
+    def reset(self):
+        """
+        Reset the board for a new game, and let the player pick up the new state
+        """
+        self.board.reset()
+        self.player.reset()
+
+    def step(self, action):
+        """
+        Let the player perform the action, and find the reward and whether the game is over in one pass over the
+        cached peg count and legal actions. With pruning, a state that can no longer be won is lost right away.
+        :param action: Action
+        :return: int, int, boolean, List[Action] - new state, reward, done and the legal actions in the new state
+        """
+        new_state = self.player.perform_action(action)
+        legal_actions = self.player.get_legal_actions()
+        if self.player.num_pegs == 1:
+            return new_state, 9999, True, legal_actions
+        if not legal_actions:
+            if self.pruner is not None:
+                self.pruner.mark_dead(new_state)
+            return new_state, -self.num_cells, True, legal_actions
+        if self.pruner is not None and self.pruner.is_dead(new_state, legal_actions):
+            self.pruner.pruned += 1
+            return new_state, -self.num_cells, True, legal_actions
+        return new_state, 0, False, legal_actions
+
     def perform_action(self, action):
         """
         Let the player perform the action and return the new state + reward
         :param action: Action
-        :return: str, int
+        :return: int, int
         """
-        new_state = self.player.perform_action(action)
-        reward = self.get_reward()
+        new_state, reward, _, _ = self.step(action)
         return new_state, reward
 
-    def visualize_episode(self, episode, config, path=None):
+    def start_visualizer(self, config):
         """
-        Visualize every step in the episode using the BoardVisualizer
-        :param episode: List[(str, Action)]
+        Create the BoardVisualizer and start its render worker, so it is running before training starts
+        :param config: dict - Training config
+        :return: None
+        """
+        if self.visualizer is None:
+            self.visualizer = get_backend("visualizer")(self.board, config)
+        self.visualizer.start()
+
+    def visualize_episode(self, episode, config, path=None, block=False, show=False):
+        """
+        Send the episode to the BoardVisualizer, which animates it in a background process. The episode is sent as
+        its start state and action ids, so the board itself is left untouched.
+        :param episode: List[(int, int)] - (state, action id) pairs
         :param config: dict
         :param path: str
+        :param block: boolean - wait for room in a full render queue instead of skipping the episode
+        :param show: boolean - also play the animation in a window once it is saved
         """
         if not path:
             path = config["animation_path"]
-        board_drawer = BoardVisualizer(self.board, config)
-        for sap in episode:
-            _, action = sap
-            if action:
-                board_drawer.draw(action=action)
-                self.player.perform_action(action)
-                board_drawer.draw()
-        board_drawer.animate(path)
+        if not episode:
+            return
+        self.start_visualizer(config)
+        action_ids = [action_id for _, action_id in episode if action_id is not None]
+        self.visualizer.render_episode(episode[0][0], action_ids, path, block=block, show=show)
+
+    def close(self):
+        """
+        Wait for the visualizer to finish the episodes it has been sent
+        :return: None
+        """
+        if self.visualizer is not None:
+            self.visualizer.close()
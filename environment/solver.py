@@ -0,0 +1,198 @@
+from utils import get_board, get_rng_state, set_rng_state
+import numpy as np
+import logging
+import os
+
+# Bits of a database entry used for the best remaining peg count, the state bitmask is stored above them
+PEG_BITS = 6
+PEG_MASK = (1 << PEG_BITS) - 1
+MAX_CELLS = 63 - PEG_BITS
+
+
+def get_moves(states, need_mask, to_mask, flip_mask):
+    """
+    Return every legal move from many states
+    :param states: np.ndarray[N] of int64 bitmasks
+    :return: np.ndarray, np.ndarray, np.ndarray - index of the state, action id and resulting state of each move
+    """
+    column = states[:, None]
+    legal = ((column & need_mask) == need_mask) & ((column & to_mask) == 0)
+    rows, action_ids = np.nonzero(legal)
+    return rows, action_ids, states[rows] ^ flip_mask[action_ids]
+
+
+def unique_states(states):
+    """
+    Return the sorted unique states. Sorting and dropping repeats is much faster than np.unique on large int64 arrays.
+    :param states: np.ndarray of int64
+    :return: np.ndarray of int64
+    """
+    states = np.sort(states)
+    keep = np.empty(len(states), dtype=bool)
+    keep[:1] = True
+    np.not_equal(states[1:], states[:-1], out=keep[1:])
+    return states[keep]
+
+
+def solve(board, chunk_size=1 << 16):
+    """
+    Find the best remaining peg count of every state reachable from the start state of the board.
+    Every move removes one peg, so the reachable states are found one layer (peg count) at a time going forward, and
+    the best counts are found going backward from the last layer, where no moves are left:
+        best(s) = min(best(s') for every move s -> s'), or the number of pegs in s if it has no moves
+    :param board: PegBoard - in its start state
+    :param chunk_size: int - states expanded at once, bounding the size of the legal move matrix
+    :return: np.ndarray, np.ndarray - sorted int64 states and their uint8 best remaining peg count
+    """
+    num_cells = len(board.get_cells())
+    if num_cells > MAX_CELLS:
+        raise ValueError("The solver supports boards with at most {} cells, got {}".format(MAX_CELLS, num_cells))
+    masks = board.action_catalog.get_masks()
+
+    layers = [np.array([board.get_state()], dtype=np.int64)]
+    while True:
+        successors = [get_moves(layers[-1][i:i + chunk_size], *masks)[2]
+                      for i in range(0, len(layers[-1]), chunk_size)]
+        successors = unique_states(np.concatenate(successors))
+        if not len(successors):
+            break
+        layers.append(successors)
+        logging.info("\t {} reachable states with {} pegs".format(len(successors), np.bitwise_count(successors[0])))
+
+    best = [None] * len(layers)
+    best[-1] = np.bitwise_count(layers[-1]).astype(np.uint8)
+    for k in range(len(layers) - 2, -1, -1):
+        layer_best = np.bitwise_count(layers[k]).astype(np.uint8)
+        for i in range(0, len(layers[k]), chunk_size):
+            rows, _, successors = get_moves(layers[k][i:i + chunk_size], *masks)
+            np.minimum.at(layer_best, rows + i, best[k + 1][np.searchsorted(layers[k + 1], successors)])
+        best[k] = layer_best
+
+    states, best = np.concatenate(layers), np.concatenate(best)
+    order = np.argsort(states)
+    return states[order], best[order]
+
+
+class PerfectPlayDatabase:
+    """
+    The best remaining peg count of every state reachable from a start state, as found by solve. Each state is one
+    int64 entry, state << PEG_BITS | best, sorted by state and saved as a .npy file that is memory-mapped when loaded,
+    so lookups are a binary search that only reads the pages it touches.
+    """
+
+    def __init__(self, path):
+        self.entries = np.load(path, mmap_mode="r")
+
+    @staticmethod
+    def build(board, path):
+        """
+        Solve the board from its current state and save the database to path
+        :param board: PegBoard
+        :param path: str - .npy file
+        :return: PerfectPlayDatabase
+        """
+        states, best = solve(board)
+        np.save(path, (states << PEG_BITS) | best)
+        return PerfectPlayDatabase(path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get_states(self):
+        """
+        Return every state in the database
+        :return: np.ndarray of int64
+        """
+        return self.entries >> PEG_BITS
+
+    def get_best_pegs(self, states):
+        """
+        Return the best remaining peg count that can be reached from many states, -1 for states not in the database
+        :param states: np.ndarray[N] of int64
+        :return: np.ndarray[N] of int
+        """
+        states = np.asarray(states, dtype=np.int64)
+        index = np.minimum(np.searchsorted(self.entries, states << PEG_BITS), len(self.entries) - 1)
+        entries = self.entries[index]
+        return np.where(entries >> PEG_BITS == states, entries & PEG_MASK, -1)
+
+    def best_pegs(self, state):
+        """
+        Return the best remaining peg count that can be reached from state, -1 if it is not in the database
+        :param state: int
+        :return: int
+        """
+        return int(self.get_best_pegs([state])[0])
+
+    def is_solvable(self, state):
+        """
+        Check if a single peg can be left on the board from state
+        :param state: int
+        :return: boolean
+        """
+        return self.best_pegs(state) == 1
+
+    def get_values(self, discount_factor, num_cells):
+        """
+        Return the value of every state that has moves left, when playing perfectly with the rewards of SimWorld:
+        9999 when one peg is left and -num_cells when the game is lost, discounted for every move before it
+        :param discount_factor: float
+        :param num_cells: int
+        :return: np.ndarray, np.ndarray - states and their values
+        """
+        states, best = self.get_states(), self.entries & PEG_MASK
+        pegs = np.bitwise_count(states).astype(np.int64)
+        playable = best < pegs
+        states, best, pegs = states[playable], best[playable], pegs[playable]
+        values = np.where(best == 1, 9999.0, -float(num_cells)) * discount_factor ** (pegs - best - 1)
+        return states, values
+
+
+def grade_policy(database, actor, board):
+    """
+    Grade the greedy policy of an actor against perfect play, over every state in the database that has moves left.
+    A move is optimal when the best remaining peg count after it is the same as before it.
+    :param database: PerfectPlayDatabase
+    :param actor: Actor
+    :param board: PegBoard - the board the database was built for
+    :return: dict - optimal move rate, the average number of pegs lost to the best count per move, and the share of
+    solvable states whose greedy move keeps them solvable
+    """
+    need_mask, to_mask, flip_mask = board.action_catalog.get_masks()
+    states, best = database.get_states(), database.entries & PEG_MASK
+    playable = best < np.bitwise_count(states)
+    states, best = states[playable], best[playable].astype(np.int64)
+
+    column = states[:, None]
+    legal_mask = ((column & need_mask) == need_mask) & ((column & to_mask) == 0)
+    # Choosing the actions draws random numbers, so the training run is left as if the policy was never graded
+    saved = actor.epsilon, actor.total_actions, actor.random_actions, get_rng_state()
+    actor.epsilon = 0
+    try:
+        action_ids = actor.get_actions(states, legal_mask)
+    finally:
+        actor.epsilon, actor.total_actions, actor.random_actions, rng_state = saved
+        set_rng_state(rng_state)
+
+    regret = database.get_best_pegs(states ^ flip_mask[action_ids]) - best
+    solvable = best == 1
+    return {
+        "states": len(states),
+        "optimal_move_rate": float(np.mean(regret == 0)),
+        "avg_regret": float(np.mean(regret)),
+        "solvable_kept_rate": float(np.mean(regret[solvable] == 0)) if solvable.any() else None,
+    }
+
+
+def load_database(config):
+    """
+    Return the PerfectPlayDatabase of a board config, or build and save it first if the file does not exist
+    :param config: dict - Board config, with the path of the database in "solution_path"
+    :return: PerfectPlayDatabase
+    """
+    path = config["solution_path"]
+    if os.path.exists(path):
+        return PerfectPlayDatabase(path)
+    logging.info("Solving the board, saving the solution to {}".format(path))
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return PerfectPlayDatabase.build(get_board(config), path)
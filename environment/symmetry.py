@@ -0,0 +1,99 @@
+class BoardSymmetry:
+    """
+    The symmetry group of a board geometry, as permutation tables over the cells and over the action ids of the
+    board's ActionCatalog. canonicalize maps a state to the smallest bitmask of its orbit, and gives the action id map
+    of the same transform, so symmetric variants of a state and its actions share one table entry.
+    """
+
+    def __init__(self, board, transforms, max_cache=1 << 20):
+        """
+        :param board: PegBoard - with its cells and ActionCatalog built
+        :param transforms: List[function] - (row, column) -> (row, column) for every symmetry, identity first
+        :param max_cache: int - states kept in the canonicalization cache before it is cleared
+        """
+        cells = board.get_cells()
+        index = {(cell.row, cell.column): i for i, cell in enumerate(cells)}
+        try:
+            # cell_maps[g][i] is the cell that cell i is moved to by transform g
+            self.cell_maps = [[index[transform(cell.row, cell.column)] for cell in cells] for transform in transforms]
+        except KeyError:
+            raise ValueError("A symmetry of the {} board moves a cell off the board".format(board.type))
+
+        action_index = {self.cell_triple(index, action): action.action_id for action in board.action_catalog}
+        # action_maps[g][a] is the id of action a moved by transform g
+        self.action_maps = [[action_index[tuple(cell_map[i] for i in self.cell_triple(index, action))]
+                             for action in board.action_catalog] for cell_map in self.cell_maps]
+
+        # byte_maps[g][k][b] is where transform g moves the pegs of byte value b at byte k of a state
+        self.num_bytes = (len(cells) + 7) // 8
+        self.byte_maps = []
+        for cell_map in self.cell_maps:
+            tables = []
+            for k in range(self.num_bytes):
+                table = []
+                for b in range(256):
+                    moved = 0
+                    for bit in range(8):
+                        i = 8 * k + bit
+                        if b >> bit & 1 and i < len(cells):
+                            moved |= 1 << cell_map[i]
+                    table.append(moved)
+                tables.append(table)
+            self.byte_maps.append(tables)
+
+        self.cache = {}  # State mapping to (canonical state, action map)
+        self.max_cache = max_cache
+
+    @staticmethod
+    def cell_triple(index, action):
+        """
+        Return the cell indices of the from, over and to cells of an action
+        :param index: dict - (row, column) mapping to cell index
+        :param action: Action
+        :return: (int, int, int)
+        """
+        return tuple(index[(cell.row, cell.column)] for cell in (action.from_, action.over, action.to_))
+
+    def __len__(self):
+        return len(self.cell_maps)
+
+    def transform(self, state, g):
+        """
+        Move the pegs of state by transform g
+        :param state: int
+        :param g: int - index of the transform
+        :return: int
+        """
+        moved = 0
+        for table in self.byte_maps[g]:
+            moved |= table[state & 255]
+            state >>= 8
+        return moved
+
+    def canonicalize(self, state):
+        """
+        Return the canonical representative of the orbit of state, and the action id map of the transform taking
+        state there. Action a in state is the same move as action_map[a] in the canonical state.
+        :param state: int
+        :return: int, List[int]
+        """
+        entry = self.cache.get(state)
+        if entry is None:
+            best, best_g = state, 0
+            for g in range(1, len(self.byte_maps)):
+                moved = self.transform(state, g)
+                if moved < best:
+                    best, best_g = moved, g
+            entry = (best, self.action_maps[best_g])
+            if len(self.cache) >= self.max_cache:
+                self.cache.clear()
+            self.cache[state] = entry
+        return entry
+
+    def canonical_state(self, state):
+        """
+        Return the canonical representative of the orbit of state
+        :param state: int
+        :return: int
+        """
+        return self.canonicalize(state)[0]
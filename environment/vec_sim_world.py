@@ -0,0 +1,96 @@
+from utils import get_board
+import numpy as np
+import logging
+
+
+class VecSimWorld:
+    """
+    Steps num_boards independent boards of the same geometry in lockstep.
+    Every board is an int64 bitmask in one NumPy array (bit i is cell i, like PegBoard.get_state()), and legal moves,
+    move application, rewards and done flags are computed for all boards at once from the jump masks of the board's
+    ActionCatalog. Boards that finish are reset automatically, to the start state of the config or to the start state
+    given for each board.
+    """
+
+    def __init__(self, config, num_boards, start_states=None):
+        logging.info("Setting up the Vectorized Simulated World with {} boards".format(num_boards))
+        self.board = get_board(config["Board"])  # Board only used for its geometry and ActionCatalog
+        self.catalog = self.board.action_catalog
+        self.num_cells = len(self.board.get_cells())
+        if self.num_cells > 62:
+            raise ValueError("VecSimWorld supports boards with at most 62 cells, got {}".format(self.num_cells))
+        self.num_boards = num_boards
+
+        # Jump masks indexed by action id: cells that must hold a peg, must be empty, and XOR performing the jump
+        self.need_mask, self.to_mask, self.flip_mask = self.catalog.get_masks()
+
+        # Start state of every board, e.g. other holes_loc starts to evaluate a policy from
+        if start_states is None:
+            self.initial_states = np.full(num_boards, self.board.get_state(), dtype=np.int64)
+        else:
+            self.initial_states = np.array(start_states, dtype=np.int64)
+            if self.initial_states.shape != (num_boards,):
+                raise ValueError("Expected {} start states, got {}".format(num_boards, len(self.initial_states)))
+        self.initial_pegs = np.bitwise_count(self.initial_states).astype(np.int64)
+        self.states = self.initial_states.copy()
+        self.num_pegs = self.initial_pegs.copy()
+        self.legal_mask = self.get_legal_mask(self.states)
+
+        # States and peg counts of the boards that finished in the last step, before they were reset
+        self.terminal_states = np.zeros(num_boards, dtype=np.int64)
+        self.final_pegs = np.zeros(num_boards, dtype=np.int64)
+
+    def get_legal_mask(self, states):
+        """
+        Return which actions are legal on each board
+        :param states: np.ndarray[N] of int64 bitmasks
+        :return: np.ndarray[N, num_actions] of bool
+        """
+        states = states[:, None]
+        return ((states & self.need_mask) == self.need_mask) & ((states & self.to_mask) == 0)
+
+    def reset(self):
+        """
+        Reset all boards to their start state
+        :return: np.ndarray, np.ndarray - states and legal mask
+        """
+        self.states[:] = self.initial_states
+        self.num_pegs[:] = self.initial_pegs
+        self.legal_mask = self.get_legal_mask(self.states)
+        return self.states, self.legal_mask
+
+    def step(self, action_ids):
+        """
+        Perform one action on every board. Boards given action id -1 are left as they are.
+        Finished boards are reset, their last state and peg count are kept in terminal_states and final_pegs.
+        :param action_ids: np.ndarray[N] of int
+        :return: np.ndarray, np.ndarray, np.ndarray, np.ndarray - new states, rewards, done flags and legal mask
+        """
+        action_ids = np.asarray(action_ids)
+        acting = action_ids >= 0
+        self.states[acting] ^= self.flip_mask[action_ids[acting]]
+        self.num_pegs[acting] -= 1
+        self.legal_mask = self.get_legal_mask(self.states)
+
+        won = acting & (self.num_pegs == 1)
+        lost = acting & (self.num_pegs > 1) & ~self.legal_mask.any(axis=1)
+        rewards = np.zeros(self.num_boards, dtype=np.int64)
+        rewards[won] = 9999
+        rewards[lost] = -self.num_cells
+        dones = won | lost
+
+        if dones.any():
+            self.terminal_states[dones] = self.states[dones]
+            self.final_pegs[dones] = self.num_pegs[dones]
+            self.states[dones] = self.initial_states[dones]
+            self.num_pegs[dones] = self.initial_pegs[dones]
+            self.legal_mask[dones] = self.get_legal_mask(self.states[dones])
+        return self.states, rewards, dones, self.legal_mask
+
+    def get_actions(self, action_ids):
+        """
+        Return the Action instances of the given action ids
+        :param action_ids: Iterable[int]
+        :return: List[Action]
+        """
+        return [self.catalog[action_id] for action_id in action_ids]
@@ -1,109 +1,105 @@
-import networkx as nx
-import matplotlib.pyplot as plt
+import multiprocessing as mp
+import logging
+import queue
 import math
-from celluloid import Camera
 
 
-class BoardVisualizer:
+class BoardGeometry:
     """
-    Class for visualizing all actions done during an episode of the game
+    Everything needed to draw a board, without the Cell objects: the position of every cell (in get_cells order),
+    the edges between neighbours and the from and to cell of every action id. Small and picklable, so it can be sent
+    to the render worker once.
     """
-    def __init__(self, board, config):
-        self.config = config
-        self.board = board
-        self.G = self.build_graph()
-        self.positions = self.calculate_positions()
-        self.fig = plt.figure()
-        self.camera = Camera(self.fig)
 
-    def build_graph(self):
-        """
-        Build the networkx graph with nodes and edges from the board
-        :return: Graph
-        """
-        G = nx.Graph()
-        for cell in self.board.get_cells():
-            G.add_node(cell)
-            # Add all edges from cell to its neighbours
-            neighbours = [(cell, neighbour["cell"]) for neighbour in cell.get_neighbours()]
-            G.add_edges_from(neighbours)
-        return G
+    def __init__(self, board):
+        cells = board.get_cells()
+        catalog = board.action_catalog
+        index = catalog.cell_index
+        self.num_cells = len(cells)
+        self.positions = self.calculate_positions(board, cells)
+        self.edges = sorted({tuple(sorted((i, index[(n["cell"].row, n["cell"].column)])))
+                             for i, cell in enumerate(cells) for n in cell.get_neighbours()})
+        self.actions = [(from_, to_, flip_mask)
+                        for (from_, _, to_), flip_mask in zip(catalog.cell_ids, catalog.flip_masks)]
 
-    def animate(self, path):
+    @staticmethod
+    def calculate_positions(board, cells):
         """
-        Animate each step to a gif
+        Calculate positions of each cell in the visualization
+        :return: dict - cell index mapping to (x, y)
         """
-        animation = self.camera.animate(
-            repeat=False, interval=self.config['frame_delay'])
-        animation.save(path)
-        plt.show()
+        return {i: (board.size / -2 + cell.column, -cell.row * math.sqrt(0.75)) for i, cell in enumerate(cells)}
 
-    def draw(self, action=None):
-        """
-        Draw the current state of the board
-        """
-        self.draw_occupied_cells()
-        self.draw_open_cells()
-        if action:
-            self.draw_cell_peg_is_moving_from(action)
-            self.draw_cell_peg_is_moving_to(action)
-        self.draw_edges()
-        plt.title('Peg Solitaire AI')
-        self.camera.snap()
 
-    def draw_occupied_cells(self):
-        """
-        Update which cells on the board that are pegs
-        """
-        pegs = [cell for cell in self.board.get_cells() if cell.is_peg]
-        nx.draw_networkx_nodes(self.G, pos=self.positions, nodelist=pegs,
-                               edgecolors='black', node_color='black', linewidths=2)
+def run_render_worker(geometry, jobs):
+    """
+    Entry point of the render worker process. The renderer is imported here, so matplotlib and networkx are only
+    loaded by the worker, not by the training process.
+    :param geometry: BoardGeometry
+    :param jobs: Queue - see episode_renderer.render_worker
+    :return: None
+    """
+    from episode_renderer import render_worker
+    render_worker(geometry, jobs)
 
-    def draw_open_cells(self):
-        """
-        Update which cells on the board that are empty
-        """
-        empty_cells = self.board.get_empty_cells()
-        nx.draw_networkx_nodes(self.G, pos=self.positions, nodelist=empty_cells,
-                               edgecolors='black', node_color='white', linewidths=2)
 
-    def draw_cell_peg_is_moving_from(self, action):
-        """
-        Update which cell is the current from_ cell in an action
-        """
-        nx.draw_networkx_nodes(self.G, pos=self.positions, nodelist=[action.from_],
-                               edgecolors='red', node_color='black', linewidths=2)
+class BoardVisualizer:
+    """
+    Renders episodes in a background process, so training never waits for drawing and encoding. Episodes are sent as
+    their start state and action ids. The worker is spawned rather than forked, so it does not inherit the tables and
+    threads of the training process, and it should be started before training.
+    """
 
-    def draw_cell_peg_is_moving_to(self, action):
-        """
-        Update which cell is the current to_ cell in an action
-        """
-        nx.draw_networkx_nodes(self.G, pos=self.positions, nodelist=[action.to_],
-                               edgecolors='green', node_color='white', linewidths=2)
+    def __init__(self, board, config):
+        self.config = config
+        self.geometry = BoardGeometry(board)
+        # Episodes waiting for the worker, 0 for no limit. Episodes sent to a full queue are skipped with a warning
+        self.max_pending = config.get("render_queue", 0)
+        self.skipped = 0
+        self.jobs = None
+        self.worker = None
 
-    def draw_edges(self):
+    def start(self):
         """
-        Draw the edges of the board - showing which cell are neighbour with who
+        Spawn the render worker, if it is not running yet
+        :return: None
         """
-        nx.draw_networkx_edges(self.G, pos=self.positions)
+        if self.worker is not None:
+            return
+        context = mp.get_context("spawn")
+        self.jobs = context.Queue(maxsize=self.max_pending)
+        self.worker = context.Process(target=run_render_worker, args=(self.geometry, self.jobs), daemon=True)
+        self.worker.start()
+
+    def render_episode(self, start_state, action_ids, path, block=False, show=False):
+        """
+        Send an episode to the render worker
+        :param start_state: int
+        :param action_ids: List[int]
+        :param path: str
+        :param block: boolean - wait for room in a full queue instead of skipping the episode
+        :param show: boolean - also play the episode in a window once it is saved, and keep the worker (and close)
+        waiting until the window is closed
+        :return: boolean - True if the episode will be rendered
+        """
+        self.start()
+        job = (start_state, list(action_ids), path, self.config["frame_delay"], show)
+        try:
+            self.jobs.put(job, block=block)
+        except queue.Full:
+            self.skipped += 1
+            logging.warning("Render queue full ({} episodes, Training.render_queue), skipped the animation to {} "
+                            "({} skipped so far)".format(self.max_pending, path, self.skipped))
+            return False
+        return True
 
-    def calculate_positions(self):
+    def close(self):
         """
-        Calculate positions of each cell in the visualization
+        Wait for the worker to render the episodes it has been sent, and stop it
+        :return: None
         """
-        positions = {}
-        row_number = 0
-        for row in self.board.board:
-            cell_number = 0
-            number_of_cells = len(row)
-            for cell in row:
-                if row_number % 2 == 0:
-                    xCoordinate = (number_of_cells / -2) + cell_number
-                    yCoordinate = -row_number * math.sqrt(0.75)
-                else:
-                    xCoordinate = (number_of_cells / -2) + cell_number
-                    yCoordinate = -row_number * math.sqrt(0.75)
-                cell_number += 1
-                positions[cell] = (xCoordinate, yCoordinate)
-            row_number += 1
-        return positions
+        if self.worker is None:
+            return
+        self.jobs.put(None)
+        self.worker.join()
+        self.worker, self.jobs = None, None
@@ -0,0 +1,39 @@
+"""
+Evaluate the greedy policy of checkpoints: play episodes from the start state of the config or other holes_loc starts
+across a pool of worker processes, and report the solve rate, remaining peg distribution and throughput. Training
+writes checkpoints between episodes, so this can run next to a training run on its latest checkpoint.
+
+Example:
+    python evaluate.py checkpoints/task_3_table.pkl --holes single --workers 4
+    python evaluate.py checkpoints/task_3_table.pkl --holes "[[[2,1]], [[0,0]]]" --episodes 100 --epsilon 0.05
+"""
+from utils import init_logger
+from evaluation import evaluate_checkpoint, format_evaluation
+import argparse
+import logging
+import json
+import os
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Greedy policy evaluation of checkpoints")
+    parser.add_argument("checkpoints", nargs="+")
+    parser.add_argument("--holes", help='JSON list of holes_locs, or "single" for every start with one hole. '
+                                        'The holes_loc of the config by default')
+    parser.add_argument("--episodes", type=int, default=1, help="Episodes per start, more only matter with epsilon")
+    parser.add_argument("--epsilon", type=float, default=0.0, help="Chance of a random action")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="Write the results of every checkpoint to this JSON file")
+    args = parser.parse_args()
+
+    init_logger()
+    holes = args.holes if args.holes in (None, "single") else json.loads(args.holes)
+    results = {}
+    for path in args.checkpoints:
+        results[path] = evaluate_checkpoint(path, holes, args.episodes, args.epsilon, args.workers, args.seed)
+        logging.info("{}: {}".format(path, format_evaluation(results[path])))
+        for holes_loc, solve_rate in zip(results[path]["holes_locs"], results[path]["start_solve_rates"]):
+            logging.info("\t Holes {}: solve rate {:.1%}".format(holes_loc, solve_rate))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
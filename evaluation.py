@@ -0,0 +1,174 @@
+"""
+Evaluation of the greedy policy of an actor. Many episodes are played in lockstep on the boards of a VecSimWorld, with
+one actor.get_actions call per move for all boards, from the start state of the config or from other holes_loc starts.
+"""
+from checkpoint import read_checkpoint
+from utils import get_board, get_rng_state, set_rng_state, set_seed
+from environment.vec_sim_world import VecSimWorld
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import logging
+import time
+
+
+def get_start_states(board, holes_locs):
+    """
+    Return the start state of every holes_loc, as the bitmask of the board with pegs everywhere except the holes
+    :param board: PegBoard
+    :param holes_locs: List[List[(int, int)]] - each one like the holes_loc of a Board config
+    :return: np.ndarray of int64
+    """
+    index = board.action_catalog.cell_index
+    full = (1 << len(index)) - 1
+    states = []
+    for holes_loc in holes_locs:
+        state = full
+        for row, column in holes_loc:
+            if (row, column) not in index:
+                raise ValueError("Hole ({}, {}) is not a cell of the board".format(row, column))
+            state &= ~(1 << index[(row, column)])
+        states.append(state)
+    return np.array(states, dtype=np.int64)
+
+
+def get_holes_locs(board, holes, default):
+    """
+    Return the holes_locs to evaluate from, given as a list of holes_locs, or "single" for one start per cell with
+    only that cell empty
+    :param board: PegBoard
+    :param holes: List[List[(int, int)]] | str | None
+    :param default: List[(int, int)] - holes_loc used if holes is None, e.g. the one of the config
+    :return: List[List[(int, int)]]
+    """
+    if holes is None:
+        return [default]
+    if holes == "single":
+        return [[(cell.row, cell.column)] for cell in board.get_cells()]
+    return holes
+
+
+def play_episodes(actor, vec_world, epsilon=0.0):
+    """
+    Play one episode on every board of a VecSimWorld, from the start state of each board. Boards that finish are left
+    idle until all have finished. The epsilon, action counts and random number generators of the actor are restored
+    afterwards, so an evaluation in the middle of training does not change it.
+    :param actor: Actor
+    :param vec_world: VecSimWorld - of the geometry the actor was trained on
+    :param epsilon: float - chance of a random action, 0 for the greedy policy
+    :return: np.ndarray, int - remaining pegs of every episode and the number of actions taken
+    """
+    states, legal_mask = vec_world.reset()
+    final_pegs = vec_world.num_pegs.copy()
+    playing = legal_mask.any(axis=1)  # A start state without legal actions is over before the first move
+    action_ids = np.full(vec_world.num_boards, -1, dtype=np.int64)
+    saved = actor.epsilon, actor.total_actions, actor.random_actions, get_rng_state()
+    actor.epsilon = epsilon
+    num_actions = 0
+    try:
+        while playing.any():
+            active = np.flatnonzero(playing)
+            action_ids[:] = -1
+            action_ids[active] = actor.get_actions(states[active], legal_mask[active])
+            states, _, dones, legal_mask = vec_world.step(action_ids)
+            num_actions += len(active)
+            final_pegs[dones] = vec_world.final_pegs[dones]
+            playing &= ~dones
+    finally:
+        actor.epsilon, actor.total_actions, actor.random_actions, rng_state = saved
+        set_rng_state(rng_state)
+    return final_pegs, num_actions
+
+
+def summarize(final_pegs, start_ids, num_actions, seconds):
+    """
+    Return the solve rate, remaining peg distribution and throughput of played episodes
+    :param final_pegs: np.ndarray of int - remaining pegs of every episode
+    :param start_ids: np.ndarray of int - index of the start state of every episode
+    :param num_actions: int
+    :param seconds: float
+    :return: dict
+    """
+    pegs, counts = np.unique(final_pegs, return_counts=True)
+    solved = final_pegs == 1
+    per_start = np.bincount(start_ids, weights=solved) / np.maximum(np.bincount(start_ids), 1)
+    return {
+        "episodes": len(final_pegs),
+        "solve_rate": float(solved.mean()),
+        "avg_pegs": float(final_pegs.mean()),
+        "peg_distribution": {int(p): int(c) for p, c in zip(pegs, counts)},
+        "start_solve_rates": per_start.tolist(),
+        "episodes_per_second": len(final_pegs) / max(seconds, 1e-9),
+        "actions_per_second": num_actions / max(seconds, 1e-9),
+    }
+
+
+def evaluate_actor(actor, vec_world, start_ids=None, epsilon=0.0):
+    """
+    Play one episode on every board of a VecSimWorld in the current process
+    :param actor: Actor
+    :param vec_world: VecSimWorld
+    :param start_ids: np.ndarray of int - index of the start state of every board, every board its own by default
+    :param epsilon: float
+    :return: dict - see summarize
+    """
+    if start_ids is None:
+        start_ids = np.arange(vec_world.num_boards)
+    start = time.perf_counter()
+    final_pegs, num_actions = play_episodes(actor, vec_world, epsilon)
+    return summarize(final_pegs, start_ids, num_actions, time.perf_counter() - start)
+
+
+def run_chunk(job):
+    """
+    Play a chunk of the episodes of an evaluation with the actor of a checkpoint. Runs in a worker process.
+    :param job: dict
+    :return: np.ndarray, int - remaining pegs and the number of actions taken
+    """
+    from trainer import Trainer  # Imported here, as trainer imports this module
+    logging.getLogger().setLevel(logging.WARNING)
+    trainer = Trainer.from_checkpoint(job["checkpoint"])
+    vec_world = VecSimWorld(trainer.config, len(job["start_states"]), job["start_states"])
+    set_seed(job["seed"])
+    return play_episodes(trainer.actor, vec_world, job["epsilon"])
+
+
+def evaluate_checkpoint(path, holes_locs=None, episodes=1, epsilon=0.0, workers=1, seed=42):
+    """
+    Play episodes episodes from every start state with the actor of a checkpoint, split over a pool of worker
+    processes that each load the checkpoint once
+    :param path: str
+    :param holes_locs: List[List[(int, int)]] | str - start boards, see get_holes_locs
+    :param episodes: int - episodes per start state
+    :param epsilon: float
+    :param workers: int
+    :param seed: int - seed of the first worker, the others get the following seeds
+    :return: dict - see summarize, with the holes_loc of each start state. The throughput includes loading the
+    checkpoint in the workers.
+    """
+    board_config = read_checkpoint(path)["config"]["Board"]
+    board = get_board(board_config)
+    holes_locs = get_holes_locs(board, holes_locs, board_config["holes_loc"])
+    start_states = get_start_states(board, holes_locs)
+    start_ids = np.repeat(np.arange(len(start_states)), episodes)
+    chunks = np.array_split(start_ids, min(workers, len(start_ids)))
+    jobs = [{"checkpoint": path, "start_states": start_states[chunk], "epsilon": epsilon, "seed": seed + i}
+            for i, chunk in enumerate(chunks)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=len(jobs)) as pool:
+        results = list(pool.map(run_chunk, jobs))
+    seconds = time.perf_counter() - start
+    final_pegs = np.concatenate([pegs for pegs, _ in results])
+    summary = summarize(final_pegs, start_ids, sum(actions for _, actions in results), seconds)
+    summary["holes_locs"] = [[list(hole) for hole in holes_loc] for holes_loc in holes_locs]
+    return summary
+
+
+def format_evaluation(summary):
+    """
+    Return a one line description of the result of an evaluation
+    :param summary: dict
+    :return: str
+    """
+    return "{} episodes, solve rate {:.1%}, avg pegs {:.2f}, pegs left {}, {:.0f} episodes/s".format(
+        summary["episodes"], summary["solve_rate"], summary["avg_pegs"], summary["peg_distribution"],
+        summary["episodes_per_second"])
@@ -0,0 +1,169 @@
+"""
+Hogwild training: several worker processes run their own SimWorld and actor-critic loop, all updating one actor and
+one critic table in shared memory without locks. Needs a table_lookup actor and critic on a board small enough for
+dense tables. Each worker writes its episode log and profile to files of its own, and the run is not checkpointed.
+
+Example:
+    python hogwild.py configs/task_3_table.yaml --workers 4
+"""
+from utils import load_config, init_logger, set_seed, get_board, get_critic, separate_outputs
+from environment.solver import load_database
+from agent.tables import SharedDenseTable
+from trainer import Trainer
+import multiprocessing as mp
+import numpy as np
+import argparse
+import logging
+import queue
+import copy
+import time
+import os
+
+
+def check_config(config):
+    """
+    Raise if the actor or critic of a config cannot be shared between workers: only table_lookup ones are turned into
+    shared tables, a neural network would be trained separately by every worker
+    :param config: dict
+    :return: None
+    """
+    for section in ("Actor", "Critic"):
+        if not config[section].get("table_lookup", True):
+            raise ValueError("Hogwild training needs a table_lookup {}, a network cannot be shared".format(
+                section.lower()))
+
+
+def make_shared_tables(config):
+    """
+    Create the shared actor and critic tables and point the Actor and Critic configs at them. A warm started critic
+    table is filled here, once, instead of by every worker when it starts.
+    :param config: dict
+    :return: SharedDenseTable, SharedDenseTable
+    """
+    board = get_board(config["Board"])
+    num_cells, num_actions = len(board.get_cells()), len(board.action_catalog)
+    tables = []
+    for section, row_shape in (("Actor", (num_actions,)), ("Critic", ())):
+        section_config = config[section]
+        table = SharedDenseTable(num_cells, row_shape, max_direct_states=section_config.get("max_direct_states", 1 << 20),
+                                 dtype=np.dtype(section_config.get("table_dtype", "float32")),
+                                 max_direct_bytes=section_config.get("max_direct_bytes", 1 << 27))
+        section_config["table"] = "shared"
+        section_config["shared_memory"] = table.name
+        tables.append(table)
+
+    critic_config = config["Critic"]
+    if critic_config.get("warm_start"):
+        critic = get_critic(critic_config, num_cells, board.symmetry)
+        states, values = load_database(config["Board"]).get_values(critic_config["df_critic"], num_cells)
+        critic.warm_start(states, values)
+        critic.value_function.close()
+        critic_config["warm_start"] = False
+        logging.info("Warm started the shared critic with the values of {} states".format(len(states)))
+    return tables
+
+
+def run_worker(config, worker_id, episodes, seed, report_every, stats, global_episodes):
+    """
+    Train on the shared tables and send the remaining pegs of finished episodes to the coordinator. Episodes are
+    numbered by the shared counter of all workers, so epsilon decays by the global episode like in a single process
+    run, and only the last episode of the run is played greedily.
+    :param config: dict - the Training episodes are the episodes of the whole run
+    :param worker_id: int
+    :param episodes: int - episodes of this worker
+    :param seed: int
+    :param report_every: int - episodes between messages to the coordinator
+    :param stats: Queue
+    :param global_episodes: Value - episodes started by all workers
+    :return: None
+    """
+    logging.getLogger().setLevel(logging.WARNING)
+    set_seed(seed + worker_id)
+    trainer = Trainer(config)
+    actor = trainer.actor
+    epsilon, dr_epsilon = actor.config["epsilon"], actor.config["dr_epsilon"]
+    sent = 0
+    for played in range(1, episodes + 1):
+        with global_episodes.get_lock():
+            global_episodes.value += 1
+            trainer.episode = global_episodes.value - 1
+        # run_episode decays epsilon once more, to epsilon * dr_epsilon^episode, unless it is the last episode
+        actor.epsilon = epsilon * dr_epsilon ** trainer.episode
+        trainer.run_episode()
+        if played % report_every == 0 or played == episodes:
+            stats.put((worker_id, trainer.remaining_pegs_pr_episode[sent:]))
+            sent = played
+    trainer.actor.policy.close()
+    trainer.critic.value_function.close()
+    stats.put((worker_id, None))
+
+
+def train(config, workers, report_every, seed):
+    """
+    Split the episodes of the config over the workers, the first episodes % workers of them playing one more, and
+    merge the statistics they send back
+    :return: List[int] - remaining pegs per episode, in the order the coordinator received them
+    """
+    check_config(config)
+    if config["Training"].get("checkpoint_path"):
+        logging.info("Hogwild runs are not checkpointed, Training.checkpoint_path is ignored")
+    actor_table, critic_table = make_shared_tables(config)
+    episodes, extra = divmod(config["Training"]["episodes"], workers)
+    worker_episodes = [episodes + (i < extra) for i in range(workers)]
+    worker_configs = []
+    for i in range(workers):
+        worker_config = copy.deepcopy(config)
+        training_config = worker_config["Training"]
+        training_config["display"] = False
+        training_config["eval_every"] = 0  # Workers log warnings only
+        training_config.pop("checkpoint_path", None)
+        separate_outputs(worker_config, "worker_{}".format(i))
+        worker_configs.append(worker_config)
+
+    stats, global_episodes = mp.Queue(), mp.Value("q", 0)
+    processes = [mp.Process(target=run_worker, args=(worker_configs[i], i, worker_episodes[i], seed, report_every,
+                                                     stats, global_episodes))
+                 for i in range(workers)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+
+    remaining_pegs, running = [], workers
+    try:
+        while running:
+            try:
+                worker_id, pegs = stats.get(timeout=1)
+            except queue.Empty:
+                if not any(process.is_alive() for process in processes):
+                    raise RuntimeError("All workers stopped before reporting they were done")
+                continue
+            if pegs is None:
+                running -= 1
+                continue
+            remaining_pegs.extend(pegs)
+            window = remaining_pegs[-report_every * workers:]
+            logging.info("Episodes: {} - Avg remaining pegs: {:.2f} - {:.0f} episodes/s".format(
+                len(remaining_pegs), np.mean(window), len(remaining_pegs) / (time.perf_counter() - start)))
+        for process in processes:
+            process.join()
+    finally:
+        actor_table.close()
+        critic_table.close()
+        actor_table.unlink()
+        critic_table.unlink()
+    return remaining_pegs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Hogwild actor-critic training over shared memory tables")
+    parser.add_argument("config")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--report-every", type=int, default=50, help="Episodes between reports from each worker")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    init_logger()
+    run_config = load_config(args.config)
+    pegs_pr_episode = train(run_config, args.workers, args.report_every, args.seed)
+    from plotting import plot_progression_of_learning  # Imported here, so only the final plot loads matplotlib
+    plot_progression_of_learning(pegs_pr_episode, path=run_config["Training"]["pol_path"])
@@ -1,102 +1,50 @@
-from utils import load_config, init_logger
+from utils import load_config, init_logger, set_seed
 import logging
-from environment.sim_world import SimWorld
-from agent.reinforcement_learner import ReinforcementLearner
-from plotting import plot_progression_of_learning
-import random
-import torch
-import numpy as np
+from trainer import Trainer
+from environment.solver import load_database, grade_policy
+import argparse
 
 if __name__ == '__main__':
-    init_logger()
-    # random.seed(42)
-    # torch.manual_seed(42)
-    config_path = "configs/task_3_nn.yaml"
+    parser = argparse.ArgumentParser(description="Train an actor-critic agent to play Peg Solitaire")
+    parser.add_argument("--config", default="configs/task_3_nn.yaml")
+    parser.add_argument("--resume", help="Checkpoint to continue training from, instead of starting from --config")
+    args = parser.parse_args()
 
-    # Load settings for this run
-    config = load_config(config_path)
+    init_logger()
+    # set_seed(42)
+
+    if args.resume:
+        # Continue the run saved in the checkpoint, with the config it was started with
+        trainer = Trainer.from_checkpoint(args.resume)
+        config = trainer.config
+    else:
+        # Load settings for this run
+        config = load_config(args.config)
+        trainer = Trainer(config)
     training_config = config["Training"]
     for key in config.keys():
         logging.info("{}: {}".format(key, config[key]))
 
-    # Initialize the Simulated World
-    sim_world = SimWorld(config)
-    board = sim_world.get_board()
-    player = sim_world.get_player()
-
-    # Initialize the Reinforcement Learner
-    rl = ReinforcementLearner(player, config)
-    actor = rl.get_actor()
-    critic = rl.get_critic()
-
-    # Log for remaining pegs at the end of each game
-    remaining_pegs_pr_episode = []
-    rewards = []
-
     # Start the generic actor-critic algorithm
-    for episode in range(1, training_config["episodes"] + 1):
-
-        # If it is the last episode - no random actions should be selected
-        if episode == training_config["episodes"]:
-            logging.info("Epsilon = 0")
-            actor.set_epsilon(0)
-        else:
-            actor.update_epsilon()
-
-        # List of (state, action) pairs chosen this episode
-        current_episode = []
-
-        # Reset eligibility in actor and critic
-        rl.reset_eligibility()
-
-        # Initialize state and action
-        state = board.to_binary_string_encoding()
-        action = actor.get_action(state)
-        while sim_world.is_neutral_state():
-            # Do action action from state, moving it to new_state and return reward
-            new_state, reward = sim_world.perform_action(action)
-            if reward != 0:
-                rewards.append(reward)
-
-            # Get the action devoted to the new state by current policy
-            new_action = actor.get_action(new_state)
+    trainer.train()
 
-            # Calculate the Temporal Difference error
-            td_error = critic.get_td_error(state, new_state, reward)
-            actor.set_td_error(td_error)
-
-            # Set eligibility to 1 for both actor and critic
-            rl.set_eligibility(state, action, is_current_state=True)
-
-            # For all (state, action) pairs in this episode
-            for s, a in current_episode:
-                rl.update(s, a)
-
-            # Save (state, action) to the "log" of this episode
-            current_episode.append((state, action))
-
-            # Continue until s reaches an end state
-            state, action = new_state, new_action
-
-        # Game ended, add results to log
-        remaining_pegs_pr_episode.append(board.num_pegs_on_board())
-
-        # Reset board for next game
-        board.reset()
+    # Report stats for debug
+    trainer.report_stats()
 
-        if episode % 50 == 0:
-            logging.info("Episode: {} - Avg Rewards: {}".format(episode, np.mean(rewards)))
-            rewards = []
-            if training_config["display"]:
-                sim_world.visualize_episode(current_episode, training_config,
-                                            path="graphs/mid/episode_{}.gif".format(episode))
+    # Grade the learned policy against perfect play, if the board has a solution
+    if config["Board"].get("solution_path"):
+        grade = grade_policy(load_database(config["Board"]), trainer.actor, trainer.board)
+        logging.info("Policy graded against perfect play: {}".format(grade))
 
-    # Report stats for debug
-    actor.report_actor_stats()
-    critic.report_critic_stats()
+    # Play the greedy policy from the evaluation starts (Training.eval_holes), not only the last episode
+    trainer.evaluate()
 
-    # Visualize last episode
-    sim_world.visualize_episode(current_episode, training_config)
+    # Visualize last episode, and show it in a window if matplotlib has an interactive backend
+    trainer.sim_world.visualize_episode(trainer.current_episode, training_config, block=True, show=True)
 
     # All episodes has ran, save results
-    plot_progression_of_learning(remaining_pegs_pr_episode, path=training_config["pol_path"])
+    from plotting import plot_progression_of_learning  # Imported here, so only the final plot loads matplotlib
+    plot_progression_of_learning(trainer.remaining_pegs_pr_episode, path=training_config["pol_path"])
+
+    # Wait for the animations to be written and close the episode log
+    trainer.close()
@@ -0,0 +1,45 @@
+"""
+Summarize an episode log written during training (Training.episode_log), and replay logged episodes onto a fresh board,
+optionally rendering them as animations.
+
+Example:
+    python show_episode.py logs/task_3_table.eplog
+    python show_episode.py logs/task_3_table.eplog --episode 500 --out graphs/episode_500.gif
+"""
+from utils import init_logger
+from environment.episode_log import EpisodeLog
+from environment.visualizer import BoardGeometry
+from environment.episode_renderer import EpisodeRenderer
+import argparse
+import logging
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay episodes of an episode log")
+    parser.add_argument("log")
+    parser.add_argument("--episode", type=int, help="Episode to replay, the last logged one by default")
+    parser.add_argument("--out", help="Render the replayed episode to this .gif or .mp4")
+    parser.add_argument("--frame-delay", type=int, default=500, help="Milliseconds per frame of the animation")
+    args = parser.parse_args()
+
+    init_logger()
+    log = EpisodeLog(args.log)
+    if len(log) == 0:
+        raise SystemExit("{} holds no episodes".format(args.log))
+    lengths = log.get_lengths()
+    logging.info("{}: {} episodes ({} to {}), {} actions, {:.2f} actions per episode".format(
+        args.log, len(log), log.get_episodes()[0], log.get_episodes()[-1], lengths.sum(), lengths.mean()))
+
+    episode = args.episode if args.episode is not None else int(log.get_episodes()[-1])
+    board = log.make_board()
+    try:
+        log.replay(episode, board)  # Raises ValueError if an action of the episode is not legal on the board
+    except KeyError:
+        parser.error("episode {} is not in {}, which holds {} episodes from {} to {}".format(
+            episode, args.log, len(log), log.get_episodes()[0], log.get_episodes()[-1]))
+    start_state, action_ids, rewards = log.read(episode)
+    logging.info("Episode {}: {} actions, {} pegs left, total reward {}".format(
+        episode, len(action_ids), board.num_pegs_on_board(), int(rewards.sum())))
+    if args.out:
+        EpisodeRenderer(BoardGeometry(board)).render(start_state, action_ids.tolist(), args.out, args.frame_delay)
+        logging.info("Episode {} rendered to {}".format(episode, args.out))
+    log.close()
@@ -0,0 +1,37 @@
+"""
+Solve a board exhaustively from the start state of a config, and save the best remaining peg count of every reachable
+state as a memory-mapped database. Feasible for triangles up to size 6 and diamonds up to size 5.
+
+Example:
+    python solve.py configs/task_2_table.yaml --out solutions/task_2.npy
+"""
+from utils import load_config, init_logger, get_board
+from environment.solver import PerfectPlayDatabase
+import numpy as np
+import argparse
+import logging
+import time
+import os
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Retrograde solver for the board of a config")
+    parser.add_argument("config")
+    parser.add_argument("--out", help="Database path, defaults to Board.solution_path of the config")
+    args = parser.parse_args()
+
+    init_logger()
+    board_config = load_config(args.config)["Board"]
+    path = args.out or board_config.get("solution_path")
+    if path is None:
+        parser.error("No --out given and the config has no Board.solution_path")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    board = get_board(board_config)
+    start = time.perf_counter()
+    database = PerfectPlayDatabase.build(board, path)
+    best = database.get_best_pegs(database.get_states())
+    logging.info("Solved {} reachable states in {:.1f}s, saved to {}".format(
+        len(database), time.perf_counter() - start, path))
+    logging.info("\t Solvable states: {}".format(int(np.sum(best == 1))))
+    logging.info("\t Best remaining pegs from the start state: {}".format(database.best_pegs(board.get_state())))
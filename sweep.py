@@ -0,0 +1,210 @@
+"""
+Hyperparameter sweep over the keys of a config, run in a process pool with successive halving.
+
+Example:
+    python sweep.py configs/task_3_table.yaml --grid Actor.lr_actor=0.00005,0.0005,0.005 \
+        --random Critic.lr_critic=0.000001:0.001:log --trials 8 --min-episodes 100 --eta 3
+"""
+from utils import load_config, init_logger, set_seed, get_rng_state, set_rng_state, separate_outputs
+from concurrent.futures import ProcessPoolExecutor
+from trainer import Trainer
+import numpy as np
+import argparse
+import itertools
+import logging
+import pickle
+import random
+import copy
+import json
+import math
+import yaml
+import os
+
+
+def parse_grid(specs):
+    """
+    Parse grid specs on the form Section.key=v1,v2,...
+    :param specs: List[str]
+    :return: dict - key mapping to the list of values to try
+    """
+    grid = {}
+    for spec in specs:
+        key, values = spec.split("=", 1)
+        grid[key] = [yaml.safe_load(value) for value in values.split(",")]
+    return grid
+
+
+def parse_random(specs):
+    """
+    Parse random search specs on the form Section.key=low:high or Section.key=low:high:log
+    :param specs: List[str]
+    :return: dict - key mapping to (low, high, log scale)
+    """
+    space = {}
+    for spec in specs:
+        key, bounds = spec.split("=", 1)
+        parts = bounds.split(":")
+        space[key] = (float(parts[0]), float(parts[1]), len(parts) > 2 and parts[2] == "log")
+    return space
+
+
+def expand_trials(grid, space, trials, seed):
+    """
+    Return the parameters of every trial: each grid point, combined with trials random samples if a random search
+    space is given
+    :param grid: dict
+    :param space: dict
+    :param trials: int
+    :param seed: int
+    :return: List[dict]
+    """
+    rng = random.Random(seed)
+    points = [dict(zip(grid.keys(), values)) for values in itertools.product(*grid.values())]
+    if not space:
+        return points
+    expanded = []
+    for point in points:
+        for _ in range(trials):
+            params = dict(point)
+            for key, (low, high, log) in space.items():
+                if log:
+                    params[key] = math.exp(rng.uniform(math.log(low), math.log(high)))
+                else:
+                    params[key] = rng.uniform(low, high)
+            expanded.append(params)
+    return expanded
+
+
+def apply_params(config, params, trial_id):
+    """
+    Return a copy of config with the Section.key parameters set, writing its checkpoints and logs to files of its own
+    :param config: dict
+    :param params: dict
+    :param trial_id: int
+    :return: dict
+    """
+    config = copy.deepcopy(config)
+    for key, value in params.items():
+        section, name = key.split(".", 1)
+        config[section][name] = value
+    separate_outputs(config, "trial_{}".format(trial_id))
+    return config
+
+
+def run_trial(job):
+    """
+    Train one trial up to the episode budget of the job, continuing from its last rung if it has one.
+    Runs in a worker process.
+    :param job: dict
+    :return: dict
+    """
+    logging.getLogger().setLevel(logging.WARNING)
+    if job["trainer"] is None:
+        set_seed(job["seed"])
+        trainer = Trainer(job["config"])
+    else:
+        trainer = pickle.loads(job["trainer"])
+        set_rng_state(job["rng_state"])
+    trainer.train(job["episodes"])
+    remaining_pegs = trainer.remaining_pegs_pr_episode
+    return {
+        "trial_id": job["trial_id"],
+        "score": float(np.mean(remaining_pegs[-job["window"]:])),
+        "trainer": pickle.dumps(trainer),
+        "rng_state": get_rng_state(),
+        "curve": remaining_pegs,
+    }
+
+
+def successive_halving(config, trials, workers, min_episodes, eta, window, seed):
+    """
+    Run all trials for min_episodes, keep the best 1/eta of them (fewest remaining pegs over the last window
+    episodes), continue those for eta times as many episodes, and so on until the episodes of the config are done.
+    :return: List[dict] - one result per trial
+    """
+    max_episodes = config["Training"]["episodes"]
+    results = [{"trial_id": i, "params": params, "config": apply_params(config, params, i), "scores": {},
+                "stopped_at": None, "trainer": None, "rng_state": None, "curve": []}
+               for i, params in enumerate(trials)]
+    alive = list(results)
+    budget = min(min_episodes, max_episodes)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            logging.info("Running {} trials up to episode {}".format(len(alive), budget))
+            jobs = [{"trial_id": r["trial_id"], "config": r["config"], "seed": seed + r["trial_id"],
+                     "episodes": budget, "window": window, "trainer": r["trainer"], "rng_state": r["rng_state"]}
+                    for r in alive]
+            for done in pool.map(run_trial, jobs):
+                result = results[done["trial_id"]]
+                result["scores"][budget] = done["score"]
+                result.update(trainer=done["trainer"], rng_state=done["rng_state"], curve=done["curve"])
+
+            alive.sort(key=lambda r: r["scores"][budget])
+            if budget >= max_episodes:
+                break
+            keep = max(1, math.ceil(len(alive) / eta))
+            for result in alive[keep:]:
+                result["stopped_at"] = budget
+                result["trainer"] = None
+            alive = alive[:keep]
+            for result in alive:
+                logging.info("\t Trial {} kept with score {}: {}".format(
+                    result["trial_id"], result["scores"][budget], result["params"]))
+            budget = min(budget * eta, max_episodes)
+    return results
+
+
+def write_results(results, out_dir, top):
+    """
+    Write every trial to results.json, and the config and learning curve of the top trials
+    :param results: List[dict]
+    :param out_dir: str
+    :param top: int
+    :return: None
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    # Trials that ran more episodes rank first, and trials that stopped at the same rung by their score there
+    ranked = sorted(results, key=lambda r: (-max(r["scores"]), r["scores"][max(r["scores"])]))
+    finished = sum(r["stopped_at"] is None for r in results)
+    if finished < top:
+        logging.info("Only {} of the top {} trials finished all episodes, the rest are ranked by the score of the "
+                     "rung they were stopped at".format(finished, top))
+    summary = [{"trial_id": r["trial_id"], "params": r["params"], "stopped_at": r["stopped_at"],
+                "scores": {str(k): v for k, v in r["scores"].items()}} for r in results]
+    with open(os.path.join(out_dir, "results.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+    for rank, result in enumerate(ranked[:top], start=1):
+        with open(os.path.join(out_dir, "best_{}.yaml".format(rank)), "w") as f:
+            yaml.safe_dump(result["config"], f, sort_keys=False)
+        with open(os.path.join(out_dir, "best_{}_curve.json".format(rank)), "w") as f:
+            json.dump({"params": result["params"], "remaining_pegs": result["curve"]}, f)
+        logging.info("Best {}: trial {} with score {} after {} episodes: {}".format(
+            rank, result["trial_id"], result["scores"][max(result["scores"])], max(result["scores"]),
+            result["params"]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Hyperparameter sweep with successive halving")
+    parser.add_argument("config", help="Base config, its Training.episodes is the budget of the best trials")
+    parser.add_argument("--grid", action="append", default=[], help="Section.key=v1,v2,... (repeatable)")
+    parser.add_argument("--random", action="append", default=[], help="Section.key=low:high[:log] (repeatable)")
+    parser.add_argument("--trials", type=int, default=8, help="Random samples per grid point")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--min-episodes", type=int, default=100, help="Episodes of the first rung")
+    parser.add_argument("--eta", type=int, default=3, help="Keep 1/eta of the trials at each rung")
+    parser.add_argument("--window", type=int, default=50, help="Episodes the score is averaged over")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--top", type=int, default=3, help="Number of best configs to write")
+    parser.add_argument("--out", default="sweeps/latest")
+    args = parser.parse_args()
+
+    init_logger()
+    base_config = load_config(args.config)
+    base_config["Training"]["display"] = False
+    if base_config["Training"].get("profile_episodes"):
+        parser.error("Training.profile_episodes is not supported in a sweep, as trials move between processes")
+    trial_params = expand_trials(parse_grid(args.grid), parse_random(args.random), args.trials, args.seed)
+    logging.info("Sweeping {} trials on {} workers".format(len(trial_params), args.workers))
+    sweep_results = successive_halving(base_config, trial_params, args.workers, args.min_episodes, args.eta,
+                                       args.window, args.seed)
+    write_results(sweep_results, args.out, args.top)
@@ -0,0 +1,26 @@
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules of agent/ and environment/ import each other by module name, so both folders are on the path
+sys.path[:0] = [ROOT, os.path.join(ROOT, "agent"), os.path.join(ROOT, "environment")]
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+
+@pytest.fixture
+def load_config():
+    """
+    Return a function loading a config of configs/ for a short run: no animations, evaluations or checkpoints, and
+    the given keys of each section overridden, e.g. load_config("task_3_table.yaml", 50, Board={"engine": "cells"})
+    """
+    from utils import load_config as load
+
+    def load_test_config(name, episodes, **sections):
+        config = load(os.path.join(ROOT, "configs", name))
+        config["Training"].update(episodes=episodes, display=False, eval_every=0, checkpoint_path=None)
+        for section, values in sections.items():
+            config[section].update(values)
+        return config
+    return load_test_config
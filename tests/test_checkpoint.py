@@ -0,0 +1,71 @@
+from utils import set_seed
+from trainer import Trainer
+from checkpoint import get_trainer_state
+import numpy as np
+import torch
+import pytest
+
+
+def assert_same(a, b, path="state"):
+    """
+    Assert that two trainer states are equal, down to every bit of their arrays and tensors
+    """
+    assert type(a) is type(b), path
+    if isinstance(a, dict):
+        assert a.keys() == b.keys(), path
+        for key in a:
+            assert_same(a[key], b[key], "{}[{!r}]".format(path, key))
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b), path
+        for i, (x, y) in enumerate(zip(a, b)):
+            assert_same(x, y, "{}[{}]".format(path, i))
+    elif isinstance(a, np.ndarray):
+        assert a.dtype == b.dtype and a.shape == b.shape and a.tobytes() == b.tobytes(), path
+    elif isinstance(a, torch.Tensor):
+        assert a.dtype == b.dtype and torch.equal(a, b), path
+    else:
+        assert a == b, path
+
+
+def assert_resume_is_exact(config, path, stop):
+    """
+    Train once without stopping, and once stopping after episode stop, saving a checkpoint and continuing from it.
+    Both runs must play the same episodes and end in the same state.
+    """
+    set_seed(1)
+    full = Trainer(config)
+    full.train()
+
+    set_seed(1)
+    first = Trainer(config)
+    first.train(stop)
+    first.save_checkpoint(path)
+    resumed = Trainer.from_checkpoint(path)
+    resumed.train()
+
+    assert len(resumed.remaining_pegs_pr_episode) == config["Training"]["episodes"]
+    assert resumed.remaining_pegs_pr_episode == full.remaining_pegs_pr_episode
+    assert_same(get_trainer_state(resumed), get_trainer_state(full))
+
+
+@pytest.mark.parametrize("name, sections", [
+    ("task_3_table.yaml", {}),
+    ("task_3_table.yaml", {"Actor": {"table": "dense"}, "Critic": {"table": "dense"}}),
+    ("task_3_table.yaml", {"Actor": {"table": "bounded", "max_entries": 200, "eviction": "lfu"},
+                           "Critic": {"table": "bounded", "max_entries": 100, "eviction": "lru"}}),
+    ("task_4_table.yaml", {"Board": {"prune_dead": True, "symmetry": True}}),
+    ("task_3_nn.yaml", {}),
+    ("task_3_nn.yaml", {"Actor": {"table_lookup": False}}),
+])
+def test_resume_is_exact(load_config, tmp_path, name, sections):
+    assert_resume_is_exact(load_config(name, 100, **sections), str(tmp_path / "checkpoint.pkl"), 37)
+
+
+@pytest.mark.parametrize("critic", [
+    {"update": "replay", "replay_capacity": 500, "replay_batch_size": 16},
+    {"update": "replay", "replay_capacity": 500, "replay_batch_size": 16, "replay_prioritized": True},
+    {"update": "replay", "replay_capacity": 500, "replay_batch_size": 16, "replay_every": 4, "backend": "numpy"},
+])
+def test_resume_with_replay_is_exact(load_config, tmp_path, critic):
+    # The replay buffer is smaller than the transitions played, so it has wrapped around when the run is saved
+    assert_resume_is_exact(load_config("task_3_nn.yaml", 100, Critic=critic), str(tmp_path / "checkpoint.pkl"), 73)
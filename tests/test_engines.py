@@ -0,0 +1,53 @@
+from utils import get_board, set_seed
+from peg_solitaire_player import Player
+from trainer import Trainer
+from episode_log import EpisodeLog
+import numpy as np
+import pytest
+
+BOARDS = [
+    {"type": "d", "size": 4, "holes_loc": [[2, 1]]},
+    {"type": "t", "size": 5, "holes_loc": [[2, 1]]},
+    {"type": "t", "size": 5, "holes_loc": [[0, 0], [4, 4]]},
+]
+
+
+@pytest.mark.parametrize("board_config", BOARDS)
+def test_engines_agree_on_random_play(board_config):
+    players = [Player(get_board(dict(board_config, engine=engine)), {}) for engine in ("cells", "bitboard")]
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        for player in players:
+            player.board.reset()
+            player.reset()
+        while True:
+            legal = [sorted(action.action_id for action in player.get_legal_actions()) for player in players]
+            assert legal[0] == legal[1]
+            assert players[0].num_pegs == players[1].num_pegs == players[0].board.num_pegs_on_board()
+            if not legal[0]:
+                break
+            action_id = int(rng.choice(legal[0]))
+            states = [player.perform_action(player.board.action_catalog[action_id]) for player in players]
+            assert states[0] == states[1] == players[1].board.get_state()
+
+
+@pytest.mark.parametrize("name, board", [
+    ("task_3_table.yaml", {}),
+    ("task_4_table.yaml", {"prune_dead": True}),
+    ("task_2_table.yaml", {"symmetry": True}),
+])
+def test_engines_play_the_same_episodes(load_config, tmp_path, name, board):
+    episodes = []
+    for engine in ("cells", "bitboard"):
+        path = str(tmp_path / "{}.eplog".format(engine))
+        config = load_config(name, 100, Board=dict(board, engine=engine), Training={"episode_log": path})
+        set_seed(1)
+        trainer = Trainer(config)
+        trainer.train()
+        trainer.close()
+        log = EpisodeLog(path)
+        episodes.append([(episode, start_state, action_ids.tolist(), rewards.tolist())
+                         for episode, start_state, action_ids, rewards in log])
+        log.close()
+    assert len(episodes[0]) == 100
+    assert episodes[0] == episodes[1]
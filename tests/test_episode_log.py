@@ -0,0 +1,98 @@
+from episode_log import EpisodeRecorder, EpisodeLog
+import pytest
+import os
+
+BOARD = {"type": "d", "size": 4, "holes_loc": [[2, 1]]}
+
+
+def make_episode(episode):
+    """
+    Return a made up (start state, action ids, rewards) of an episode, different for every episode number
+    """
+    length = episode % 5 + 1
+    return 1000 + episode, [(episode + i) % 40 for i in range(length)], [0] * (length - 1) + [-episode]
+
+
+def record(path, episodes, board_config=BOARD, truncate=None):
+    recorder = EpisodeRecorder(path, board_config)
+    if truncate is not None:
+        recorder.truncate(truncate)
+    for episode in episodes:
+        recorder.record(episode, *make_episode(episode))
+    recorder.close()
+
+
+def read(path):
+    """
+    Return every episode of a log as (episode, start state, action ids, rewards), and its Board config
+    """
+    log = EpisodeLog(path)
+    episodes = [(episode, start_state, action_ids.tolist(), rewards.tolist())
+                for episode, start_state, action_ids, rewards in log]
+    assert log.get_episodes().tolist() == [episode for episode, _, _, _ in episodes]
+    assert log.get_lengths().tolist() == [len(action_ids) for _, _, action_ids, _ in episodes]
+    board_config = log.board_config
+    log.close()
+    return episodes, board_config
+
+
+def expected(episodes):
+    return [(episode,) + make_episode(episode) for episode in episodes]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "run.eplog")
+    record(path, [2, 4, 6, 8])
+    record(path, [10, 12])  # Reopening a log appends to it
+
+    episodes, board_config = read(path)
+    assert episodes == expected([2, 4, 6, 8, 10, 12])
+    assert board_config == BOARD
+    log = EpisodeLog(path)
+    start_state, action_ids, rewards = log.read(8)
+    assert (start_state, action_ids.tolist(), rewards.tolist()) == make_episode(8)
+    with pytest.raises(KeyError):
+        log.read(5)
+    log.close()
+
+
+@pytest.mark.parametrize("log_cut, index_cut", [(3, 0), (0, 3), (30, 16 + 5)])
+def test_half_written_records_are_dropped_and_repaired(tmp_path, log_cut, index_cut):
+    path = str(tmp_path / "run.eplog")
+    record(path, range(1, 11))
+    # A crash can leave the log, the index or both cut anywhere, as they are flushed separately
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - log_cut)
+    with open(path + ".idx", "r+b") as f:
+        f.truncate(os.path.getsize(path + ".idx") - index_cut)
+
+    episodes, _ = read(path)
+    complete = len(episodes)
+    assert complete < 10 and episodes == expected(range(1, complete + 1))
+
+    # Opening the log to write cuts it after the last complete record, so new records follow it directly
+    record(path, range(complete + 1, 13))
+    assert read(path)[0] == expected(range(1, 13))
+    assert os.path.getsize(path + ".idx") == 12 * 16
+
+
+def test_truncate_on_resume(tmp_path):
+    path = str(tmp_path / "run.eplog")
+    record(path, range(1, 11))
+    # Resuming from a checkpoint of episode 6 plays the episodes after it again
+    record(path, range(7, 9), truncate=6)
+    assert read(path)[0] == expected(range(1, 9))
+    # Truncating after the last record keeps the log
+    record(path, [9], truncate=20)
+    assert read(path)[0] == expected(range(1, 10))
+
+
+def test_run_started_over_rewrites_the_header(tmp_path):
+    path = str(tmp_path / "run.eplog")
+    record(path, range(1, 11))
+    board_config = dict(BOARD, holes_loc=[[1, 1]])
+    record(path, range(1, 4), board_config, truncate=0)
+
+    episodes, logged_config = read(path)
+    assert episodes == expected(range(1, 4))
+    assert logged_config == board_config
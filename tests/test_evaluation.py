@@ -0,0 +1,36 @@
+from utils import set_seed
+from trainer import Trainer
+from checkpoint import get_trainer_state
+from test_checkpoint import assert_same
+import numpy as np
+import pytest
+import random
+
+
+@pytest.mark.parametrize("name, sections", [
+    ("task_3_table.yaml", {}),
+    ("task_3_table.yaml", {"Actor": {"table": "bounded", "max_entries": 200, "eviction": "lru"},
+                           "Critic": {"table": "bounded", "max_entries": 100, "eviction": "lru"}}),
+    ("task_3_table.yaml", {"Actor": {"table": "bounded", "max_entries": 200, "eviction": "lfu"}}),
+    ("task_3_table.yaml", {"Actor": {"table": "dense"}, "Training": {"eval_holes": [[[1, 1]], [[2, 2]]]}}),
+    ("task_3_nn.yaml", {"Actor": {"table_lookup": False}}),
+])
+def test_evaluation_leaves_training_unchanged(load_config, name, sections):
+    runs = []
+    for eval_every in (0, 7):
+        config = load_config(name, 60, **sections)
+        config["Training"]["eval_every"] = eval_every
+        set_seed(1)
+        trainer = Trainer(config)
+        trainer.train()
+        if eval_every:
+            assert trainer.eval_world is not None
+        state = get_trainer_state(trainer)
+        del state["config"]  # Differs in eval_every only
+        runs.append((trainer.remaining_pegs_pr_episode, (random.random(), np.random.random()), state))
+
+    # The same episodes, the same actor and critic down to the visits of bounded tables, and the same RNG streams
+    (pegs, draws, state), (evaluated_pegs, evaluated_draws, evaluated_state) = runs
+    assert evaluated_pegs == pegs
+    assert evaluated_draws == draws
+    assert_same(evaluated_state, state)
@@ -0,0 +1,69 @@
+from utils import get_critic, get_rng_state, set_rng_state, set_seed
+from trainer import Trainer
+import numpy as np
+import pickle
+import torch
+
+TRANSITIONS = [(0b1111111111101111, 0b1111111111010111, 0), (0b1111111111010111, 0b1111111101110011, 0),
+               (0b0000000100100000, 0b0000000001000000, 9999), (0b0011000000000101, 0b0011000000000011, -16)]
+
+
+def play(critic, transitions):
+    """
+    Compute the TD error of every transition and update the critic with it
+    :return: List[float]
+    """
+    td_errors = []
+    for state, future_state, reward in transitions:
+        td_errors.append(critic.get_td_error(state, future_state, reward, reward != 0))
+        critic.update_weights(state)
+    return td_errors
+
+
+def test_pickled_critic_updates_like_the_original(load_config):
+    config = load_config("task_3_nn.yaml", 1, Critic={"lr_critic": 0.01})
+    set_seed(1)
+    critic = get_critic(config["Critic"], 16)
+    play(critic, TRANSITIONS[:2])
+    copy = pickle.loads(pickle.dumps(critic))
+
+    assert play(copy, TRANSITIONS) == play(critic, TRANSITIONS)
+    for weight, copy_weight in zip(critic.weights, copy.weights):
+        assert torch.equal(weight, copy_weight)
+
+
+def test_pickled_trainer_trains_like_the_original(load_config):
+    config = load_config("task_3_nn.yaml", 60, Actor={"table_lookup": False, "lr_actor": 0.00001},
+                         Critic={"lr_critic": 0.0001})
+    set_seed(1)
+    trainer = Trainer(config)
+    trainer.train(20)
+    copy = pickle.loads(pickle.dumps(trainer))
+    rng_state = get_rng_state()
+    trainer.train()
+    set_rng_state(rng_state)
+    copy.train()
+
+    assert copy.remaining_pegs_pr_episode == trainer.remaining_pegs_pr_episode
+    weights = zip(trainer.critic.weights + trainer.actor.weights, copy.critic.weights + copy.actor.weights)
+    for weight, copy_weight in weights:
+        assert torch.equal(weight, copy_weight)
+    assert np.shares_memory(copy.critic.input.numpy(), copy.critic.input_buffer)
+    assert np.shares_memory(copy.actor.input.numpy(), copy.actor.input_buffer)
+
+
+def test_numpy_critic_matches_torch_critic(load_config):
+    config = load_config("task_3_nn.yaml", 1, Critic={"lr_critic": 0.01})
+    set_seed(1)
+    torch_critic = get_critic(config["Critic"], 16)
+    numpy_critic = get_critic(dict(config["Critic"], backend="numpy"), 16)
+    numpy_critic.value_function.load_state_dict(torch_critic.value_function.state_dict())
+
+    for _ in range(3):
+        td_errors = play(numpy_critic, TRANSITIONS)
+        np.testing.assert_allclose(td_errors, play(torch_critic, TRANSITIONS), rtol=1e-5, atol=1e-5)
+    states = np.array([state for transition in TRANSITIONS for state in transition[:2]], dtype=np.int64)
+    np.testing.assert_allclose(numpy_critic.get_values(states), torch_critic.get_values(states), rtol=1e-5, atol=1e-5)
+    numpy_weights = numpy_critic.value_function.state_dict()
+    for key, weight in torch_critic.value_function.state_dict().items():
+        np.testing.assert_allclose(numpy_weights[key], weight.numpy(), rtol=1e-5, atol=1e-6)
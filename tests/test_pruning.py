@@ -0,0 +1,62 @@
+from utils import get_board, set_seed
+from solver import solve
+from pruning import DeadStatePruner
+from trainer import Trainer
+import pytest
+
+BOARDS = [
+    {"type": "d", "size": 4, "holes_loc": [[2, 1]]},
+    {"type": "d", "size": 4, "holes_loc": [[1, 1]]},
+    {"type": "t", "size": 5, "holes_loc": [[2, 1]]},
+    {"type": "t", "size": 5, "holes_loc": [[0, 0]]},
+]
+
+
+@pytest.mark.parametrize("board_config", BOARDS)
+def test_invariants_never_mark_a_solvable_state_dead(board_config):
+    board = get_board(dict(board_config, engine="bitboard"))
+    pruner = DeadStatePruner(board)
+    states, best = solve(board)
+    for state, best_pegs in zip(states.tolist(), best.tolist()):
+        if best_pegs == 1:
+            assert not pruner.check_invariants(state), state
+
+
+@pytest.mark.parametrize("board_config", BOARDS)
+def test_is_dead_finds_exactly_the_dead_states(board_config):
+    board = get_board(dict(board_config, engine="bitboard"))
+    pruner = DeadStatePruner(board)
+    need_mask, to_mask, _ = (masks.tolist() for masks in board.action_catalog.get_masks())
+    states, best = solve(board)
+    # States with the fewest pegs first, so the successors of every state are known when it is checked. Lost states
+    # without moves are marked like SimWorld.step does, and every other state is dead once all its successors are.
+    for state, best_pegs in sorted(zip(states.tolist(), best.tolist()), key=lambda entry: bin(entry[0]).count("1")):
+        has_moves = any(state & need == need and not state & to_ for need, to_ in zip(need_mask, to_mask))
+        if has_moves:
+            assert pruner.is_dead(state) == (best_pegs > 1), state
+        elif best_pegs > 1:
+            pruner.mark_dead(state)
+
+
+def test_training_prunes_only_dead_states(load_config):
+    config = load_config("task_3_table.yaml", 200, Board={"prune_dead": True})
+    set_seed(1)
+    trainer = Trainer(config)
+    trainer.train()
+    pruner = trainer.sim_world.pruner
+    best = dict(zip(*(array.tolist() for array in solve(get_board(config["Board"])))))
+    dead = [state for state, is_dead in pruner.cache.items() if is_dead]
+    assert pruner.pruned > 0 and dead
+    assert all(best[state] > 1 for state in dead)
+
+
+def test_cache_stays_within_max_cache():
+    board = get_board(dict(BOARDS[0], engine="bitboard"))
+    pruner = DeadStatePruner(board, max_cache=10)
+    states, _ = solve(board)
+    for i, state in enumerate(states.tolist()[:100]):
+        if i % 2:
+            pruner.mark_dead(state)
+        else:
+            pruner.is_dead(state)
+        assert len(pruner.cache) <= 10
@@ -0,0 +1,83 @@
+from utils import get_board, get_rng_state, set_rng_state, set_seed
+from peg_solitaire_player import Player
+from solver import solve, grade_policy, PerfectPlayDatabase
+from trainer import Trainer
+import numpy as np
+import pytest
+import random
+
+BOARDS = [
+    {"type": "d", "size": 4, "holes_loc": [[2, 1]]},
+    {"type": "t", "size": 5, "holes_loc": [[2, 1]]},
+    {"type": "t", "size": 5, "holes_loc": [[0, 0], [4, 4]]},
+]
+
+
+def brute_force(board):
+    """
+    Find the best remaining peg count of every state reachable from the start state of the board by depth first search,
+    playing the moves with a Player on the cells engine
+    :return: dict - state mapping to its best remaining peg count
+    """
+    player = Player(board, {})
+    best = {}
+
+    def search(state):
+        if state not in best:
+            board.set_state(state)
+            player.reset()
+            actions, pegs = player.get_legal_actions(), player.num_pegs
+            successors = []
+            for action in actions:
+                board.set_state(state)
+                player.reset()
+                successors.append(player.perform_action(action))
+            best[state] = min([search(successor) for successor in successors], default=pegs)
+        return best[state]
+
+    search(board.get_state())
+    return best
+
+
+@pytest.mark.parametrize("board_config", BOARDS)
+def test_solve_matches_brute_force(board_config):
+    expected = brute_force(get_board(dict(board_config, engine="cells")))
+    states, best = solve(get_board(dict(board_config, engine="bitboard")))
+    assert dict(zip(states.tolist(), best.tolist())) == expected
+
+
+def test_database_lookups(tmp_path):
+    board = get_board(dict(BOARDS[0], engine="bitboard"))
+    database = PerfectPlayDatabase.build(board, str(tmp_path / "solution.npy"))
+    expected = brute_force(get_board(dict(BOARDS[0], engine="cells")))
+    start = board.get_state()
+
+    assert len(database) == len(expected)
+    assert database.best_pegs(start) == expected[start]
+    assert database.is_solvable(start) == (expected[start] == 1)
+    assert database.best_pegs(1 << 40) == -1
+    states = np.array(sorted(expected), dtype=np.int64)
+    assert database.get_best_pegs(states).tolist() == [expected[state] for state in states.tolist()]
+
+    # Only states with moves left get a value, positive if and only if a single peg can still be reached
+    value_states, values = database.get_values(0.9, len(board.get_cells()))
+    for state, value in zip(value_states.tolist(), values.tolist()):
+        assert expected[state] < bin(state).count("1")
+        assert (value > 0) == (expected[state] == 1)
+
+
+def test_grading_leaves_the_training_run_unchanged(load_config, tmp_path):
+    config = load_config("task_3_table.yaml", 40, Board=dict(BOARDS[0], engine="bitboard"))
+    set_seed(1)
+    trainer = Trainer(config)
+    trainer.train(20)
+    database = PerfectPlayDatabase.build(get_board(config["Board"]), str(tmp_path / "solution.npy"))
+    rng_state = get_rng_state()
+    epsilon = trainer.actor.epsilon
+
+    grade = grade_policy(database, trainer.actor, trainer.board)
+    assert grade["states"] > 0
+    assert trainer.actor.epsilon == epsilon
+    draws = (random.random(), np.random.random())
+    set_rng_state(rng_state)
+    assert draws == (random.random(), np.random.random())
@@ -0,0 +1,81 @@
+from utils import get_board
+import numpy as np
+import pytest
+
+BOARDS = [
+    ({"type": "t", "size": 4, "holes_loc": [[2, 1]]}, 6),
+    ({"type": "t", "size": 5, "holes_loc": [[2, 1]]}, 6),
+    ({"type": "d", "size": 4, "holes_loc": [[2, 1]]}, 4),
+    ({"type": "d", "size": 5, "holes_loc": [[2, 2]]}, 4),
+]
+
+
+def get_states(board, count=200):
+    """
+    Return random states of a board, with every cell holding a peg with probability 1/2
+    :return: List[int]
+    """
+    rng = np.random.default_rng(0)
+    num_cells = len(board.get_cells())
+    return [int(sum(1 << int(i) for i in np.flatnonzero(rng.random(num_cells) < 0.5))) for _ in range(count)]
+
+
+def move_cells(board, state, transform):
+    """
+    Move the pegs of state by a (row, column) transform one cell at a time, the slow path of BoardSymmetry.transform
+    :return: int
+    """
+    cells = board.get_cells()
+    index = {(cell.row, cell.column): i for i, cell in enumerate(cells)}
+    return sum(1 << index[transform(cell.row, cell.column)] for i, cell in enumerate(cells) if state >> i & 1)
+
+
+@pytest.mark.parametrize("board_config, size", BOARDS)
+def test_canonical_state_is_shared_by_the_orbit(board_config, size):
+    board = get_board(dict(board_config, engine="bitboard", symmetry=True))
+    symmetry = board.symmetry
+    assert len(symmetry) == size
+    for state in get_states(board):
+        orbit = [symmetry.transform(state, g) for g in range(size)]
+        assert len(set(bin(moved).count("1") for moved in orbit)) == 1
+        assert all(symmetry.canonical_state(moved) == min(orbit) for moved in orbit), state
+
+
+@pytest.mark.parametrize("board_config, size", BOARDS)
+def test_lookup_tables_match_moving_every_cell(board_config, size):
+    board = get_board(dict(board_config, engine="bitboard", symmetry=True))
+    transforms = board.get_symmetries()
+    for state in get_states(board):
+        orbit = [move_cells(board, state, transform) for transform in transforms]
+        assert [board.symmetry.transform(state, g) for g in range(size)] == orbit
+        assert board.symmetry.canonical_state(state) == min(orbit)
+
+
+@pytest.mark.parametrize("board_config, size", BOARDS)
+def test_action_maps_move_actions_with_the_board(board_config, size):
+    board = get_board(dict(board_config, engine="bitboard", symmetry=True))
+    symmetry = board.symmetry
+    catalog = board.action_catalog
+    need_masks, to_masks, flip_masks = catalog.need_masks, catalog.to_masks, catalog.flip_masks
+
+    def is_legal(state, action_id):
+        need = need_masks[action_id]
+        return state & need == need and not state & to_masks[action_id]
+
+    for g in range(size):
+        action_map = symmetry.action_maps[g]
+        assert sorted(action_map) == list(range(len(action_map)))
+        for state in get_states(board, 50):
+            moved = symmetry.transform(state, g)
+            for action_id in range(len(action_map)):
+                # Jumping and then moving the board is the same as moving the board and then making the moved jump
+                assert is_legal(state, action_id) == is_legal(moved, action_map[action_id])
+                assert symmetry.transform(state ^ flip_masks[action_id], g) == moved ^ flip_masks[action_map[action_id]]
+
+    # canonicalize gives the action map of the transform to the canonical state
+    for state in get_states(board, 50):
+        canonical, action_map = symmetry.canonicalize(state)
+        g = next(g for g in range(size) if symmetry.action_maps[g] is action_map)
+        assert symmetry.transform(state, g) == canonical
+        for action_id in range(len(action_map)):
+            assert symmetry.transform(state ^ flip_masks[action_id], g) == canonical ^ flip_masks[action_map[action_id]]
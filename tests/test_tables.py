@@ -0,0 +1,56 @@
+from tables import BoundedTable
+import pytest
+
+
+def test_lru_evicts_the_least_recently_visited_key():
+    table = BoundedTable(max_entries=3, eviction="lru")
+    for key in "abc":
+        table[key] = 0.0
+    assert table.get("a") == 0.0  # Reads count as visits
+    table["b"] = 1.0  # So do writes to existing keys
+    assert table.get("x") is None and "x" not in table  # Missing keys are not inserted
+    table["d"] = 0.0
+    assert list(table.keys()) == ["a", "b", "d"]
+    table["e"] = 0.0
+    assert list(table.keys()) == ["b", "d", "e"]
+    assert table.evictions == 2 and table.insertions == 5
+
+
+def test_lfu_evicts_the_least_visited_key():
+    table = BoundedTable(max_entries=4, eviction="lfu")
+    for key in "abcd":
+        table[key] = 0.0
+    for key in "aaabbd":
+        table.get(key)
+    table["e"] = 0.0
+    assert sorted(table.keys()) == ["a", "b", "d", "e"]
+    # The evicted key had 1 visit, so a new key starts at 2 and is not the next to go
+    assert table.age == 1 and table.visits["e"] == 2
+    table["f"] = 0.0
+    assert sorted(table.keys()) == ["a", "b", "e", "f"]
+
+
+def test_lfu_aging_evicts_keys_visited_long_ago():
+    table = BoundedTable(max_entries=2, eviction="lfu")
+    table["old"] = 0.0
+    for _ in range(3):
+        table.get("old")
+    # Every new key is visited once. Without aging they would all start at 1 and be evicted before "old".
+    for i in range(4):
+        table[i] = 0.0
+        table.get(i)
+    assert "old" not in table
+    assert table.age >= 4
+
+
+@pytest.mark.parametrize("eviction", ["lru", "lfu"])
+def test_max_bytes_bounds_every_entry(eviction):
+    max_bytes = 20 * BoundedTable.entry_bytes(0, 0.0)
+    table = BoundedTable(max_bytes=max_bytes, eviction=eviction)
+    for i in range(200):
+        # Keys of different sizes, so the bound depends on the size of every entry held
+        key = (1 << 70 + i, i) if i % 3 else i
+        table[key] = float(i)
+        assert table.bytes == sum(table.entry_bytes(key, value) for key, value in table.items())
+        assert table.bytes <= max_bytes
+    assert table.evictions > 0 and len(table) < 20
@@ -0,0 +1,38 @@
+from sim_world import SimWorld
+from vec_sim_world import VecSimWorld
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize("board", [
+    {"type": "d", "size": 4, "holes_loc": [[2, 1]]},
+    {"type": "t", "size": 5, "holes_loc": [[2, 1]]},
+    {"type": "t", "size": 6, "holes_loc": [[0, 0], [3, 3]]},
+])
+@pytest.mark.parametrize("engine", ["cells", "bitboard"])
+def test_vec_sim_world_steps_like_sim_world(load_config, board, engine):
+    config = load_config("task_3_table.yaml", 1, Board=dict(board, engine=engine, prune_dead=False))
+    num_boards = 8
+    worlds = [SimWorld(config) for _ in range(num_boards)]
+    # Every other board starts from a state a random move after the start state of the config
+    rng = np.random.default_rng(0)
+    for world in worlds[::2]:
+        actions = world.get_player().get_legal_actions()
+        world.step(actions[rng.integers(len(actions))])
+    start_states = [world.board.get_state() for world in worlds]
+    vec_world = VecSimWorld(config, num_boards, start_states)
+
+    legal = [world.get_player().get_legal_actions() for world in worlds]
+    for _ in range(200):
+        action_ids = np.array([actions[rng.integers(len(actions))].action_id for actions in legal])
+        states, rewards, dones, legal_mask = vec_world.step(action_ids)
+        for i, world in enumerate(worlds):
+            state, reward, done, legal[i] = world.step(world.board.action_catalog[action_ids[i]])
+            assert (reward, done) == (rewards[i], dones[i])
+            if done:
+                assert (vec_world.terminal_states[i], vec_world.final_pegs[i]) == (state, world.player.num_pegs)
+                world.board.set_state(start_states[i])
+                world.player.reset()
+                legal[i] = world.get_player().get_legal_actions()
+            assert states[i] == world.board.get_state()
+            assert np.flatnonzero(legal_mask[i]).tolist() == sorted(action.action_id for action in legal[i])
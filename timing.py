@@ -0,0 +1,107 @@
+"""
+Opt-in instrumentation of the training loop: per-phase timers, and cProfile over a window of episodes.
+"""
+from collections import defaultdict
+import numpy as np
+import cProfile
+import logging
+import pstats
+import time
+import io
+import os
+
+
+class PhaseTimer:
+    """
+    Accumulates the time spent in each phase of the training loop with a monotonic nanosecond clock.
+    A phase is timed with lap, which records the time since the previous lap and starts the next one:
+        t = timer.now()
+        ...
+        t = timer.lap("phase", t)
+    Call sites keep the timer as None when timing is off, so the only cost is a None check per phase.
+    """
+
+    def __init__(self):
+        self.totals = defaultdict(int)  # Phase mapping to its total time in ns
+        self.calls = defaultdict(int)  # Phase mapping to its number of calls
+        self.samples = defaultdict(list)  # Phase mapping to the duration of every call since the last report
+
+    @staticmethod
+    def now():
+        """
+        Return the current time of the clock used by the timer
+        :return: int - ns
+        """
+        return time.perf_counter_ns()
+
+    def lap(self, phase, start):
+        """
+        Record the time from start until now in phase
+        :param phase: str
+        :param start: int - ns, from now or an earlier lap
+        :return: int - now, the start of the next phase
+        """
+        end = time.perf_counter_ns()
+        duration = end - start
+        self.totals[phase] += duration
+        self.calls[phase] += 1
+        self.samples[phase].append(duration)
+        return end
+
+    def report(self, episode, total_phase="episode"):
+        """
+        Log the totals of every phase, with its share of the total_phase time and the percentiles of the calls since
+        the last report, then start a new window of samples
+        :param episode: int
+        :param total_phase: str - phase that holds the time of all other phases
+        :return: None
+        """
+        logging.info("Timing after episode {}:".format(episode))
+        total = self.totals.get(total_phase, 0) or 1
+        for phase in sorted(self.totals, key=self.totals.get, reverse=True):
+            samples = np.array(self.samples[phase]) / 1000 if self.samples[phase] else np.zeros(1)
+            p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+            logging.info("\t {:<18} {:>9} calls {:>9.3f}s {:>6.1f}% - mean {:.1f}us, p50 {:.1f}us, p90 {:.1f}us, "
+                         "p99 {:.1f}us".format(phase, self.calls[phase], self.totals[phase] / 1e9,
+                                               100 * self.totals[phase] / total, samples.mean(), p50, p90, p99))
+        self.samples = defaultdict(list)
+
+
+class EpisodeProfiler:
+    """
+    Runs cProfile from the start of episode first to the end of episode last, then saves the stats to path and logs
+    the functions with the most cumulative time
+    """
+
+    def __init__(self, first, last, path, top=25):
+        self.first = first
+        self.last = last
+        self.path = path
+        self.top = top
+        self.profile = None
+
+    def begin_episode(self, episode):
+        """
+        Start profiling if episode is the first of the window
+        :param episode: int
+        :return: None
+        """
+        if episode == self.first:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def end_episode(self, episode):
+        """
+        Stop profiling and save the stats if episode is the last of the window
+        :param episode: int
+        :return: None
+        """
+        if episode != self.last or self.profile is None:
+            return
+        self.profile.disable()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.profile.dump_stats(self.path)
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(self.top)
+        logging.info("Profile of episodes {}-{} saved to {}\n{}".format(self.first, self.last, self.path, out.getvalue()))
+        self.profile = None
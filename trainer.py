@@ -0,0 +1,285 @@
+import logging
+from environment.sim_world import SimWorld
+from environment.episode_log import EpisodeRecorder
+from environment.vec_sim_world import VecSimWorld
+from environment.solver import load_database
+from agent.reinforcement_learner import ReinforcementLearner
+from checkpoint import get_trainer_state, set_trainer_state, write_checkpoint, read_checkpoint
+from timing import PhaseTimer, EpisodeProfiler
+from evaluation import get_holes_locs, get_start_states, evaluate_actor, format_evaluation
+import numpy as np
+import time
+
+
+class Trainer:
+    """
+    Runs the generic actor-critic algorithm on a SimWorld, one episode at a time
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.training_config = config["Training"]
+
+        # Initialize the Simulated World
+        self.sim_world = SimWorld(config)
+        self.board = self.sim_world.get_board()
+        self.player = self.sim_world.get_player()
+
+        # Initialize the Reinforcement Learner
+        self.rl = ReinforcementLearner(self.player, config)
+        self.actor = self.rl.get_actor()
+        self.critic = self.rl.get_critic()
+        if config["Critic"].get("warm_start"):
+            self.warm_start_critic()
+
+        # Log for remaining pegs at the end of each game
+        self.remaining_pegs_pr_episode = []
+        self.rewards = []
+
+        self.episode = 0  # Number of episodes played so far
+        self.current_episode = []  # List of (state, action id) pairs chosen in the last episode
+
+        # Periodic checkpoints, written between episodes
+        self.checkpoint_path = self.training_config.get("checkpoint_path")
+        self.checkpoint_seconds = 60 * self.training_config.get("checkpoint_minutes", 5)
+        self.last_checkpoint = time.perf_counter()
+
+        # Opt-in instrumentation: phase timers reported every timing_every episodes, and cProfile over an episode window
+        self.timing_every = self.training_config.get("timing_every", 0)
+        self.timer = PhaseTimer() if self.timing_every else None
+        self.rl.timer = self.timer
+        profile_episodes = self.training_config.get("profile_episodes")
+        self.profiler = EpisodeProfiler(*profile_episodes, self.training_config.get(
+            "profile_path", "graphs/profile.prof")) if profile_episodes else None
+
+        # Binary log of every episode_log_every-th episode, opened when the first episode is recorded
+        self.episode_log_path = self.training_config.get("episode_log")
+        self.episode_log_every = self.training_config.get("episode_log_every", 1)
+        self.recorder = None
+
+        # Greedy evaluation every eval_every episodes, from the holes_loc starts of eval_holes
+        self.eval_every = self.training_config.get("eval_every", 0)
+        self.eval_states = get_start_states(self.board, get_holes_locs(
+            self.board, self.training_config.get("eval_holes"), config["Board"]["holes_loc"]))
+        self.eval_world = None  # VecSimWorld with one board per evaluation start state, created on first use
+
+    def __getstate__(self):
+        """
+        Pickle the Trainer without its open episode log, e.g. to move it between the processes of sweep.py. The log is
+        opened again when the next episode is recorded.
+        """
+        if self.profiler:
+            raise ValueError("A Trainer profiling episodes (Training.profile_episodes) cannot be pickled")
+        if self.recorder:
+            self.recorder.flush()
+        state = self.__dict__.copy()
+        state["recorder"] = None
+        return state
+
+    @classmethod
+    def from_checkpoint(cls, path):
+        """
+        Create a Trainer that continues the run saved in a checkpoint, with the config it was started with
+        :param path: str
+        :return: Trainer
+        """
+        state = read_checkpoint(path)
+        trainer = cls(state["config"])
+        set_trainer_state(trainer, state)
+        logging.info("Resumed from {} after episode {}".format(path, trainer.episode))
+        return trainer
+
+    def save_checkpoint(self, path=None):
+        """
+        Save everything needed to continue training after the last finished episode
+        :param path: str - defaults to the checkpoint_path of the Training config
+        :return: None
+        """
+        path = path or self.checkpoint_path
+        start = time.perf_counter()
+        if self.recorder:
+            self.recorder.flush()  # The log then holds every episode the checkpoint has played
+        write_checkpoint(path, get_trainer_state(self))
+        self.last_checkpoint = time.perf_counter()
+        logging.info("Checkpoint of episode {} saved to {} in {:.2f}s".format(
+            self.episode, path, self.last_checkpoint - start))
+
+    def train(self, episodes=None):
+        """
+        Play episodes until episodes (default: the number of episodes in the Training config) have been played
+        :param episodes: int
+        :return: None
+        """
+        episodes = episodes or self.training_config["episodes"]
+        if self.training_config["display"]:
+            self.sim_world.start_visualizer(self.training_config)
+        while self.episode < episodes:
+            self.run_episode()
+            if self.checkpoint_path and time.perf_counter() - self.last_checkpoint >= self.checkpoint_seconds:
+                self.save_checkpoint()
+        if self.checkpoint_path:
+            self.save_checkpoint()
+
+    def run_episode(self):
+        """
+        Play one episode of the game while updating the actor and critic
+        :return: None
+        """
+        self.episode += 1
+        episode = self.episode
+        sim_world, board, player = self.sim_world, self.board, self.player
+        rl, actor, critic = self.rl, self.actor, self.critic
+        timer, profiler = self.timer, self.profiler
+        if profiler:
+            profiler.begin_episode(episode)
+        episode_start = t = timer and timer.now()
+
+        # If it is the last episode - no random actions should be selected
+        if episode == self.training_config["episodes"]:
+            logging.info("Epsilon = 0")
+            actor.set_epsilon(0)
+        else:
+            actor.update_epsilon()
+
+        # List of (state, action id) pairs chosen this episode, and the reward of each action
+        current_episode = []
+        self.current_episode = current_episode
+        episode_rewards = []
+
+        # Reset eligibility in actor and critic
+        rl.reset_eligibility()
+
+        # Initialize state and action
+        state = board.get_state()
+        action = actor.get_action(state, player.get_legal_actions())
+        done = not sim_world.is_neutral_state()
+        if timer:
+            t = timer.lap("reset", t)
+        while not done:
+            # Do action action from state, moving it to new_state and return reward
+            new_state, reward, done, legal_actions = sim_world.step(action)
+            if reward != 0:
+                self.rewards.append(reward)
+            episode_rewards.append(reward)
+            if timer:
+                t = timer.lap("step", t)
+
+            # Get the action devoted to the new state by current policy
+            new_action = actor.get_action(new_state, legal_actions)
+            if timer:
+                t = timer.lap("get_action", t)
+
+            # Calculate the Temporal Difference error
+            td_error = critic.get_td_error(state, new_state, reward, done)
+            actor.set_td_error(td_error)
+            if timer:
+                t = timer.lap("td_error", t)
+
+            # Update actor and critic for all (state, action) pairs in this episode, timed in phases by rl
+            rl.update(state)
+            if timer:
+                t = timer.now()
+
+            # Set eligibility to 1 for both actor and critic
+            rl.set_eligibility(state, action.action_id, is_current_state=True)
+
+            # Save (state, action id) to the "log" of this episode
+            current_episode.append((state, action.action_id))
+            if timer:
+                t = timer.lap("set_eligibility", t)
+
+            # Continue until s reaches an end state
+            state, action = new_state, new_action
+
+        # Game ended, add results to log
+        self.remaining_pegs_pr_episode.append(board.num_pegs_on_board())
+        if self.episode_log_path and episode % self.episode_log_every == 0:
+            self.record_episode(episode, current_episode, episode_rewards)
+
+        # Reset board for next game
+        sim_world.reset()
+        if timer:
+            t = timer.lap("reset", t)
+
+        if episode % 50 == 0:
+            logging.info("Episode: {} - Avg Rewards: {}".format(episode, np.mean(self.rewards)))
+            self.rewards = []
+            critic.report_interval_stats()
+            if self.training_config["display"]:
+                sim_world.visualize_episode(current_episode, self.training_config,
+                                            path="graphs/mid/episode_{}.gif".format(episode))
+                if timer:
+                    t = timer.lap("visualization", t)
+
+        if self.eval_every and episode % self.eval_every == 0:
+            self.evaluate()
+            if timer:
+                timer.lap("evaluation", t)
+
+        if timer:
+            timer.lap("episode", episode_start)
+            if episode % self.timing_every == 0:
+                timer.report(episode)
+        if profiler:
+            profiler.end_episode(episode)
+
+    def warm_start_critic(self):
+        """
+        Start the table critic from the values of perfect play, found in the solution of the board
+        :return: None
+        """
+        if not self.config["Critic"]["table_lookup"]:
+            raise ValueError("Only a table_lookup critic can be warm started")
+        database = load_database(self.config["Board"])
+        states, values = database.get_values(self.config["Critic"]["df_critic"], len(self.board.get_cells()))
+        self.critic.warm_start(states, values)
+        logging.info("Warm started the critic with the values of {} states".format(len(states)))
+
+    def evaluate(self):
+        """
+        Play the greedy policy from every evaluation start state and log the result, without changing the actor or
+        the random number generators
+        :return: dict - see evaluation.summarize
+        """
+        if self.eval_world is None:
+            self.eval_world = VecSimWorld(self.config, len(self.eval_states), self.eval_states)
+        summary = evaluate_actor(self.actor, self.eval_world)
+        logging.info("Episode: {} - Greedy evaluation: {}".format(self.episode, format_evaluation(summary)))
+        return summary
+
+    def record_episode(self, episode, current_episode, rewards):
+        """
+        Append an episode to the episode log. When the log is opened, the episodes it holds from episode on are
+        removed first, so a run started over or resumed from a checkpoint does not log episodes twice.
+        :param episode: int
+        :param current_episode: List[(int, int)] - (state, action id) pairs of the episode
+        :param rewards: List[int] - reward of each action
+        :return: None
+        """
+        if self.recorder is None:
+            self.recorder = EpisodeRecorder(self.episode_log_path, self.config["Board"])
+            self.recorder.truncate(episode - 1)
+        start_state = current_episode[0][0] if current_episode else self.board.get_state()
+        self.recorder.record(episode, start_state, [action_id for _, action_id in current_episode], rewards)
+
+    def close(self):
+        """
+        Flush the episode log and stop the background workers of the sim world
+        :return: None
+        """
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        self.sim_world.close()
+
+    def report_stats(self):
+        """
+        Log the stats of the actor and critic for debug
+        :return: None
+        """
+        self.actor.report_actor_stats()
+        self.critic.report_critic_stats()
+        pruner = self.sim_world.pruner
+        if pruner is not None:
+            logging.info("Pruning: {} episodes ended in a dead state, {} states in the cache".format(
+                pruner.pruned, len(pruner.cache)))
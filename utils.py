@@ -1,8 +1,28 @@
 import yaml
+import random
+import sys
+import importlib
+import os
+import numpy as np
 from environment.board import DiamondPegBoard, TrianglePegBoard
-from agent.critic import TableCritic, NeuralCritic
+from agent.critic import TableCritic, DenseTableCritic
 import logging
 
+# Backends pulling in heavy libraries (torch, matplotlib, networkx), imported the first time a config asks for them,
+# so table-only runs and worker processes start without them: name mapping to (module, attribute)
+BACKENDS = {
+    "neural_critic": ("agent.neural_critic", "NeuralCritic"),
+    "numpy_critic": ("agent.numpy_critic", "NumpyCritic"),
+    "neural_actor": ("agent.neural_actor", "NeuralActor"),
+    "visualizer": ("environment.visualizer", "BoardVisualizer"),
+}
+
+# Keys of the Training config naming files a run writes to, which runs in parallel must not share
+OUTPUT_KEYS = ("checkpoint_path", "episode_log", "profile_path")
+
+# Seed given to set_seed before torch was imported, applied when a backend first imports it
+torch_seed = None
+
 
 def load_config(path):
     """
@@ -23,13 +43,47 @@ def get_board(config):
         return TrianglePegBoard(config)
 
 
-def get_critic(config):
+def get_actor(player, config):
+    """
+    Return the correct actor based on what is given in the configurations
+    :param player: Player
+    :param config: dict
+    :return: Actor
+    """
+    if not config.get("table_lookup", True):
+        return get_backend("neural_actor")(player, config)
+    from agent.actor import Actor, DenseActor  # The actor module imports utils itself
+    return DenseActor(player, config) if config.get("table") in ("dense", "shared") else Actor(player, config)
+
+
+def get_critic(config, num_cells=None, symmetry=None):
     """
     Return the correct critic based on what is given in the configurations
     :param config: dict
+    :param num_cells: int - number of cells on the board, needed by the dense table critic
+    :param symmetry: BoardSymmetry - lets the table critics store one value per orbit of symmetric states
     :return: Critic
     """
-    return TableCritic(config) if config["table_lookup"] else NeuralCritic(config)
+    if not config["table_lookup"]:
+        return get_backend("numpy_critic" if config.get("backend") == "numpy" else "neural_critic")(config)
+    if config.get("table") in ("dense", "shared"):
+        return DenseTableCritic(config, num_cells, symmetry)
+    return TableCritic(config, symmetry)
+
+
+def get_backend(name):
+    """
+    Import a heavy backend on first use and return it. Torch is seeded with the seed of the last set_seed if the
+    backend is the first to import it.
+    :param name: str - key of BACKENDS
+    :return: class
+    """
+    module, attribute = BACKENDS[name]
+    had_torch = "torch" in sys.modules
+    backend = getattr(importlib.import_module(module), attribute)
+    if not had_torch and "torch" in sys.modules and torch_seed is not None:
+        sys.modules["torch"].manual_seed(torch_seed)
+    return backend
 
 
 def init_logger():
@@ -52,3 +106,59 @@ def is_empty(lst):
     :return: boolean
     """
     return len(lst) == 0
+
+
+def set_seed(seed):
+    """
+    Seed every random number generator used during training
+    :param seed: int
+    :return: None
+    """
+    global torch_seed
+    random.seed(seed)
+    np.random.seed(seed)
+    if "torch" in sys.modules:
+        sys.modules["torch"].manual_seed(seed)
+    else:
+        torch_seed = seed  # Seeded by get_backend if torch is imported later
+
+
+def get_rng_state():
+    """
+    Return the state of every random number generator used during training
+    :return: dict
+    """
+    state = {"random": random.getstate(), "numpy": np.random.get_state()}
+    if "torch" in sys.modules:
+        state["torch"] = sys.modules["torch"].get_rng_state()
+    return state
+
+
+def set_rng_state(state):
+    """
+    Restore random number generators from get_rng_state
+    :param state: dict
+    :return: None
+    """
+    random.setstate(state["random"])
+    np.random.set_state(state["numpy"])
+    if "torch" in state:
+        import torch
+        torch.set_rng_state(state["torch"])
+
+
+def separate_outputs(config, name):
+    """
+    Give the files a run writes to (OUTPUT_KEYS of the Training config) their own paths, with name added before the
+    extension, e.g. for the workers of hogwild.py or the trials of sweep.py
+    :param config: dict
+    :param name: str - e.g. "worker_3"
+    :return: None
+    """
+    training_config = config["Training"]
+    if training_config.get("profile_episodes"):
+        training_config.setdefault("profile_path", "graphs/profile.prof")
+    for key in OUTPUT_KEYS:
+        if training_config.get(key):
+            root, extension = os.path.splitext(training_config[key])
+            training_config[key] = "{}_{}{}".format(root, name, extension)